@@ -0,0 +1,83 @@
+"""
+Compare populating VariableSchema objects field by field with and without SchemaBaseModel.bulk_update.
+
+Run with
+
+    python -m pydantic_schemas.benchmarks.bench_bulk_update --n-variables 5000
+"""
+
+import argparse
+import time
+
+from pydantic_schemas.microdata_schema import VariableSchema
+
+VARIABLE_FIELDS = {
+    "name": "hhid",
+    "labl": "Household identifier",
+    "var_intrvl": "Discrete",
+    "var_wgt": 0,
+    "loc_start_pos": 1,
+    "loc_end_pos": 8,
+    "loc_width": 8,
+    "var_imputation": "none",
+    "var_security": "public",
+    "var_respunit": "household",
+    "var_qstn_preqtxt": "Interviewer: read out",
+    "var_qstn_qstnlit": "What is the household number?",
+    "var_qstn_postqtxt": "Check against the listing",
+    "var_universe": "All households",
+    "var_txt": "Unique identifier of the household",
+    "var_codinstr": "Copy from the cover page",
+    "var_catgry": [{"value": "1", "labl": "Yes"}, {"value": "2", "labl": "No"}],
+    "var_notes": "",
+}
+
+
+def populate_field_by_field(n_variables: int):
+    variables = []
+    for i in range(n_variables):
+        variable = VariableSchema(file_id="F1", vid=f"V{i}", name="", labl="")
+        for field_name, value in VARIABLE_FIELDS.items():
+            setattr(variable, field_name, value)
+        variables.append(variable)
+    return variables
+
+
+def populate_with_bulk_update(n_variables: int):
+    variables = []
+    for i in range(n_variables):
+        variable = VariableSchema(file_id="F1", vid=f"V{i}", name="", labl="")
+        with variable.bulk_update():
+            for field_name, value in VARIABLE_FIELDS.items():
+                setattr(variable, field_name, value)
+        variables.append(variable)
+    return variables
+
+
+def time_call(func, *args, repeats: int = 3) -> float:
+    """Return the fastest of several runs, in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-variables", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    assert populate_field_by_field(1) == populate_with_bulk_update(1)
+
+    field_by_field = time_call(populate_field_by_field, args.n_variables, repeats=args.repeats)
+    bulk_update = time_call(populate_with_bulk_update, args.n_variables, repeats=args.repeats)
+    print(f"populating {args.n_variables} variables with {len(VARIABLE_FIELDS)} assignments each")
+    print(f"  field by field: {field_by_field:.3f}s")
+    print(f"  bulk_update:    {bulk_update:.3f}s ({field_by_field / bulk_update:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare the throughput and peak memory of MetadataManager.validate_json with parsing the JSON into a dictionary and
+validating that.
+
+The payloads are large synthetic instances, with the long lists of LARGE_LIST_LENGTHS, for instance 50,000 variables
+for microdata. Run with
+
+    python -m pydantic_schemas.benchmarks.bench_validate_json --types microdata geospatial
+
+or with --scale 0.1 for lists a tenth as long.
+"""
+
+import argparse
+import io
+import json
+import time
+import tracemalloc
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.synthetic_data import (
+    LARGE_LIST_LENGTHS,
+    SyntheticDataGenerator,
+)
+
+
+def make_json_payload(metadata_type: str, scale: float = 1.0, seed: int = 0) -> bytes:
+    list_lengths = {key: max(1, int(length * scale)) for key, length in LARGE_LIST_LENGTHS[metadata_type].items()}
+    generator = SyntheticDataGenerator(seed=seed, list_length=2, list_lengths=list_lengths)
+    buffer = io.StringIO()
+    generator.write_json(MetadataManager().metadata_class_from_name(metadata_type), buffer)
+    return buffer.getvalue().encode()
+
+
+def validate_dict(mm: MetadataManager, metadata_type: str, data: bytes):
+    return mm.metadata_class_from_name(metadata_type).model_validate(json.loads(data))
+
+
+def time_call(func, *args, repeats: int = 3, **kwargs) -> float:
+    """Return the fastest of several runs, in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_memory(func, *args, **kwargs) -> int:
+    """Return the most memory allocated at once during a run, in bytes"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--types", nargs="+", default=["microdata", "geospatial"], choices=list(LARGE_LIST_LENGTHS))
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the lengths of the long lists by this")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    mm = MetadataManager()
+    for metadata_type in args.types:
+        data = make_json_payload(metadata_type, args.scale)
+        assert validate_dict(mm, metadata_type, data) == mm.validate_json(metadata_type, data)
+
+        megabytes = len(data) / 1e6
+        print(f"validating {megabytes:.1f}MB of {metadata_type} JSON")
+        calls = {
+            "json.loads + model_validate": (validate_dict, (mm, metadata_type, data), {}),
+            "validate_json": (mm.validate_json, (metadata_type, memoryview(data)), {}),
+            "validate_json lenient": (mm.validate_json, (metadata_type, data), {"lenient": True}),
+        }
+        for name, (func, func_args, kwargs) in calls.items():
+            seconds = time_call(func, *func_args, repeats=args.repeats, **kwargs)
+            peak = peak_memory(func, *func_args, **kwargs)
+            print(f"  {name:<28} {seconds:>7.3f}s {megabytes / seconds:>7.1f}MB/s  peak {peak / 1e6:>7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Check the Excel pipeline has not got slower by re-running benchmarks and comparing them with a stored baseline.
+
+The baseline is a JSON file written by run_benchmarks, or by this script with --update-baseline. Timings depend on the
+machine, so no baseline is shipped with the package: record one on the machine that runs the check, before the change
+being checked, with
+
+    python -m pydantic_schemas.benchmarks.compare_benchmarks --update-baseline
+
+which runs the benchmarks of DEFAULT_SELECTION, or those chosen with --select. Then run
+
+    python -m pydantic_schemas.benchmarks.compare_benchmarks
+
+or for only a few benchmarks, written as metadata_type:operation[:size] with a size for the operations run per size,
+
+    python -m pydantic_schemas.benchmarks.compare_benchmarks --select geospatial:write_outline microdata:read:small
+
+Every benchmark in the baseline, or just those chosen with --select, is run again and its median time and peak memory
+compared with the baseline. A benchmark has regressed when its median time is more than --tolerance slower than the
+baseline and the slowdown is larger than the interquartile range of either run, so that noisy timings do not fail the
+check, when its peak memory grows by more than --memory-tolerance, or when it failed or gave no result. The script
+prints a table of every comparison and exits with status 1 if anything regressed.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import warnings
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic_schemas.benchmarks.run_benchmarks import (
+    OPERATIONS,
+    SIZES,
+    UNSIZED_OPERATIONS,
+    benchmark_metadata_type,
+    run_metadata,
+)
+from pydantic_schemas.metadata_manager import MetadataManager
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# the benchmarks recorded by --update-baseline when neither a baseline nor --select gives them
+DEFAULT_SELECTION = [
+    "geospatial:write_outline",
+    "microdata:write_outline",
+    "microdata:save:small",
+    "microdata:read:small",
+    "indicator:round_trip:small",
+    "video:round_trip:small",
+]
+
+# relative increase allowed before a benchmark counts as a regression
+DEFAULT_TIME_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.10
+
+BenchmarkKey = Tuple[str, str, Optional[str]]
+
+
+def _key(result: Dict[str, Any]) -> BenchmarkKey:
+    return result["metadata_type"], result["operation"], result["size"]
+
+
+def parse_selection(selection: str) -> BenchmarkKey:
+    """
+    Parse a benchmark written as metadata_type:operation[:size], such as 'microdata:read:small'.
+
+    Raises:
+        ValueError: If the selection does not have two or three parts, the metadata type, operation or size is
+            unknown, or the operation is run per size and no size is given, or is not and a size is given.
+    """
+    parts = selection.split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"'{selection}' should be written as metadata_type:operation[:size]")
+    metadata_type, operation = parts[0], parts[1]
+    size = parts[2] if len(parts) == 3 else None
+    metadata_type_names = MetadataManager().metadata_type_names
+    if metadata_type not in metadata_type_names:
+        raise ValueError(
+            f"'{selection}' has unknown metadata type '{metadata_type}', expected one of {metadata_type_names}"
+        )
+    if operation not in OPERATIONS:
+        raise ValueError(f"'{selection}' has unknown operation '{operation}', expected one of {OPERATIONS}")
+    if size is not None and size not in SIZES:
+        raise ValueError(f"'{selection}' has unknown size '{size}', expected one of {list(SIZES)}")
+    if operation in UNSIZED_OPERATIONS and size is not None:
+        raise ValueError(f"'{selection}' has a size but {operation} does not depend on the size")
+    if operation not in UNSIZED_OPERATIONS and size is None:
+        raise ValueError(f"'{selection}' needs a size, as {operation} is run once per size, one of {list(SIZES)}")
+    return metadata_type, operation, size
+
+
+def rerun_benchmarks(keys: List[BenchmarkKey], repeats: int) -> List[Dict[str, Any]]:
+    """Run just the given benchmarks, each repeats times"""
+    by_type = defaultdict(set)
+    for key in keys:
+        by_type[key[0]].add(key)
+    results = []
+    with tempfile.TemporaryDirectory() as directory, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for metadata_type, type_keys in by_type.items():
+            operations = sorted({operation for _, operation, _ in type_keys})
+            sizes = sorted({size for _, _, size in type_keys if size is not None})
+            for result in benchmark_metadata_type(metadata_type, sizes, operations, repeats, directory):
+                if _key(result) in type_keys:
+                    results.append(result)
+    return results
+
+
+def compare_results(
+    baseline: List[Dict[str, Any]],
+    current: List[Dict[str, Any]],
+    time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+    memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE,
+    expected: Optional[List[BenchmarkKey]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compare each current benchmark result with the baseline result of the same benchmark.
+
+    Args:
+        baseline (List[Dict[str, Any]]): The 'results' of a baseline run.
+        current (List[Dict[str, Any]]): The 'results' of the run being checked.
+        time_tolerance (float): The relative increase in median time allowed, 0.25 meaning 25% slower.
+        memory_tolerance (float): The relative increase in peak memory allowed.
+        expected (Optional[List[BenchmarkKey]]): The benchmarks that should have a current result, by default every
+            benchmark of the baseline.
+
+    Returns:
+        List[Dict[str, Any]]: One comparison per benchmark and metric, with the baseline and current values, their
+            ratio and whether it counts as a regression. Benchmarks that failed, that are missing from the baseline,
+            or that are expected but have no current result, are reported as regressions with their error.
+    """
+    baseline_by_key = {_key(result): result for result in baseline}
+    current_keys = {_key(result) for result in current}
+    comparisons = [
+        {
+            **dict(zip(("metadata_type", "operation", "size"), key)),
+            "metric": None,
+            "regressed": True,
+            "error": "no result",
+        }
+        for key in (expected if expected is not None else list(baseline_by_key))
+        if key not in current_keys
+    ]
+    for result in current:
+        key = _key(result)
+        comparison = dict(zip(("metadata_type", "operation", "size"), key))
+        reference = baseline_by_key.get(key)
+        error = result.get("error") or (reference or {}).get("error")
+        if reference is None or error:
+            comparisons.append({**comparison, "metric": None, "regressed": True, "error": error or "not in baseline"})
+            continue
+
+        slowdown = result["time_median"] - reference["time_median"]
+        noise = max(reference.get("time_iqr", 0.0), result.get("time_iqr", 0.0))
+        time_ratio = result["time_median"] / reference["time_median"] if reference["time_median"] else 1.0
+        comparisons.append(
+            {
+                **comparison,
+                "metric": "time_median",
+                "baseline": reference["time_median"],
+                "current": result["time_median"],
+                "ratio": time_ratio,
+                "regressed": time_ratio > 1 + time_tolerance and slowdown > noise,
+            }
+        )
+        memory_ratio = (
+            result["peak_memory_bytes"] / reference["peak_memory_bytes"] if reference["peak_memory_bytes"] else 1.0
+        )
+        comparisons.append(
+            {
+                **comparison,
+                "metric": "peak_memory_bytes",
+                "baseline": reference["peak_memory_bytes"],
+                "current": result["peak_memory_bytes"],
+                "ratio": memory_ratio,
+                "regressed": memory_ratio > 1 + memory_tolerance,
+            }
+        )
+    return comparisons
+
+
+def _format_value(metric: str, value: float) -> str:
+    if metric == "time_median":
+        return f"{value:.3f}s"
+    return f"{value / 1e6:.1f}MB"
+
+
+def format_comparisons(comparisons: List[Dict[str, Any]]) -> str:
+    """A table of the comparisons with regressions marked, for printing"""
+    header = f"{'metadata_type':<15}{'operation':<15}{'size':<8}{'metric':<19}{'baseline':>10}{'current':>10}"
+    lines = [f"{header}{'change':>9}  status", "-" * (len(header) + 17)]
+    for c in comparisons:
+        name = f"{c['metadata_type']:<15}{c['operation']:<15}{c['size'] or '':<8}"
+        status = "REGRESSED" if c["regressed"] else "ok"
+        if c["metric"] is None:
+            lines.append(f"{name}{'':<19}{'':>10}{'':>10}{'':>9}  {status} ({c['error']})")
+            continue
+        change = f"{(c['ratio'] - 1) * 100:+.0f}%"
+        lines.append(
+            f"{name}{c['metric']:<19}{_format_value(c['metric'], c['baseline']):>10}"
+            f"{_format_value(c['metric'], c['current']):>10}{change:>9}  {status}"
+        )
+    n_regressed = sum(c["regressed"] for c in comparisons)
+    lines.append(f"{n_regressed} of {len(comparisons)} comparisons regressed")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument(
+        "--select", nargs="+", default=None, help="benchmarks to run, as metadata_type:operation[:size]"
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TIME_TOLERANCE, help="allowed relative slowdown")
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE)
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="write the results as the new baseline instead of comparing"
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    try:
+        if args.select is not None:
+            keys = [parse_selection(selection) for selection in args.select]
+        elif baseline is not None:
+            keys = [_key(result) for result in baseline["results"]]
+        else:
+            keys = [parse_selection(selection) for selection in DEFAULT_SELECTION]
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.update_baseline:
+        sizes = sorted({size for _, _, size in keys if size is not None})
+        new_baseline = {"metadata": run_metadata(args.repeats, sizes), "results": rerun_benchmarks(keys, args.repeats)}
+        with open(args.baseline, "w") as file:
+            json.dump(new_baseline, file, indent=2)
+        print(f"baseline of {len(keys)} benchmarks written to {args.baseline}")
+        return
+
+    if baseline is None:
+        parser.error(f"there is no baseline at {args.baseline}, create one with --update-baseline")
+    comparisons = compare_results(
+        baseline["results"],
+        rerun_benchmarks(keys, args.repeats),
+        time_tolerance=args.tolerance,
+        memory_tolerance=args.memory_tolerance,
+        expected=keys,
+    )
+    print(format_comparisons(comparisons))
+    if any(c["regressed"] for c in comparisons):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
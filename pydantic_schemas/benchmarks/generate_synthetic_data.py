@@ -0,0 +1,57 @@
+"""
+Write large synthetic metadata instances to JSON for testing how the library scales.
+
+Run with
+
+    python -m pydantic_schemas.benchmarks.generate_synthetic_data microdata --large --output microdata.json
+
+to write a microdata schema with 50,000 variables, or
+
+    python -m pydantic_schemas.benchmarks.generate_synthetic_data indicator --n-instances 100 --output indicators.jsonl
+
+to write 100 different indicators, one per line.
+"""
+
+import argparse
+import contextlib
+import sys
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.synthetic_data import (
+    LARGE_LIST_LENGTHS,
+    SyntheticDataGenerator,
+)
+
+
+def main():
+    mm = MetadataManager()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("metadata_type", choices=mm.metadata_type_names)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--list-length", type=int, default=2, help="number of elements in each list")
+    parser.add_argument(
+        "--large", action="store_true", help="use the long lists of LARGE_LIST_LENGTHS for this metadata type"
+    )
+    parser.add_argument(
+        "--n-instances", type=int, default=None, help="write this many instances as JSON lines rather than one"
+    )
+    parser.add_argument("--output", default=None, help="file to write to, by default standard output")
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(
+        seed=args.seed,
+        list_length=args.list_length,
+        list_lengths=LARGE_LIST_LENGTHS.get(args.metadata_type) if args.large else None,
+    )
+    schema = mm.metadata_class_from_name(args.metadata_type)
+    with contextlib.ExitStack() as stack:
+        file = sys.stdout if args.output is None else stack.enter_context(open(args.output, "w"))
+        if args.n_instances is None:
+            generator.write_json(schema, file)
+            file.write("\n")
+        else:
+            generator.write_jsonl(schema, file, args.n_instances)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Time the Excel pipeline of the MetadataManager for each metadata type.
+
+For every metadata type this times make_skeleton and write_metadata_outline_to_excel, and then for each payload size
+times save_metadata_to_excel, read_metadata_from_excel and a full round trip of a synthetic metadata object. Reads
+parse the sheets, except for read_unchanged, which reads the copy of the metadata embedded with embed_payload. Each
+measurement records the run times, the peak memory allocated during a separate traced run and the size of any Excel
+file written. Results are written as JSON so that runs can be compared.
+
+Run with
+
+    python -m pydantic_schemas.benchmarks.run_benchmarks --output bench_results.json
+
+or for a quick look at a couple of types
+
+    python -m pydantic_schemas.benchmarks.run_benchmarks --types microdata geospatial --sizes small --repeats 1
+"""
+
+import argparse
+import copy
+import importlib.metadata
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.quick_start import make_skeleton
+from pydantic_schemas.utils.test_utils import fill_in_pydantic_outline
+
+# number of elements in each outermost list of objects, such as the variables of a microdata schema
+SIZES = {"small": 1, "medium": 10, "large": 100}
+
+OPERATIONS = ["make_skeleton", "write_outline", "save", "read", "read_unchanged", "round_trip"]
+
+# operations that do not depend on the size of the payload, the others are run once per size
+UNSIZED_OPERATIONS = ["make_skeleton", "write_outline"]
+
+
+def _repeat_list_items(value: Any, list_length: int) -> Any:
+    """
+    Lengthen every outermost list of objects to list_length by repeating its elements.
+
+    Lists nested inside those lists are left as they are so that the payload grows linearly with list_length.
+    """
+    if isinstance(value, dict):
+        return {k: _repeat_list_items(v, list_length) for k, v in value.items()}
+    if isinstance(value, list) and len(value) and all(isinstance(v, dict) for v in value):
+        return [copy.deepcopy(value[i % len(value)]) for i in range(list_length)]
+    return value
+
+
+def make_payload(metadata_type: str, list_length: int, seed: int = 0) -> BaseModel:
+    """Create a filled in metadata object in which the outermost lists of objects have list_length elements"""
+    random.seed(seed)
+    mm = MetadataManager()
+    model = mm.create_metadata_outline(metadata_type)
+    fill_in_pydantic_outline(model)
+    data = _repeat_list_items(model.model_dump(mode="json"), list_length)
+    return type(model).model_validate(data)
+
+
+def interquartile_range(values: List[float]) -> float:
+    """The spread of the middle half of values, which unlike the standard deviation ignores the odd slow outlier"""
+    if len(values) < 2:
+        return 0.0
+    lower, _, upper = statistics.quantiles(values, n=4, method="inclusive")
+    return upper - lower
+
+
+def _measure(func: Callable[[], Optional[str]], repeats: int) -> Dict[str, Any]:
+    """
+    Run func repeats times and then once more under tracemalloc to find its peak memory.
+
+    func may return the name of a file it wrote, whose size is then recorded.
+    """
+    times = []
+    output = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "times": times,
+        "time_median": statistics.median(times),
+        "time_min": min(times),
+        "time_iqr": interquartile_range(times),
+        "peak_memory_bytes": peak_memory,
+        "output_size_bytes": os.path.getsize(output) if isinstance(output, str) and os.path.exists(output) else None,
+    }
+
+
+def _fresh_filename(directory: str, name: str) -> str:
+    """The Excel writers add sheets to existing files, so every run needs a file that does not exist yet"""
+    filename = os.path.join(directory, name)
+    if os.path.exists(filename):
+        os.remove(filename)
+    return filename
+
+
+def benchmark_metadata_type(
+    metadata_type: str, sizes: List[str], operations: List[str], repeats: int, directory: str
+) -> List[Dict[str, Any]]:
+    mm = MetadataManager()
+    schema = mm.metadata_class_from_name(metadata_type)
+    results = []
+
+    def record(operation, size, func):
+        try:
+            result = _measure(func, repeats)
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        results.append({"metadata_type": metadata_type, "size": size, "operation": operation, **result})
+
+    if "make_skeleton" in operations:
+        record("make_skeleton", None, lambda: make_skeleton(schema))
+    if "write_outline" in operations:
+        record(
+            "write_outline",
+            None,
+            lambda: mm.write_metadata_outline_to_excel(
+                metadata_type, filename=_fresh_filename(directory, f"{metadata_type}_outline.xlsx")
+            ),
+        )
+
+    for size in sizes:
+        payload = make_payload(metadata_type, SIZES[size])
+        saved_name = f"{metadata_type}_{size}_saved.xlsx"
+        saved_filename = os.path.join(directory, saved_name)
+        embedded_filename = os.path.join(directory, f"{metadata_type}_{size}_embedded.xlsx")
+
+        def save(payload=payload, saved_name=saved_name):
+            return mm.save_metadata_to_excel(payload, filename=_fresh_filename(directory, saved_name))
+
+        # read and round_trip parse every sheet, as for a file that has been edited, while read_unchanged reads the
+        # copy of the metadata embedded in a file saved with embed_payload=True
+        def read(saved_filename=saved_filename, use_payload=False):
+            mm.read_metadata_from_excel(saved_filename, use_payload=use_payload)
+            return saved_filename
+
+        def read_unchanged(embedded_filename=embedded_filename):
+            return read(embedded_filename, use_payload=True)
+
+        def round_trip(payload=payload, size=size):
+            filename = mm.save_metadata_to_excel(
+                payload, filename=_fresh_filename(directory, f"{metadata_type}_{size}_round_trip.xlsx")
+            )
+            mm.read_metadata_from_excel(filename, use_payload=False)
+            return filename
+
+        if "save" in operations:
+            record("save", size, save)
+        if "read" in operations:
+            if not os.path.exists(saved_filename):
+                save()
+            record("read", size, read)
+        if "read_unchanged" in operations:
+            if not os.path.exists(embedded_filename):
+                mm.save_metadata_to_excel(payload, filename=embedded_filename, embed_payload=True)
+            record("read_unchanged", size, read_unchanged)
+        if "round_trip" in operations:
+            record("round_trip", size, round_trip)
+    return results
+
+
+def run_benchmarks(
+    metadata_types: List[str], sizes: List[str], operations: List[str], repeats: int, verbose: bool = True
+) -> Dict[str, Any]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory, warnings.catch_warnings():
+        # the writers warn about pandas chained assignment on every call which would drown out the results
+        warnings.simplefilter("ignore")
+        for metadata_type in metadata_types:
+            if verbose:
+                print(f"benchmarking {metadata_type}")
+            for result in benchmark_metadata_type(metadata_type, sizes, operations, repeats, directory):
+                if verbose:
+                    print(format_result(result))
+                results.append(result)
+    return {"metadata": run_metadata(repeats, sizes), "results": results}
+
+
+def run_metadata(repeats: int, sizes: List[str]) -> Dict[str, Any]:
+    """Describe the environment of a benchmark run, so that results from different machines are not mixed up"""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "package_version": importlib.metadata.version("metadataschemas"),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "repeats": repeats,
+        "sizes": {size: SIZES[size] for size in sizes},
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    name = f"  {result['operation']:<14}{result['size'] or '':<8}"
+    if "error" in result:
+        return f"{name}ERROR {result['error']}"
+    output_size = result["output_size_bytes"]
+    file_size = f"  file {output_size / 1e3:>8.1f}kB" if output_size is not None else ""
+    return f"{name}{result['time_median']:>9.3f}s  peak {result['peak_memory_bytes'] / 1e6:>8.1f}MB{file_size}"
+
+
+def main():
+    mm = MetadataManager()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--types", nargs="+", default=mm.metadata_type_names, choices=mm.metadata_type_names)
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--operations", nargs="+", default=OPERATIONS, choices=OPERATIONS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(args.types, args.sizes, args.operations, args.repeats)
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(benchmark_results, file, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Bundle the JSON schema of each metadata type listed in json_to_python_config.yaml with the schemas it refers to.
+
+Run from the root of the repository with
+
+    python -m pydantic_schemas.generators.bundle_json_schemas
+
+to write the bundles to pydantic_schemas/utils/bundled_json_schemas, or with --check to only list the bundles that
+are out of date with the schemas folder, exiting with an error if there are any.
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+import yaml
+
+from pydantic_schemas.utils.schema_bundles import (
+    BUNDLE_DIR,
+    build_bundles,
+    stale_bundles,
+)
+
+SCHEMA_DIR = "schemas"
+CONFIG_FILE = "json_to_python_config.yaml"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bundle the JSON schema of each metadata type")
+    parser.add_argument("--check", action="store_true", help="Only check whether the bundles are up to date")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        stale = stale_bundles(SCHEMA_DIR)
+        if len(stale):
+            print(f"The bundles of {stale} are out of date, rebuild them with {__spec__.name}", file=sys.stderr)
+            sys.exit(1)
+        print("The bundles are up to date")
+        return
+
+    with open(CONFIG_FILE) as file:
+        config = yaml.safe_load(file)
+    build_bundles({section: details["json_file"] for section, details in config.items()}, SCHEMA_DIR, BUNDLE_DIR)
+    print(f"Bundled {list(config)} to {BUNDLE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
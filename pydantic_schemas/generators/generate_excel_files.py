@@ -1,83 +1,244 @@
+"""
+Write the Excel outline of every metadata type to the excel_sheets folder.
+
+Run from the root of the repository with
+
+    python -m pydantic_schemas.generators.generate_excel_files
+
+A committed outline is only replaced if the new one differs from it in what it shows, meaning the value and the
+font, fill, border and alignment of a cell, as measured by workbook_fingerprint. Outlines are only written at all if
+their inputs, meaning the pydantic schema and the WRITER_MODULES that lay it out in Excel, or the committed workbook
+itself, have changed since they were last written, which is recorded in MANIFEST_FILE. Those that are written are
+written in parallel, each in its own process.
+
+Pass --force to write every outline, --jobs to set how many to write at once, or metadata type names, such as
+microdata, to only consider those.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
 import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 import openpyxl
 
 from pydantic_schemas.metadata_manager import MetadataManager
 
+EXCEL_DIR = "excel_sheets"
+MANIFEST_FILE = os.path.join("pydantic_schemas", "generators", "excel_fingerprints.json")
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the modules, relative to PACKAGE_DIR, that turn a pydantic schema into an outline
+WRITER_MODULES = [
+    os.path.join("utils", "pydantic_to_excel.py"),
+    os.path.join("utils", "quick_start.py"),
+    os.path.join("utils", "utils.py"),
+    os.path.join("utils", "enum_with_value_or_key.py"),
+]
+
+
+def _canonical_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    return f"{type(value).__name__}:{value}"
+
+
+def _canonical_style(cell) -> str:
+    """The parts of the style of a cell that matter to an outline, which unlike its style id don't depend on the file"""
+    font, fill, border, alignment = cell.font, cell.fill, cell.border, cell.alignment
+    start_color, end_color = getattr(fill, "start_color", None), getattr(fill, "end_color", None)
+    return repr(
+        (
+            font.name,
+            font.sz,
+            font.b,
+            font.i,
+            getattr(start_color, "index", None),
+            getattr(end_color, "index", None),
+            border.left.style,
+            border.right.style,
+            border.top.style,
+            border.bottom.style,
+            alignment.horizontal,
+            alignment.vertical,
+        )
+    )
+
+
+def sheet_fingerprints(filename: str) -> Dict[str, str]:
+    """
+    The SHA-256 of the values and styles of the cells of each sheet of a workbook, in one streaming pass.
+
+    Empty unstyled cells are skipped and values are normalized, so 1 and 1.0 are the same, and the style of a cell is
+    reduced to its font, fill, border and alignment, which is computed once per style used in the workbook. Two
+    workbooks that look the same therefore have the same fingerprints however their files differ.
+
+    Returns:
+        Dict[str, str]: The fingerprint of each sheet, in the order of the sheets.
+    """
+    workbook = openpyxl.load_workbook(filename, read_only=True)
+    try:
+        styles: Dict[int, str] = {}
+        fingerprints = {}
+        for worksheet in workbook.worksheets:
+            digest = hashlib.sha256(f"{worksheet.sheet_state}\n".encode())
+            for row in worksheet.iter_rows():
+                for cell in row:
+                    style_id = getattr(cell, "_style_id", 0)
+                    if cell.value is None and style_id == 0:
+                        continue
+                    if style_id not in styles:
+                        styles[style_id] = _canonical_style(cell)
+                    value = "" if cell.value is None else _canonical_value(cell.value)
+                    digest.update(f"{cell.row},{cell.column}\0{value}\0{styles[style_id]}\n".encode())
+            fingerprints[worksheet.title] = digest.hexdigest()
+    finally:
+        workbook.close()
+    return fingerprints
+
+
+def workbook_fingerprint(filename: str) -> str:
+    """The SHA-256 of the sheet names and sheet_fingerprints of a workbook"""
+    return hashlib.sha256(json.dumps(list(sheet_fingerprints(filename).items())).encode()).hexdigest()
+
+
+def compare_excel_files(file1: str, file2: str) -> bool:
+    """Whether two workbooks have the same sheets, showing the same values with the same styles"""
+    return workbook_fingerprint(file1) == workbook_fingerprint(file2)
+
+
+def file_fingerprint(path: str) -> Optional[str]:
+    """The SHA-256 of a file, None if it doesn't exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
 
-def compare_excel_files(file1, file2):
-    # Load the workbooks
-    wb1 = openpyxl.load_workbook(file1)
-    wb2 = openpyxl.load_workbook(file2)
-
-    # Get all sheet names
-    sheets1 = wb1.sheetnames
-    sheets2 = wb2.sheetnames
-
-    # Check if both workbooks have the same sheets
-    if sheets1 != sheets2:
-        return False
-
-    # Iterate through each sheet
-    for sheet_name in sheets1:
-        ws1 = wb1[sheet_name]
-        ws2 = wb2[sheet_name]
-
-        # Iterate through each cell in the sheet
-        for row in ws1.iter_rows():
-            for cell in row:
-                cell_address = cell.coordinate
-
-                differences = []
-                if ws1[cell_address].value != ws2[cell_address].value:
-                    differences.append(f"Value: {ws1[cell_address].value} != {ws2[cell_address].value}")
-                if (
-                    ws1[cell_address].font.name != ws2[cell_address].font.name
-                    or ws1[cell_address].font.size != ws2[cell_address].font.size
-                    or ws1[cell_address].font.bold != ws2[cell_address].font.bold
-                    or ws1[cell_address].font.italic != ws2[cell_address].font.italic
-                ):
-                    differences.append(f"Font: {ws1[cell_address].font} != {ws2[cell_address].font}")
-                if (
-                    ws1[cell_address].fill.start_color.index != ws2[cell_address].fill.start_color.index
-                    or ws1[cell_address].fill.end_color.index != ws2[cell_address].fill.end_color.index
-                ):
-                    differences.append(f"Fill: {ws1[cell_address].fill} != {ws2[cell_address].fill}")
-                if (
-                    ws1[cell_address].border.left.style != ws2[cell_address].border.left.style
-                    or ws1[cell_address].border.right.style != ws2[cell_address].border.right.style
-                    or ws1[cell_address].border.top.style != ws2[cell_address].border.top.style
-                    or ws1[cell_address].border.bottom.style != ws2[cell_address].border.bottom.style
-                ):
-                    differences.append(f"Border: {ws1[cell_address].border} != {ws2[cell_address].border}")
-                if (
-                    ws1[cell_address].alignment.horizontal != ws2[cell_address].alignment.horizontal
-                    or ws1[cell_address].alignment.vertical != ws2[cell_address].alignment.vertical
-                ):
-                    differences.append(f"Alignment: {ws1[cell_address].alignment} != {ws2[cell_address].alignment}")
-
-                if differences:
-                    return False
-
-    return True
-
-
-metadata_manager = MetadataManager()
-
-for metadata_name in metadata_manager.metadata_type_names:
-    filename = f"excel_sheets/{metadata_name.capitalize()}_metadata.xlsx"
-    print(f"Writing {metadata_name} outline to {filename}")
-    if os.path.exists(filename):
-        filename2 = f"excel_sheets/{metadata_name.capitalize()}_metadata2.xlsx"
-        metadata_manager.write_metadata_outline_to_excel(metadata_name_or_class=metadata_name, filename=filename2)
-        are_identical = compare_excel_files(filename, filename2)
-        if are_identical:
-            print("they're the same")
-            os.remove(filename2)
+
+def outline_path(metadata_name: str, excel_dir: str = EXCEL_DIR) -> str:
+    return os.path.join(excel_dir, f"{metadata_name.capitalize()}_metadata.xlsx")
+
+
+def input_fingerprint(metadata_name: str, metadata_manager: Optional[MetadataManager] = None) -> str:
+    """
+    The SHA-256 of what the outline of a metadata type is written from: the module of its pydantic schema and the
+    WRITER_MODULES. Other modules of the package, and this script, are left out so that changing them doesn't make
+    every outline out of date.
+    """
+    metadata_manager = metadata_manager or MetadataManager()
+    schema = metadata_manager.metadata_class_from_name(metadata_name)
+    paths = [sys.modules[schema.__module__].__file__, *(os.path.join(PACKAGE_DIR, path) for path in WRITER_MODULES)]
+    digest = hashlib.sha256(metadata_name.encode())
+    for path in paths:
+        digest.update(f"\0{os.path.relpath(path, PACKAGE_DIR)}\0".encode())
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def write_outline(metadata_name: str, filename: str) -> Tuple[str, str]:
+    """Write the outline of a metadata type to filename, returning filename and its workbook_fingerprint"""
+    MetadataManager().write_metadata_outline_to_excel(metadata_name_or_class=metadata_name, filename=filename)
+    return filename, workbook_fingerprint(filename)
+
+
+def load_manifest(manifest_path: str = MANIFEST_FILE) -> Dict[str, Dict[str, str]]:
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as file:
+        return json.load(file)
+
+
+def generate(
+    metadata_names: Optional[List[str]] = None,
+    force: bool = False,
+    jobs: Optional[int] = None,
+    excel_dir: str = EXCEL_DIR,
+    manifest_path: str = MANIFEST_FILE,
+) -> List[str]:
+    """
+    Write the outlines that may be out of date, or all of them if force, in parallel, replacing the committed outlines
+    that differ from them.
+
+    Args:
+        metadata_names (Optional[List[str]]): The metadata types to consider, by default all of them.
+        force (bool): Write the outlines even if their inputs haven't changed.
+        jobs (Optional[int]): How many outlines to write at once, by default the number of CPUs.
+
+    Returns:
+        List[str]: The metadata types whose outlines were replaced.
+
+    Raises:
+        RuntimeError: If any outline failed to be written, after the others have been written and recorded.
+    """
+    metadata_manager = MetadataManager()
+    if metadata_names is None:
+        metadata_names = metadata_manager.metadata_type_names
+    os.makedirs(excel_dir, exist_ok=True)
+
+    manifest = load_manifest(manifest_path)
+    to_write = {}
+    for metadata_name in metadata_names:
+        fingerprint = input_fingerprint(metadata_name, metadata_manager)
+        recorded = manifest.get(metadata_name, {})
+        output_fingerprint = file_fingerprint(outline_path(metadata_name, excel_dir))
+        if force or recorded.get("input") != fingerprint or recorded.get("output") != output_fingerprint:
+            to_write[metadata_name] = fingerprint
         else:
-            print("updating")
-            os.remove(filename)
-            os.rename(filename2, filename)
-    else:
-        metadata_manager.write_metadata_outline_to_excel(metadata_name_or_class=metadata_name, filename=filename)
-    print()
+            print(f"{outline_path(metadata_name, excel_dir)} is up to date")
+
+    updated, failures = [], {}
+    if len(to_write):
+        with (
+            tempfile.TemporaryDirectory(dir=excel_dir) as staging_dir,
+            ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count(), len(to_write))) as executor,
+        ):
+            futures = {
+                metadata_name: executor.submit(write_outline, metadata_name, outline_path(metadata_name, staging_dir))
+                for metadata_name in to_write
+            }
+            for metadata_name, future in futures.items():
+                filename = outline_path(metadata_name, excel_dir)
+                try:
+                    written, fingerprint = future.result()
+                except Exception as e:
+                    failures[metadata_name] = str(e)
+                    continue
+                if os.path.exists(filename) and workbook_fingerprint(filename) == fingerprint:
+                    print(f"{filename} is unchanged")
+                else:
+                    print(f"Updating {filename}")
+                    os.replace(written, filename)
+                    updated.append(metadata_name)
+                manifest[metadata_name] = {"input": to_write[metadata_name], "output": file_fingerprint(filename)}
+
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+        file.write("\n")
+    if len(failures):
+        details = "\n".join(f"{metadata_name}: {error}" for metadata_name, error in failures.items())
+        raise RuntimeError(f"Failed to write the outlines of {sorted(failures)}\n{details}")
+    return updated
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Write the Excel outline of each metadata type to excel_sheets")
+    parser.add_argument("metadata_names", nargs="*", help="Metadata types to consider, by default all of them")
+    parser.add_argument("--force", action="store_true", help="Write even the outlines whose inputs haven't changed")
+    parser.add_argument("--jobs", type=int, default=None, help="How many outlines to write at once")
+    args = parser.parse_args(argv)
+    try:
+        generate(args.metadata_names or None, force=args.force, jobs=args.jobs)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
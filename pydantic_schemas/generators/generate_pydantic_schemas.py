@@ -1,69 +1,131 @@
+"""
+Generate the pydantic schemas from the JSON schemas listed in json_to_python_config.yaml.
+
+Run from the root of the repository with
+
+    python pydantic_schemas/generators/generate_pydantic_schemas.py
+
+Each JSON schema is converted by datamodel-codegen and then post-processed to add the metadata type and version.
+Only schemas that have changed are regenerated: the inputs of each output, meaning the JSON schema, every file it
+refers to through $ref, directly or not, its entry in the config and this script, are hashed and recorded in
+MANIFEST_FILE along with a hash of the output written. An output is up to date if neither hash has changed since.
+Outputs that are not are generated in parallel, each by its own datamodel-codegen process.
+
+Pass --force to regenerate everything, --jobs to set how many to generate at once, or the names of config sections,
+such as microdata, to only consider those.
+"""
+
+import argparse
+import hashlib
+import json
 import os
 import re
-from subprocess import run
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
 
 import yaml
 
 SCHEMA_DIR = "schemas"
 OUTPUT_DIR = os.path.join("pydantic_schemas")
+CONFIG_FILE = "json_to_python_config.yaml"
+MANIFEST_FILE = os.path.join("pydantic_schemas", "generators", "schema_fingerprints.json")
 PYTHON_VERSION = "3.11"
 BASE_CLASS = ".utils.schema_base_model.SchemaBaseModel"
 
+CODEGEN_ARGS = [
+    "--input-file-type",
+    "jsonschema",
+    "--reuse-model",
+    "--use-schema-description",
+    "--target-python-version",
+    PYTHON_VERSION,
+    "--use-double-quotes",
+    # "--wrap-string-literal",
+    "--collapse-root-models",
+    "--disable-timestamp",
+    "--base-class",
+    BASE_CLASS,
+    "--output-model-type",
+    "pydantic_v2.BaseModel",
+]
 
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
-
-with open("json_to_python_config.yaml") as file:
-    data = yaml.safe_load(file)
-
-# for json_file, (python_file, metadata_type, schema_class_name) in INPUTS_TO_OUTPUTS.items():
-for section, details in data.items():
-    json_file = details["json_file"]
-    python_file = details["python_file"]
-    model_name = details["model_name"]
-    version = details["version"]
-
-    print(f"Generating pydantic schema for {json_file}")
-    input_path = os.path.join(SCHEMA_DIR, json_file)
-    output_path = os.path.join(OUTPUT_DIR, python_file).replace("-", "_")
-    run(
-        [
-            "datamodel-codegen",
-            "--input",
-            input_path,
-            "--input-file-type",
-            "jsonschema",
-            "--reuse-model",
-            "--use-schema-description",
-            "--target-python-version",
-            PYTHON_VERSION,
-            "--use-double-quotes",
-            # "--wrap-string-literal",
-            "--collapse-root-models",
-            "--disable-timestamp",
-            "--base-class",
-            BASE_CLASS,
-            "--output-model-type",
-            "pydantic_v2.BaseModel",
-            "--output",
-            output_path,
-        ],
-        check=False,
-    )
 
-    with open(output_path) as file:
-        content = file.read()
+def _iter_refs(node: Any):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "$ref" and isinstance(value, str):
+                yield value
+            else:
+                yield from _iter_refs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _iter_refs(value)
+
+
+def referenced_files(json_file: str, schema_dir: str = SCHEMA_DIR) -> List[str]:
+    """
+    The JSON schema and every file it refers to through $ref, directly or through other files.
+
+    References within a file, such as '#/definitions/AltLang', are ignored, as are the fragments of references to
+    other files.
 
-    # version=version: f"""class {model_name}(SchemaBaseModel):\n{match.group(1)}\n    _metadata_type__:str = PrivateAttr("{section}")\n    _metadata_type_version__:str = PrivateAttr("{version}") """,
-    # version = f"""class {model_name}(SchemaBaseModel):\n{match.group(1)}\n\n    def __init__(self, **kwargs):\n        super().__init__(**kwargs)\n        self._metadata_type__ = "{section}"\n        self._metadata_type_version__ = "{version}"\n"""
+    Returns:
+        List[str]: The paths of the files relative to schema_dir, sorted.
+    """
+    found: Set[str] = set()
+    to_visit = [os.path.normpath(json_file)]
+    while len(to_visit):
+        relative_path = to_visit.pop()
+        if relative_path in found:
+            continue
+        found.add(relative_path)
+        with open(os.path.join(schema_dir, relative_path)) as file:
+            schema = json.load(file)
+        for ref in _iter_refs(schema):
+            ref_file = ref.split("#")[0]
+            if ref_file and "://" not in ref_file:
+                to_visit.append(os.path.normpath(os.path.join(os.path.dirname(relative_path), ref_file)))
+    return sorted(found)
+
+
+def input_fingerprint(section: str, details: Dict[str, str], schema_dir: str = SCHEMA_DIR) -> str:
+    """The SHA-256 of everything the output of a config section is generated from"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"section": section, **details, "codegen_args": CODEGEN_ARGS}, sort_keys=True).encode())
+    with open(__file__, "rb") as file:
+        digest.update(file.read())
+    for relative_path in referenced_files(details["json_file"], schema_dir):
+        digest.update(f"\0{relative_path}\0".encode())
+        with open(os.path.join(schema_dir, relative_path), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: str) -> Optional[str]:
+    """The SHA-256 of a file, None if it doesn't exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def output_path_for(details: Dict[str, str], output_dir: str = OUTPUT_DIR) -> str:
+    return os.path.join(output_dir, details["python_file"].replace("-", "_"))
+
+
+def postprocess(content: str, section: str, model_name: str, version: str) -> str:
+    """
+    Add the metadata type and version to the generated schema, and use EnumWithValueOrKey for its enums.
+    """
+    private_attributes = (
+        f'    _metadata_type__:str = PrivateAttr("{section}")\n'
+        f'    _metadata_type_version__:str = PrivateAttr("{version}") '
+    )
     updated_content = re.sub(
-        f'class {model_name}\(SchemaBaseModel\):\n(    """\n.*\n    """)',  #
-        lambda match,
-        model_name=model_name,
-        section=section,
-        # version=version: f"""class {model_name}(SchemaBaseModel):\n{match.group(1)}\n    _metadata_type__ = "{section}"\n    _metadata_type_version__ = "{version}" """,
-        # version = version: f"""class {model_name}(SchemaBaseModel):\n{match.group(1)}\n\n    def __init__(self, **kwargs):\n        super().__init__(**kwargs)\n        self._metadata_type__ = "{section}"\n        self._metadata_type_version__ = "{version}"\n""",
-        version=version: f"""class {model_name}(SchemaBaseModel):\n{match.group(1)}\n    _metadata_type__:str = PrivateAttr("{section}")\n    _metadata_type_version__:str = PrivateAttr("{version}") """,
+        rf'class {model_name}\(SchemaBaseModel\):\n(    """\n.*\n    """)',
+        lambda match: f"class {model_name}(SchemaBaseModel):\n{match.group(1)}\n{private_attributes}",
         content,
     )
 
@@ -82,7 +144,151 @@ for section, details in data.items():
     )
 
     # replace (Enum) with (EnumWithValueOrKey)
-    updated_content = re.sub(r"\(Enum\)", "(EnumWithValueOrKey)", updated_content)
+    return re.sub(r"\(Enum\)", "(EnumWithValueOrKey)", updated_content)
+
+
+def run_codegen(input_path: str, output_path: str) -> None:
+    """Run datamodel-codegen on one JSON schema, raising CalledProcessError if it fails"""
+    subprocess.run(
+        ["datamodel-codegen", "--input", input_path, *CODEGEN_ARGS, "--output", output_path],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+def generate_section(
+    section: str,
+    details: Dict[str, str],
+    schema_dir: str = SCHEMA_DIR,
+    output_dir: str = OUTPUT_DIR,
+    codegen: Callable[[str, str], None] = run_codegen,
+) -> str:
+    """Generate the pydantic schema of one config section, returning the path written"""
+    input_path = os.path.join(schema_dir, details["json_file"])
+    output_path = output_path_for(details, output_dir)
+    codegen(input_path, output_path)
 
+    with open(output_path) as file:
+        content = file.read()
     with open(output_path, "w") as file:
-        file.write(updated_content)
+        file.write(postprocess(content, section, details["model_name"], details["version"]))
+    return output_path
+
+
+def load_manifest(manifest_path: str = MANIFEST_FILE) -> Dict[str, Dict[str, str]]:
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as file:
+        return json.load(file)
+
+
+def stale_sections(
+    config: Dict[str, Dict[str, str]],
+    manifest: Dict[str, Dict[str, str]],
+    schema_dir: str = SCHEMA_DIR,
+    output_dir: str = OUTPUT_DIR,
+) -> Dict[str, str]:
+    """
+    The config sections whose outputs are out of date, because their inputs or the output itself changed since they
+    were last generated, or the output is missing.
+
+    Returns:
+        Dict[str, str]: The input fingerprint of each stale section.
+    """
+    stale = {}
+    for section, details in config.items():
+        fingerprint = input_fingerprint(section, details, schema_dir)
+        recorded = manifest.get(section, {})
+        output_fingerprint = file_fingerprint(output_path_for(details, output_dir))
+        if (
+            recorded.get("input") != fingerprint
+            or output_fingerprint is None
+            or recorded.get("output") != output_fingerprint
+        ):
+            stale[section] = fingerprint
+    return stale
+
+
+def generate(
+    sections: Optional[List[str]] = None,
+    force: bool = False,
+    jobs: Optional[int] = None,
+    config_file: str = CONFIG_FILE,
+    schema_dir: str = SCHEMA_DIR,
+    output_dir: str = OUTPUT_DIR,
+    manifest_path: str = MANIFEST_FILE,
+    codegen: Callable[[str, str], None] = run_codegen,
+) -> List[str]:
+    """
+    Regenerate the pydantic schemas that are out of date, or all of them if force, in parallel.
+
+    Args:
+        sections (Optional[List[str]]): The config sections to consider, by default all of them.
+        force (bool): Regenerate the sections even if they are up to date.
+        jobs (Optional[int]): How many schemas to generate at once, by default the number of CPUs.
+        codegen (Callable[[str, str], None]): Converts the JSON schema at an input path to Python at an output path.
+
+    Returns:
+        List[str]: The sections that were regenerated.
+
+    Raises:
+        RuntimeError: If any section failed to generate, after the others have been generated and recorded.
+    """
+    with open(config_file) as file:
+        config = yaml.safe_load(file)
+    if sections is not None:
+        unknown = set(sections) - set(config)
+        if len(unknown):
+            raise ValueError(f"Unknown sections {sorted(unknown)}, expected some of {list(config)}")
+        config = {section: config[section] for section in sections}
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = load_manifest(manifest_path)
+    if force:
+        to_generate = {section: input_fingerprint(section, details, schema_dir) for section, details in config.items()}
+    else:
+        to_generate = stale_sections(config, manifest, schema_dir, output_dir)
+    for section in config:
+        if section not in to_generate:
+            print(f"{config[section]['json_file']} is up to date")
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        futures = {
+            section: executor.submit(generate_section, section, config[section], schema_dir, output_dir, codegen)
+            for section in to_generate
+        }
+        for section, future in futures.items():
+            try:
+                output_path = future.result()
+            except (OSError, subprocess.CalledProcessError) as e:
+                failures[section] = getattr(e, "stderr", None) or str(e)
+                continue
+            print(f"Generated pydantic schema for {config[section]['json_file']}")
+            manifest[section] = {"input": to_generate[section], "output": file_fingerprint(output_path)}
+
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+        file.write("\n")
+    if len(failures):
+        details = "\n".join(f"{section}: {error}" for section, error in failures.items())
+        raise RuntimeError(f"Failed to generate {sorted(failures)}\n{details}")
+    return [section for section in to_generate if section not in failures]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate the pydantic schemas from the JSON schemas")
+    parser.add_argument("sections", nargs="*", help="Config sections to consider, by default all of them")
+    parser.add_argument("--force", action="store_true", help="Regenerate even the schemas that are up to date")
+    parser.add_argument("--jobs", type=int, default=None, help="How many schemas to generate at once")
+    args = parser.parse_args(argv)
+    try:
+        generate(args.sections or None, force=args.force, jobs=args.jobs)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
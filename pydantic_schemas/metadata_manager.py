@@ -1,10 +1,32 @@
+import contextlib
+import copy
+import functools
 import importlib.metadata
+import itertools
+import json
+import logging
+import os
 import warnings
-from copy import copy
-from typing import List, Optional, Type, Union
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    IO,
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
 
-from openpyxl import load_workbook
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from pydantic_core import PydanticCustomError, from_json
+from pydantic_core.core_schema import ErrorType
 
 from . import (
     document_schema,
@@ -18,21 +40,173 @@ from . import (
     table_schema,
     video_schema,
 )
-from .utils.excel_to_pydantic import (
-    excel_doc_to_pydantic,
-    excel_single_sheet_to_pydantic,
-)
-from .utils.pydantic_to_excel import (
-    parse_version,
-    write_across_many_sheets,
-    write_to_single_sheet,
-)
+from .utils.debug_logging import summarize
+from .utils.json_stream import _batch_adapter, _list_item_class
+from .utils.jsonl import JsonlRecordError, iter_jsonl_lines
+from .utils.memory_profiling import MemoryProfiler
+from .utils.parallel import chunks, imap_ordered
 from .utils.quick_start import make_skeleton
+from .utils.read_cache import ReadCache
 from .utils.schema_base_model import SchemaBaseModel
-from .utils.utils import merge_dicts, standardize_keys_in_dict
+from .utils.templates import make_template_class
+from .utils.tracing import get_tracer, traced
+from .utils.utils import (
+    get_private_attr_default,
+    merge_dicts,
+    normalize_model_dump,
+    standardize_keys_in_dict,
+)
 
 __version__ = importlib.metadata.version("metadataschemas")
 
+logger = logging.getLogger(__name__)
+
+
+def _excel_writer(writer_name: str) -> Callable:
+    """
+    Look up a writer function in utils.pydantic_to_excel by name.
+
+    The Excel stack (pandas, numpy, openpyxl) is imported here rather than at module level so that validating
+    metadata with the manager does not pay for it.
+    """
+    from .utils import pydantic_to_excel
+
+    return getattr(pydantic_to_excel, writer_name)
+
+
+def _excel_reader(reader_name: str) -> Callable:
+    """Look up a reader function in utils.excel_to_pydantic by name, importing the Excel stack on first use."""
+    from .utils import excel_to_pydantic
+
+    return getattr(excel_to_pydantic, reader_name)
+
+
+def _normalize_metadata_name(metadata_name: str) -> str:
+    return metadata_name.lower().replace("-", "_").replace(" ", "_")
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize the dates, times and numpy numbers that pandas reads from cells"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# the JSON dump of the outline of each class, used to fill in lenient JSON
+_OUTLINE_DUMP_CACHE: Dict[Type[BaseModel], Dict[str, Any]] = {}
+
+
+def _empty_outline(outline: Any) -> Any:
+    """An outline without the single blank element of its lists, or the {"": ""} of its free form dictionaries"""
+    if isinstance(outline, list):
+        return []
+    if isinstance(outline, dict):
+        if outline == {"": ""}:
+            return {}
+        return {k: _empty_outline(v) for k, v in outline.items()}
+    return outline
+
+
+def _fill_in_from_outline(outline: Any, data: Any) -> Any:
+    """
+    Fill in what data lacks from the dump of an outline of its type, as the Excel reader does with empty cells.
+
+    Values in data are kept whatever their type, missing and null values are taken from the outline, and each
+    element of a list of objects is filled in from the blank element of the outline's list.
+    """
+    if data is None:
+        return _empty_outline(outline)
+    if isinstance(outline, dict) and isinstance(data, dict) and outline != {"": ""}:
+        filled = {k: _fill_in_from_outline(outline[k], v) if k in outline else v for k, v in data.items()}
+        for k, v in outline.items():
+            if k not in filled:
+                filled[k] = _empty_outline(v)
+        return filled
+    if isinstance(outline, list) and isinstance(data, list) and len(outline) and isinstance(outline[0], dict):
+        return [_fill_in_from_outline(outline[0], v) for v in data]
+    return data
+
+
+class _MetadataTypeEntry:
+    """
+    Everything the manager needs about one metadata type or template, resolved once so that every lookup by class,
+    type name, alias or template uid is a single dictionary access.
+
+    Attributes:
+        metadata_name (str): The standardized metadata type name, or for templates the title of the class.
+        schema (type[BaseModel]): The pydantic class.
+        writer_name (str): Name of the writer in utils.pydantic_to_excel.
+        reader_name (Optional[str]): Name of the reader in utils.excel_to_pydantic, None if the metadata type of a
+            template is not one of the standard types.
+        is_standard (bool): True for the ten standard metadata types.
+        metadata_type, metadata_type_version, template_uid, template_name (Optional[str]): The private attribute
+            defaults of the schema, as written to cell C1 of an Excel file.
+    """
+
+    def __init__(
+        self,
+        metadata_name: str,
+        schema: Type[BaseModel],
+        writer_name: str,
+        reader_name: Optional[str],
+        is_standard: bool,
+    ):
+        self.metadata_name = metadata_name
+        self.schema = schema
+        self.writer_name = writer_name
+        self.reader_name = reader_name
+        self.is_standard = is_standard
+        self.template_definition = None
+        self.metadata_type = get_private_attr_default(schema, "_metadata_type__")
+        self.metadata_type_version = get_private_attr_default(schema, "_metadata_type_version__")
+        self.template_uid = get_private_attr_default(schema, "_template_uid__")
+        self.template_name = get_private_attr_default(schema, "_template_name__")
+
+    @property
+    def writer(self) -> Callable:
+        return _excel_writer(self.writer_name)
+
+    @property
+    def reader(self) -> Callable:
+        return _excel_reader(self.reader_name)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.metadata_name!r}, {self.schema.__name__})"
+
+
+def _profiling(memory_profiler: Optional[MemoryProfiler]) -> ContextManager:
+    """Profile the memory of the phases run in the block if a profiler is given, otherwise do nothing"""
+    if memory_profiler is None:
+        return contextlib.nullcontext()
+    # import the Excel modules first so that importing them is not counted against the first phase
+    _excel_writer("write_to_single_sheet")
+    _excel_reader("excel_single_sheet_to_pydantic")
+    return memory_profiler.profile()
+
+
+def _build_standard_registry(
+    type_to_schema: Dict[str, Type[BaseModel]],
+    type_to_writer: Dict[str, str],
+    type_to_reader: Dict[str, str],
+    aliases: Dict[str, str],
+) -> Tuple[Dict[str, _MetadataTypeEntry], Dict[Type[BaseModel], _MetadataTypeEntry]]:
+    by_name = {
+        name: _MetadataTypeEntry(
+            metadata_name=name,
+            schema=schema,
+            writer_name=type_to_writer[name],
+            reader_name=type_to_reader[name],
+            is_standard=True,
+        )
+        for name, schema in type_to_schema.items()
+    }
+    by_class = {entry.schema: entry for entry in by_name.values()}
+    for alias, name in aliases.items():
+        by_name[alias] = by_name[name]
+    return by_name, by_class
+
 
 class MetadataManager:
     """
@@ -57,32 +231,55 @@ class MetadataManager:
 
     _SCHEMA_TO_TYPE = {v: k for k, v in _TYPE_TO_SCHEMA.items()}
 
+    # writers and readers are stored by name and resolved with _excel_writer / _excel_reader when needed
     _TYPE_TO_WRITER = {
-        "document": write_across_many_sheets,
-        "geospatial": write_across_many_sheets,
-        "image": write_across_many_sheets,
-        "resource": write_to_single_sheet,
-        "script": write_across_many_sheets,
-        "microdata": write_across_many_sheets,
-        "table": write_across_many_sheets,
-        "indicator": write_across_many_sheets,
-        "indicators_db": write_to_single_sheet,  # one sheet
-        "video": write_to_single_sheet,  # one sheet
+        "document": "write_across_many_sheets",
+        "geospatial": "write_across_many_sheets",
+        "image": "write_across_many_sheets",
+        "resource": "write_to_single_sheet",
+        "script": "write_across_many_sheets",
+        "microdata": "write_across_many_sheets",
+        "table": "write_across_many_sheets",
+        "indicator": "write_across_many_sheets",
+        "indicators_db": "write_to_single_sheet",  # one sheet
+        "video": "write_to_single_sheet",  # one sheet
     }
 
     _TYPE_TO_READER = {
-        "document": excel_doc_to_pydantic,
-        "geospatial": excel_doc_to_pydantic,
-        "image": excel_doc_to_pydantic,
-        "resource": excel_single_sheet_to_pydantic,
-        "script": excel_doc_to_pydantic,
-        "microdata": excel_doc_to_pydantic,
-        "table": excel_doc_to_pydantic,
-        "indicator": excel_doc_to_pydantic,
-        "indicators_db": excel_single_sheet_to_pydantic,  # one sheet
-        "video": excel_single_sheet_to_pydantic,  # one sheet
+        "document": "excel_doc_to_pydantic",
+        "geospatial": "excel_doc_to_pydantic",
+        "image": "excel_doc_to_pydantic",
+        "resource": "excel_single_sheet_to_pydantic",
+        "script": "excel_doc_to_pydantic",
+        "microdata": "excel_doc_to_pydantic",
+        "table": "excel_doc_to_pydantic",
+        "indicator": "excel_doc_to_pydantic",
+        "indicators_db": "excel_single_sheet_to_pydantic",  # one sheet
+        "video": "excel_single_sheet_to_pydantic",  # one sheet
+    }
+
+    _METADATA_NAME_ALIASES = {
+        "survey": "microdata",
+        "survey_microdata": "microdata",
+        "timeseries": "indicator",
+        "timeseries_db": "indicators_db",
+        "indicator_db": "indicators_db",
+    }
+
+    # the lists that hold most of a large document of each type, by their path of fields, see validate_in_parallel
+    _TYPE_TO_LARGE_LIST_FIELDS = {
+        "microdata": ("variables", "data_files", "variable_groups"),
+        "indicator": ("data_structure",),
+        "geospatial": ("description.feature_catalogue.featureType",),
     }
 
+    # standard types are keyed by name (including aliases) and by class, templates built by create_template_class are
+    # added by class and uid
+    _REGISTRY_BY_NAME, _REGISTRY_BY_CLASS = _build_standard_registry(
+        _TYPE_TO_SCHEMA, _TYPE_TO_WRITER, _TYPE_TO_READER, _METADATA_NAME_ALIASES
+    )
+    _REGISTRY_BY_TEMPLATE_UID: Dict[str, _MetadataTypeEntry] = {}
+
     def metadata_class_from_name(self, metadata_name: str) -> Type[BaseModel]:
         """
         Retrieve the pydantic model class for the given metadata type.
@@ -102,9 +299,7 @@ class MetadataManager:
             >>> manager = MetadataManager()
             >>> document_class = manager.metadata_class_from_name("document")
         """
-        metadata_name = self.standardize_metadata_name(metadata_name)
-        schema = self._TYPE_TO_SCHEMA[metadata_name]
-        return copy(schema)
+        return self._entry_from_name(metadata_name).schema
 
     @property
     def metadata_type_names(self) -> List[str]:
@@ -131,16 +326,132 @@ class MetadataManager:
             >>> manager = MetadataManager()
             >>> standardized_name = manager.standardize_metadata_name("Document")
         """
-        metadata_name = metadata_name.lower()
-        metadata_name = metadata_name.replace("-", "_").replace(" ", "_")
-        if metadata_name == "survey" or metadata_name == "survey_microdata":
-            metadata_name = "microdata"
-        elif metadata_name == "timeseries":
-            metadata_name = "indicator"
-        elif metadata_name == "timeseries_db" or metadata_name == "indicator_db":
-            metadata_name = "indicators_db"
-        self._raise_if_unsupported_metadata_name(metadata_name=metadata_name)
-        return metadata_name
+        return self._entry_from_name(metadata_name).metadata_name
+
+    def _entry_from_name(self, metadata_name: str) -> _MetadataTypeEntry:
+        """Look up a standard metadata type by name or alias, raising a ValueError if it is not supported."""
+        normalized_name = _normalize_metadata_name(metadata_name)
+        entry = self._REGISTRY_BY_NAME.get(normalized_name)
+        if entry is None:
+            self._raise_if_unsupported_metadata_name(metadata_name=normalized_name)
+        return entry
+
+    def _resolve(self, metadata_name_or_class: Union[str, Type[BaseModel], BaseModel]) -> _MetadataTypeEntry:
+        """
+        Resolve a metadata type name, alias, template uid, class or instance to its registry entry.
+
+        Names and aliases of the standard metadata types are looked up before template uids, so a template can not
+        take the place of a standard type. Classes that are not one of the standard metadata types are treated as
+        templates. Only those built by create_template_class are registered, other classes get a new entry each time
+        so that they are not kept alive by the registry.
+        """
+        if isinstance(metadata_name_or_class, str):
+            entry = self._REGISTRY_BY_NAME.get(_normalize_metadata_name(metadata_name_or_class))
+            if entry is None:
+                entry = self._REGISTRY_BY_TEMPLATE_UID.get(metadata_name_or_class)
+            if entry is None:
+                entry = self._entry_from_name(metadata_name_or_class)
+            return entry
+        if isinstance(metadata_name_or_class, type):
+            schema = metadata_name_or_class
+        else:
+            schema = type(metadata_name_or_class)
+        entry = self._REGISTRY_BY_CLASS.get(schema)
+        if entry is None:
+            entry = self._template_entry(schema)
+        return entry
+
+    def _template_entry(
+        self,
+        schema: Type[BaseModel],
+        metadata_name: Optional[str] = None,
+        writer_name: Optional[str] = None,
+    ) -> _MetadataTypeEntry:
+        """
+        Templates are written to a single sheet by default, named after the class title, and read with the reader of
+        their _metadata_type__ if that is a standard type.
+        """
+        metadata_type = get_private_attr_default(schema, "_metadata_type__")
+        standard_entry = None
+        if metadata_type is not None:
+            standard_entry = self._REGISTRY_BY_NAME.get(_normalize_metadata_name(metadata_type))
+        return _MetadataTypeEntry(
+            metadata_name=metadata_name or schema.model_config.get("title") or schema.__name__,
+            schema=schema,
+            writer_name=writer_name or "write_to_single_sheet",
+            reader_name=standard_entry.reader_name if standard_entry is not None else None,
+            is_standard=False,
+        )
+
+    def _register_template_class(
+        self,
+        schema: Type[BaseModel],
+        metadata_name: str,
+        writer_name: str,
+        template_definition: Dict[str, Any],
+    ) -> _MetadataTypeEntry:
+        entry = self._template_entry(schema, metadata_name=metadata_name, writer_name=writer_name)
+        entry.template_definition = template_definition
+        self._REGISTRY_BY_CLASS[schema] = entry
+        self._REGISTRY_BY_TEMPLATE_UID[entry.template_uid] = entry
+        return entry
+
+    def create_template_class(self, template_definition: Dict[str, Any]) -> Type[SchemaBaseModel]:
+        """
+        Create the pydantic class for a template, a subset of the fields of one of the standard metadata types with
+        optional labels. Template classes are cached by their uid so building the same template again, or reading an
+        Excel file written from it, reuses the class and its validators.
+
+        Args:
+            template_definition (Dict[str, Any]): A dictionary with keys
+                uid (str): The unique id of the template
+                name (str): The name of the template
+                metadata_type (str): The standard metadata type the template is based on, such as 'microdata'
+                fields (List[str]): Dotted paths of the fields to keep, like "study_desc.title_statement.title"
+                labels (Optional[Dict[str, str]]): Field titles keyed by dotted path
+
+        Returns:
+            type[SchemaBaseModel]: The template class, written to Excel in the same layout as its metadata type.
+
+        Raises:
+            ValueError: If the metadata type is not supported, a field path does not exist or a different template with
+                the same uid has already been created.
+
+        Example:
+            >>> from pydantic_schemas.metadata_manager import MetadataManager
+            >>> manager = MetadataManager()
+            >>> template_class = manager.create_template_class(
+            ...     {
+            ...         "uid": "my-template-uid",
+            ...         "name": "Minimal survey",
+            ...         "metadata_type": "microdata",
+            ...         "fields": ["study_desc.title_statement.idno", "study_desc.title_statement.title"],
+            ...         "labels": {"study_desc.title_statement.title": "Survey title"},
+            ...     }
+            ... )
+        """
+        template_uid = template_definition["uid"]
+        cached_entry = self._REGISTRY_BY_TEMPLATE_UID.get(template_uid)
+        if cached_entry is not None:
+            if cached_entry.template_definition != template_definition:
+                raise ValueError(f"A different template with the uid '{template_uid}' has already been created")
+            return cached_entry.schema
+
+        base_entry = self._entry_from_name(template_definition["metadata_type"])
+        template_class = make_template_class(
+            base_entry.schema,
+            fields=template_definition["fields"],
+            template_uid=template_uid,
+            template_name=template_definition["name"],
+            labels=template_definition.get("labels"),
+        )
+        entry = self._register_template_class(
+            template_class,
+            metadata_name=template_definition["name"],
+            writer_name=base_entry.writer_name,
+            template_definition=copy.deepcopy(template_definition),
+        )
+        return entry.schema
 
     def create_metadata_outline(
         self, metadata_name_or_class: Union[str, Type[BaseModel]], debug: bool = False
@@ -150,7 +461,8 @@ class MetadataManager:
 
         Args:
             metadata_name_or_class (str or type[BaseModel]): The name of the metadata type or the metadata class.
-            debug (bool): If True, print debug information on the skeleton creation.
+            debug (bool): Unused, kept for backwards compatibility. Debug information is logged instead, see
+                utils/debug_logging.py.
 
         Returns:
             BaseModel: A pydantic model with the metadata schema and default values.
@@ -161,7 +473,7 @@ class MetadataManager:
             >>> document_skeleton = manager.create_metadata_outline("document")
         """
         if isinstance(metadata_name_or_class, str):
-            schema = self.metadata_class_from_name(metadata_name_or_class)
+            schema = self._resolve(metadata_name_or_class).schema
         else:
             schema = metadata_name_or_class
         return make_skeleton(schema, debug=debug)
@@ -181,34 +493,14 @@ class MetadataManager:
 
         If `metadata_name_or_class` is a string or is one of the standard metadata types (document,
         geospatial, image, indicator, indicators_db, microdata, resource, script, table, video),
-        it retrieves the corresponding metadata name, schema, and writer from the internal
-        mappings. Otherwise, it assumes this is a template and retrieves the title from the class,
+        it retrieves the corresponding metadata name, schema, and writer from the registry.
+        Otherwise, it assumes this is a template and retrieves the title from the class,
         and uses a default single page writer function.
         """
-        if (
-            isinstance(metadata_name_or_class, str)
-            or metadata_name_or_class in self._TYPE_TO_SCHEMA.values()
-            or type(metadata_name_or_class) in self._TYPE_TO_SCHEMA.values()
-        ):
-            if isinstance(metadata_name_or_class, str):
-                metadata_name = self.standardize_metadata_name(metadata_name_or_class)
-                schema = self._TYPE_TO_SCHEMA[metadata_name]
-            else:
-                metadata_type_from_class = (
-                    metadata_name_or_class._metadata_type__
-                    if isinstance(metadata_name_or_class._metadata_type__, str)
-                    else metadata_name_or_class._metadata_type__.default
-                )
-
-                metadata_name = self.standardize_metadata_name(metadata_type_from_class)
-                schema = metadata_name_or_class
-            writer = self._TYPE_TO_WRITER[metadata_name]
-        else:
-            writer = write_to_single_sheet
-            metadata_name = metadata_name_or_class.model_json_schema()["title"]
-            schema = metadata_name_or_class
-        return metadata_name, schema, writer
+        entry = self._resolve(metadata_name_or_class)
+        return entry.metadata_name, entry.schema, entry.writer
 
+    @traced("metadata_manager.write_metadata_outline_to_excel")
     def write_metadata_outline_to_excel(
         self,
         metadata_name_or_class: Union[str, Type[BaseModel]],
@@ -237,18 +529,10 @@ class MetadataManager:
         Outputs:
             An Excel file into which metadata can be entered
         """
-        # determine the metadata_name_or_class is a class instance or the actual class
-        if (
-            metadata_type is not None
-            and not isinstance(metadata_name_or_class, str)
-            and metadata_name_or_class not in self._TYPE_TO_SCHEMA.values()
-            and type(metadata_name_or_class) not in self._TYPE_TO_SCHEMA.values()
-        ):
-            metadata_type = self.standardize_metadata_name(metadata_type)
-            _, _, writer = self._get_name_schema_writer(metadata_type)
-            metadata_name, schema, _ = self._get_name_schema_writer(metadata_name_or_class)
-        else:
-            metadata_name, schema, writer = self._get_name_schema_writer(metadata_name_or_class)
+        entry = self._resolve(metadata_name_or_class)
+        metadata_name, schema, writer = entry.metadata_name, entry.schema, entry.writer
+        if metadata_type is not None and not entry.is_standard:
+            writer = self._entry_from_name(metadata_type).writer
         skeleton_model = self.create_metadata_outline(schema, debug=False)
 
         if filename is None:
@@ -258,9 +542,11 @@ class MetadataManager:
 
         if not str(filename).endswith(".xlsx"):
             filename += ".xlsx"
-        writer(filename, skeleton_model, title)
+        with get_tracer().span("metadata_manager.write", writer=writer.__name__):
+            writer(filename, skeleton_model, title)
         return filename
 
+    @traced("metadata_manager.save_metadata_to_excel")
     def save_metadata_to_excel(
         self,
         metadata_model: BaseModel,
@@ -268,6 +554,8 @@ class MetadataManager:
         title: Optional[str] = None,
         metadata_type: Optional[str] = None,
         verbose: bool = False,
+        memory_profiler: Optional[MemoryProfiler] = None,
+        embed_payload: bool = False,
     ) -> str:
         """
         Save an Excel document of the given metadata model.
@@ -279,7 +567,14 @@ class MetadataManager:
                 metadata_type (Optional[str]): The name of the metadata type such as 'geospatial', 'document', etc. Used if
                 the metadata_name_or_class is an instance of a template. The name is used to determine the number of sheets
                 in the Excel file.
-            verbose (bool): If True, print debug information on the file creation.
+            verbose (bool): Unused, kept for backwards compatibility. Debug information is logged instead, see
+                utils/debug_logging.py.
+            memory_profiler (Optional[MemoryProfiler]): If given, the memory used by each phase of the save is
+                recorded in it, see MemoryProfiler.result.
+            embed_payload (bool): Also embed a compact copy of the metadata in a hidden sheet, so that reading the
+                file back doesn't need to parse the sheets that haven't been edited. The copy is not visible in Excel
+                and makes the file larger, so only embed it in files that are read back by this library. Defaults to
+                False.
 
         Returns:
             str: filename of metadata file
@@ -287,32 +582,30 @@ class MetadataManager:
         Outputs:
             An Excel file containing the metadata from the pydantic model. This file can be updated as needed.
         """
-        if (
-            metadata_type is not None
-            # and metadata_model not in self._TYPE_TO_SCHEMA.values()
-            and type(metadata_model) not in self._TYPE_TO_SCHEMA.values()
-        ):
+        with _profiling(memory_profiler):
+            return self._save_metadata(metadata_model, filename, title, metadata_type, verbose, embed_payload)
+
+    def _save_metadata(
+        self,
+        metadata_model: BaseModel,
+        filename: Optional[str],
+        title: Optional[str],
+        metadata_type: Optional[str],
+        verbose: bool,
+        embed_payload: bool,
+    ) -> str:
+        entry = self._resolve(type(metadata_model))
+        metadata_name, schema, writer = entry.metadata_name, entry.schema, entry.writer
+        if metadata_type is not None and not entry.is_standard:
             try:
-                metadata_type = self.standardize_metadata_name(metadata_type)
-                _, _, writer = self._get_name_schema_writer(metadata_type)
-                metadata_name, schema, _ = self._get_name_schema_writer(type(metadata_model))
+                writer = self._entry_from_name(metadata_type).writer
             except ValueError:
                 warnings.warn(
                     f"metadata_type {metadata_type} is not a standard type" "falling back to write_to_single_sheet",
                     stacklevel=1,
                 )
-                writer = write_to_single_sheet
-                metadata_name = (
-                    metadata_model._metadata_type__
-                    if isinstance(metadata_model._metadata_type__, str)
-                    else metadata_model._metadata_type__.default
-                    if hasattr(metadata_model._metadata_type__, "default")
-                    and metadata_model._metadata_type__.default is not None
-                    else "Unknown"
-                )
-                schema = type(metadata_model)
-        else:
-            metadata_name, schema, writer = self._get_name_schema_writer(type(metadata_model))
+                writer = _excel_writer("write_to_single_sheet")
+                metadata_name = get_private_attr_default(metadata_model, "_metadata_type__") or "Unknown"
         skeleton_model = self.create_metadata_outline(metadata_name_or_class=schema, debug=False)
 
         if filename is None:
@@ -322,20 +615,28 @@ class MetadataManager:
         if title is None:
             title = f"{metadata_name.capitalize()} Metadata"
 
-        combined_dict = merge_dicts(
-            skeleton_model.model_dump(),
-            metadata_model.model_dump(exclude_none=False, exclude_unset=True, exclude_defaults=True),
-            skeleton_mode=True,
-        )
-        combined_dict = standardize_keys_in_dict(combined_dict)
-        new_ob = schema.model_validate(combined_dict)
-        writer(filename, new_ob, title, verbose=verbose)
+        tracer = get_tracer()
+        with tracer.span("metadata_manager.merge"):
+            combined_dict = merge_dicts(
+                skeleton_model.model_dump(),
+                metadata_model.model_dump(exclude_none=False, exclude_unset=True, exclude_defaults=True),
+                skeleton_mode=True,
+            )
+            # both dumps are of validated models, so rather than validating the merge into a new model, only to dump
+            # it again for the writer, it is brought into the shape of a dump of the schema and written directly
+            combined_dict = normalize_model_dump(schema, combined_dict)
+        with tracer.span("metadata_manager.write", writer=writer.__name__):
+            writer(filename, schema, title, verbose=verbose, ob_dict=combined_dict, embed_payload=embed_payload)
         return filename
 
     @staticmethod
     def get_metadata_type_info_from_excel_file(filename: str) -> str:
+        from openpyxl import load_workbook
+
+        from .utils.pydantic_to_excel import parse_version
+
         error_message = "Improperly formatted Excel file for metadata"
-        workbook = load_workbook(filename)
+        workbook = load_workbook(filename, read_only=True)
         # Select the 'metadata' sheet
         try:
             sheet = workbook["metadata"]
@@ -354,32 +655,12 @@ class MetadataManager:
 
         return parse_version(type_info)
 
-    def read_metadata_from_excel(
-        self,
-        filename: str,
-        metadata_class: Optional[Type[SchemaBaseModel]] = None,
-        verbose: bool = False,
-    ) -> BaseModel:
+    def _entry_and_reader_for_excel_file(
+        self, filename: str, metadata_class: Optional[Type[SchemaBaseModel]] = None
+    ) -> Tuple[_MetadataTypeEntry, Callable]:
         """
-        Read in metadata from an appropriately formatted Excel file as a pydantic model.
-        If using standard metadata types (document, geospatial, image, indicator, indicators_db, microdata, resource, script, table, video) then there is no need to pass in the metadata_class. But if using a template, then the class should be provided to avoid compatability issues.
-
-        Args:
-            filename (str): The path to the Excel file.
-            metadata_class (Optional type of BaseModel): A pydantic class type correspondong to the type used to write the Excel file
-            verbose (bool): If True, print debug information on the file reading.
-
-
-        Returns:
-            BaseModel: a pydantic model containing the metadata from the file
-
-        Raises:
-            ValueError: If the metadata type is not supported or if the Excel file is improperly formatted
-
-        Example:
-            >>> from pydantic_schemas.metadata_manager import MetadataManager
-            >>> manager = MetadataManager()
-            >>> document_metadata = manager.read_metadata_from_excel("document_metadata.xlsx")
+        The registry entry and reader for an Excel file, from the metadata type written in it or from metadata_class,
+        warning if the two don't match.
         """
         metadata_type_info = self.get_metadata_type_info_from_excel_file(filename)
         metadata_name = metadata_type_info["metadata_type"]
@@ -387,23 +668,10 @@ class MetadataManager:
         template_uid = metadata_type_info.get("template_uid", None)
 
         if metadata_class is not None:
-            metadata_type_from_class = (
-                metadata_class._metadata_type__
-                if isinstance(metadata_class._metadata_type__, str)
-                else metadata_class._metadata_type__.default
-            )
-            metadata_type_version_from_class = (
-                metadata_class._metadata_type_version__
-                if isinstance(metadata_class._metadata_type_version__, str)
-                else metadata_class._metadata_type_version__.default
-            )
-            uid_from_class = (
-                metadata_class._template_uid__
-                if isinstance(metadata_class._template_uid__, str)
-                else metadata_class._template_uid__.default
-                if hasattr(metadata_class._template_uid__, "default")
-                else None
-            )
+            entry = self._resolve(metadata_class)
+            metadata_type_from_class = entry.metadata_type
+            metadata_type_version_from_class = entry.metadata_type_version
+            uid_from_class = entry.template_uid
             if metadata_type_from_class != metadata_name:
                 warnings.warn(
                     f"metadata_class metadata type {metadata_type_from_class} does not match the Excel file metadata type {metadata_name}"
@@ -434,47 +702,519 @@ class MetadataManager:
                     "this may cause compatability issues",
                     stacklevel=1,
                 )
-            metadata_name = metadata_type_from_class
-        else:
-            if metadata_type_info.get("template_uid", None) is not None:
+        elif template_uid is not None:
+            entry = self._REGISTRY_BY_TEMPLATE_UID.get(template_uid)
+            if entry is None:
                 raise ValueError(
-                    "metadata_class must be provided when reading in a template Excel file, but none was provided"
+                    f"The Excel file is from template {template_uid} which has not been seen by the MetadataManager. "
+                    "Either pass in the metadata_class or first create it with create_template_class"
                 )
-            metadata_class = self.metadata_class_from_name(metadata_name)
+        else:
+            entry = self._entry_from_name(metadata_name)
 
-        try:
-            metadata_type_from_class = (
-                metadata_class._metadata_type__
-                if isinstance(metadata_class._metadata_type__, str)
-                else metadata_class._metadata_type__.default
-            )
-            metadata_name = self.standardize_metadata_name(metadata_type_from_class)
-            reader = self._TYPE_TO_READER[metadata_name]
-        except ValueError:
-            reader = excel_single_sheet_to_pydantic
+        if entry.reader_name is not None:
+            reader = entry.reader
+        else:
+            reader = _excel_reader("excel_single_sheet_to_pydantic")
             warnings.warn(
-                f"metadata_class metadata type {metadata_type_from_class} is not a standard type"
+                f"metadata_class metadata type {entry.metadata_type} is not a standard type"
                 "falling back to excel_single_sheet_to_pydantic",
                 stacklevel=1,
             )
+        return entry, reader
 
-        read_model = reader(filename, metadata_class, verbose=verbose)
+    @staticmethod
+    def _read_embedded_payload(filename: str, metadata_class: Type[BaseModel]):
+        """The copy of the metadata embedded in an Excel file if it was written for metadata_class, otherwise None"""
+        from .utils.embedded_payload import read_payload
+        from .utils.pydantic_to_excel import create_version
+
+        with warnings.catch_warnings():
+            # any missing metadata type was already warned about when the file was written
+            warnings.simplefilter("ignore")
+            version = create_version(metadata_class)
+        with get_tracer().span("metadata_manager.read_payload"):
+            return read_payload(filename, version)
+
+    @staticmethod
+    def _unchanged_fields(payload, entry: _MetadataTypeEntry) -> Dict[str, Any]:
+        """The keyword arguments for passing the fields on unchanged sheets to a reader that reads many sheets"""
+        if payload is None or len(payload.unchanged_sheets) == 0 or entry.reader_name != "excel_doc_to_pydantic":
+            return {}
+        return {"unchanged": payload.unchanged_fields(entry.schema)}
+
+    @traced("metadata_manager.read_metadata_from_excel")
+    def read_metadata_from_excel(
+        self,
+        filename: str,
+        metadata_class: Optional[Type[SchemaBaseModel]] = None,
+        verbose: bool = False,
+        memory_profiler: Optional[MemoryProfiler] = None,
+        use_payload: bool = True,
+        cache: Optional[ReadCache] = None,
+    ) -> BaseModel:
+        """
+        Read in metadata from an appropriately formatted Excel file as a pydantic model.
+        If using standard metadata types (document, geospatial, image, indicator, indicators_db, microdata, resource, script, table, video) then there is no need to pass in the metadata_class. The same is true of templates already known to the manager, for instance those made with create_template_class, which are found from the template_uid in the file. Otherwise for a template the class should be provided to avoid compatability issues.
+
+        Args:
+            filename (str): The path to the Excel file.
+            metadata_class (Optional type of BaseModel): A pydantic class type correspondong to the type used to write the Excel file
+            verbose (bool): Unused, kept for backwards compatibility. Debug information is logged instead, see
+                utils/debug_logging.py.
+            memory_profiler (Optional[MemoryProfiler]): If given, the memory used by each phase of the read is
+                recorded in it, see MemoryProfiler.result.
+            use_payload (bool): If the file embeds a copy of the metadata, as those written by save_metadata_to_excel
+                do, take the fields on sheets that haven't been edited since from the copy rather than parsing the
+                sheets. Defaults to True.
+            cache (Optional[ReadCache]): If given, the metadata is looked up in this on disk cache by the hash of the
+                file, and stored in it when the file hasn't been read before, see utils/read_cache.py.
+
+        Returns:
+            BaseModel: a pydantic model containing the metadata from the file
+
+        Raises:
+            ValueError: If the metadata type is not supported or if the Excel file is improperly formatted
+
+        Example:
+            >>> from pydantic_schemas.metadata_manager import MetadataManager
+            >>> manager = MetadataManager()
+            >>> document_metadata = manager.read_metadata_from_excel("document_metadata.xlsx")
+        """
+        with _profiling(memory_profiler):
+            return self._read_metadata(filename, metadata_class, verbose, use_payload, cache)
+
+    def _read_metadata(
+        self,
+        filename: str,
+        metadata_class: Optional[Type[SchemaBaseModel]],
+        verbose: bool,
+        use_payload: bool,
+        cache: Optional[ReadCache],
+    ) -> BaseModel:
+        entry, reader = self._entry_and_reader_for_excel_file(filename, metadata_class)
+        if cache is None:
+            return self._read_metadata_from_excel(filename, entry, reader, verbose, use_payload)
+
+        tracer = get_tracer()
+        with tracer.span("metadata_manager.read_cache"):
+            key = cache.key(filename, entry.schema)
+            cached = cache.get(key)
+        if cached is not None:
+            try:
+                with tracer.span("metadata_manager.validate"):
+                    return entry.schema.model_validate_json(cached)
+            except ValueError:
+                logger.debug("discarding the invalid cache entry %s", key)
+                cache.discard(key)
+        metadata = self._read_metadata_from_excel(filename, entry, reader, verbose, use_payload)
+        with tracer.span("metadata_manager.write_cache"):
+            cache.put(key, metadata.model_dump_json(by_alias=True).encode())
+        return metadata
+
+    def _read_metadata_from_excel(
+        self, filename: str, entry: _MetadataTypeEntry, reader: Callable, verbose: bool, use_payload: bool
+    ) -> BaseModel:
+        metadata_class = entry.schema
+        tracer = get_tracer()
+        payload = self._read_embedded_payload(filename, metadata_class) if use_payload else None
+        if payload is not None and payload.is_unchanged:
+            with tracer.span("metadata_manager.validate"):
+                return metadata_class.model_validate_json(payload.data)
+        with tracer.span("metadata_manager.read_workbook", reader=reader.__name__):
+            read_model = reader(filename, metadata_class, verbose=verbose, **self._unchanged_fields(payload, entry))
 
         skeleton_model = self.create_metadata_outline(metadata_name_or_class=metadata_class, debug=verbose)
 
-        read_model_dict = read_model.model_dump(
-            mode="json", exclude_none=False, exclude_unset=True, exclude_defaults=True
-        )
-        if verbose:
-            print("read model dict", read_model_dict)
+        with tracer.span("metadata_manager.merge"):
+            read_model_dict = read_model.model_dump(
+                mode="json", exclude_none=False, exclude_unset=True, exclude_defaults=True
+            )
+            logger.debug("read model dict %s", summarize(read_model_dict))
 
-        combined_dict = merge_dicts(
-            skeleton_model.model_dump(mode="json"),
-            read_model_dict,
-            skeleton_mode=True,
-        )
-        combined_dict = standardize_keys_in_dict(combined_dict)
-        return metadata_class.model_validate(combined_dict)
+            combined_dict = merge_dicts(
+                skeleton_model.model_dump(mode="json"),
+                read_model_dict,
+                skeleton_mode=True,
+            )
+            combined_dict = standardize_keys_in_dict(combined_dict)
+        with tracer.span("metadata_manager.validate"):
+            return metadata_class.model_validate(combined_dict)
+
+    @traced("metadata_manager.excel_to_json")
+    def excel_to_json(
+        self,
+        filename: str,
+        metadata_class: Optional[Type[SchemaBaseModel]] = None,
+        validate: Union[bool, str] = False,
+        use_payload: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Read metadata from an appropriately formatted Excel file straight into a JSON compatible dictionary.
+
+        Unlike read_metadata_from_excel, which instantiates a pydantic object for every nested object in the file and
+        then validates the whole model again after merging it with the skeleton, the sheets are read into nested
+        dictionaries following the fields of the schema, without creating any pydantic objects. The dictionary is
+        keyed by field alias, as in the JSON schema, so it can be posted to a catalog as it is.
+
+        Args:
+            filename (str): The path to the Excel file.
+            metadata_class (Optional type of BaseModel): As for read_metadata_from_excel.
+            validate (Union[bool, str]): One of
+                False: the dictionary is returned as read, without validation. Values are as they were in the cells,
+                    so for instance an integer field may hold a float.
+                'fast': the dictionary is serialized to JSON and validated once by pydantic-core, raising a
+                    ValidationError if it isn't valid, and returned as read.
+                'full': as 'fast', but the validated model is dumped back to JSON, so that values are coerced to
+                    their types and defaults filled in. The result is the same as
+                    read_metadata_from_excel(filename).model_dump(mode="json", by_alias=True).
+            use_payload (bool): As for read_metadata_from_excel.
+
+        Returns:
+            Dict[str, Any]: The metadata in the file.
+
+        Raises:
+            ValueError: If validate is not one of False, 'fast' or 'full', the metadata type is not supported or the
+                Excel file is improperly formatted.
+            pydantic.ValidationError: If validating and the metadata isn't valid.
+
+        Example:
+            >>> manager = MetadataManager()
+            >>> payload = manager.excel_to_json("microdata_metadata.xlsx", validate="fast")
+        """
+        if validate not in (False, "fast", "full"):
+            raise ValueError(f"validate should be False, 'fast' or 'full', not {validate!r}")
+        entry, reader = self._entry_and_reader_for_excel_file(filename, metadata_class)
+        metadata_class = entry.schema
+
+        tracer = get_tracer()
+        payload = self._read_embedded_payload(filename, metadata_class) if use_payload else None
+        if payload is not None and payload.is_unchanged:
+            json_data = payload.data
+            combined_dict = json.loads(json_data)
+        else:
+            with tracer.span("metadata_manager.read_workbook", reader=reader.__name__):
+                read_dict = reader(filename, metadata_class, as_dict=True, **self._unchanged_fields(payload, entry))
+
+            skeleton_model = self.create_metadata_outline(metadata_name_or_class=metadata_class)
+            with tracer.span("metadata_manager.merge"):
+                combined_dict = merge_dicts(
+                    skeleton_model.model_dump(mode="json", by_alias=True), read_dict, skeleton_mode=True
+                )
+                # cells can hold dates and numpy numbers, which are converted to what reading them as JSON would give
+                json_data = json.dumps(combined_dict, default=_json_default)
+                combined_dict = json.loads(json_data)
+        if not validate:
+            return combined_dict
+
+        with tracer.span("metadata_manager.validate"):
+            model = metadata_class.model_validate_json(json_data)
+        if validate == "fast":
+            return combined_dict
+        return model.model_dump(mode="json", by_alias=True)
+
+    @traced("metadata_manager.validate_json")
+    def validate_json(
+        self,
+        metadata_name_or_class: Union[str, Type[BaseModel]],
+        data: Union[bytes, bytearray, memoryview, str],
+        lenient: bool = False,
+        strict: Optional[bool] = None,
+    ) -> BaseModel:
+        """
+        Validate metadata received as JSON into a pydantic model, in a single pass.
+
+        The JSON is parsed and validated together by pydantic-core, straight from the bytes, so unlike json.loads
+        followed by model_validate no intermediate Python dictionary is built, which for large metadata takes about a
+        third less memory. It is not quicker though, see benchmarks/bench_validate_json.py. A memoryview over the whole
+        of a bytes or bytearray object is validated without being copied.
+
+        Args:
+            metadata_name_or_class (str or type[BaseModel]): The name of a metadata type, for instance microdata, or a
+                pydantic class, for instance a template.
+            data (bytes, bytearray, memoryview or str): The JSON.
+            lenient (bool): Treat the JSON as the Excel reader treats what it reads from a file: field names are
+                accepted as well as aliases, for instance from_ for from, and missing or null fields, including
+                required ones, are filled in from the outline of the metadata type, with lists of objects filled in
+                element by element. This needs the JSON as a dictionary, so it is slower.
+            strict (Optional[bool]): Passed on to pydantic, to not coerce values to their types.
+
+        Returns:
+            BaseModel: The metadata.
+
+        Raises:
+            ValueError: If the metadata type is not supported.
+            pydantic.ValidationError: If the JSON is not valid JSON or not valid metadata.
+
+        Example:
+            >>> manager = MetadataManager()
+            >>> microdata_metadata = manager.validate_json("microdata", request_body)
+        """
+        metadata_class = self._resolve(metadata_name_or_class).schema
+        if isinstance(data, memoryview):
+            # pydantic-core only parses str, bytes and bytearray
+            full_view = isinstance(data.obj, (bytes, bytearray)) and data.nbytes == len(data.obj) and data.c_contiguous
+            data = data.obj if full_view else data.tobytes()
+
+        tracer = get_tracer()
+        if not lenient:
+            with tracer.span("metadata_manager.validate"):
+                return metadata_class.model_validate_json(data, strict=strict)
+
+        with tracer.span("metadata_manager.parse_json"):
+            data_dict = from_json(data)
+        return self._validate_parsed_json(metadata_class, data_dict, lenient=True, strict=strict)
+
+    def _outline_dump(self, metadata_class: Type[BaseModel]) -> Dict[str, Any]:
+        """The JSON dump of the outline of metadata_class, made once per class, which must not be changed"""
+        outline_dump = _OUTLINE_DUMP_CACHE.get(metadata_class)
+        if outline_dump is None:
+            skeleton_model = self.create_metadata_outline(metadata_name_or_class=metadata_class)
+            outline_dump = skeleton_model.model_dump(mode="json", by_alias=True)
+            _OUTLINE_DUMP_CACHE[metadata_class] = outline_dump
+        return outline_dump
+
+    def _validate_parsed_json(
+        self, metadata_class: Type[BaseModel], data_dict: Any, lenient: bool, strict: Optional[bool] = None
+    ) -> BaseModel:
+        """Validate JSON already parsed into Python objects, filling it in from the outline if lenient"""
+        if not isinstance(data_dict, dict):
+            raise ValueError(f"Expected a JSON object of {metadata_class.__name__}, got {type(data_dict).__name__}")
+        tracer = get_tracer()
+        if lenient:
+            with tracer.span("metadata_manager.merge"):
+                data_dict = _fill_in_from_outline(
+                    self._outline_dump(metadata_class), standardize_keys_in_dict(data_dict)
+                )
+        with tracer.span("metadata_manager.validate"):
+            return metadata_class.model_validate(data_dict, strict=strict)
+
+    def _validate_jsonl_record(
+        self,
+        line_number: int,
+        line: bytes,
+        entry: Optional[_MetadataTypeEntry],
+        type_field: str,
+        lenient: bool,
+        output: str,
+    ) -> Union[BaseModel, bytes, JsonlRecordError, None]:
+        metadata_name = None if entry is None else entry.metadata_name
+        try:
+            if entry is not None and not lenient:
+                model = entry.schema.model_validate_json(line)
+            else:
+                data_dict = from_json(line)
+                if entry is None:
+                    type_value = data_dict.get(type_field) if isinstance(data_dict, dict) else None
+                    if not isinstance(type_value, str):
+                        return JsonlRecordError(line_number, None, f"The record has no '{type_field}' field")
+                    record_entry = self._resolve(type_value)
+                    metadata_name = record_entry.metadata_name
+                else:
+                    record_entry = entry
+                model = self._validate_parsed_json(record_entry.schema, data_dict, lenient)
+            if output == "model":
+                return model
+            if output == "json":
+                return model.model_dump_json(by_alias=True).encode()
+            return None
+        except ValidationError as e:
+            return JsonlRecordError(
+                line_number,
+                metadata_name,
+                f"{e.error_count()} validation error{'s' if e.error_count() > 1 else ''} for {e.title}",
+                e.errors(include_url=False, include_input=False),
+            )
+        except ValueError as e:
+            # invalid JSON, or a type that isn't supported
+            return JsonlRecordError(line_number, metadata_name, str(e))
+
+    def iter_validate_jsonl(
+        self,
+        path_or_stream: Union[str, os.PathLike, IO],
+        metadata_name_or_class: Union[str, Type[BaseModel]] = "auto",
+        type_field: str = "type",
+        lenient: bool = False,
+        output: str = "model",
+        processes: Optional[int] = None,
+        chunk_size: int = 500,
+    ) -> Iterator[Union[BaseModel, bytes, JsonlRecordError]]:
+        """
+        Validate the metadata records of a JSON Lines file, one JSON object per line, yielding them as they are read.
+
+        Each record is validated into a pydantic model, or if it isn't valid a JsonlRecordError says why and where,
+        so one bad record doesn't stop the rest. Blank lines are skipped. The file is streamed, so however large it is
+        only the records being validated are held in memory.
+
+        Args:
+            path_or_stream (str, PathLike or file object): The path of the file, which is decompressed if it ends in
+                .gz, or an open file in binary or text mode.
+            metadata_name_or_class (str or type[BaseModel]): The metadata type of every record, or 'auto' to take
+                each record's type from its type_field, which may hold any name or alias the manager knows, such as
+                survey for microdata, or the uid of a template it knows.
+            type_field (str): The field holding the type of each record, when the type is 'auto'.
+            lenient (bool): As for validate_json.
+            output (str): What to yield for a valid record, one of
+                'model': the pydantic model.
+                'json': the JSON of the model, by alias, for instance to write out a cleaned up copy of the file.
+                'errors': nothing, only the errors are yielded.
+            processes (Optional[int]): If more than 1, the records are validated by this many worker processes, in
+                chunks of chunk_size, while the file is read. The results are still yielded in the order of the file,
+                and at most two chunks per process are in flight at once. Sending models back from the workers costs
+                about as much as validating them, so to make use of many cores choose the output 'json' or 'errors'.
+                Templates made in this process can't be validated by the workers, so name their type in each record
+                by a standard type.
+            chunk_size (int): The number of records sent to a worker at a time.
+
+        Yields:
+            BaseModel, bytes or JsonlRecordError: For each record, in order, or with the output 'errors' for each
+                invalid record.
+
+        Raises:
+            ValueError: If metadata_name_or_class is not supported or output is not one of 'model', 'json' or
+                'errors'.
+
+        Example:
+            >>> manager = MetadataManager()
+            >>> for record in manager.iter_validate_jsonl("catalog.jsonl", processes=8):
+            ...     if isinstance(record, JsonlRecordError):
+            ...         print(record.line_number, record.errors)
+        """
+        if output not in ("model", "json", "errors"):
+            raise ValueError(f"output should be 'model', 'json' or 'errors', not {output!r}")
+        if isinstance(metadata_name_or_class, str) and metadata_name_or_class == "auto":
+            entry = None
+        else:
+            entry = self._resolve(metadata_name_or_class)
+        lines = iter_jsonl_lines(path_or_stream)
+        if processes is None or processes <= 1:
+            results = (
+                self._validate_jsonl_record(line_number, line, entry, type_field, lenient, output)
+                for line_number, line in lines
+            )
+        else:
+            validate_chunk = functools.partial(
+                _validate_jsonl_chunk,
+                metadata_class=None if entry is None else entry.schema,
+                type_field=type_field,
+                lenient=lenient,
+                output=output,
+            )
+            results = itertools.chain.from_iterable(imap_ordered(validate_chunk, chunks(lines, chunk_size), processes))
+        for result in results:
+            if result is not None:
+                yield result
+
+    @traced("metadata_manager.validate_in_parallel")
+    def validate_in_parallel(
+        self,
+        metadata_name_or_class: Union[str, Type[BaseModel]],
+        data: Dict[str, Any],
+        processes: Optional[int] = None,
+        chunk_size: int = 2000,
+        list_fields: Optional[List[str]] = None,
+    ) -> BaseModel:
+        """
+        Validate metadata whose size is in a few long lists, such as the variables of microdata, on several cores.
+
+        Each list longer than chunk_size is split into chunks which worker processes validate, while this process
+        validates the rest of the metadata. The validated items are then put into the validated rest without being
+        validated again. The result is the same as that of model_validate.
+
+        Every validated item is sent back from its worker, and rebuilding it here costs nearly as much as validating
+        it, so the gain depends on the number of cores and on how much validating each item costs.
+
+        Args:
+            metadata_name_or_class (str or type[BaseModel]): The name of a metadata type, for instance microdata, or a
+                pydantic class, for instance a template.
+            data (Dict[str, Any]): The metadata as a dictionary, keyed by alias as in JSON. It is not changed.
+            processes (Optional[int]): The number of worker processes, by default the number of CPUs. With 1 the
+                chunks are validated in this process, which templates made in this process need as the workers
+                can't import their classes.
+            chunk_size (int): The number of items validated by a worker at a time.
+            list_fields (Optional[List[str]]): The lists to split, each as a path of field names separated by dots,
+                for instance description.feature_catalogue.featureType. By default the long lists of the metadata
+                type: variables, data_files and variable_groups for microdata, data_structure for indicator and the
+                feature types of the feature catalogue for geospatial.
+
+        Returns:
+            BaseModel: The metadata.
+
+        Raises:
+            ValueError: If the metadata type is not supported, or a list field is not a list of models.
+            pydantic.ValidationError: If the metadata is not valid, with the location of each error in the whole
+                metadata, so an error in a list gives the index of the item in the whole list.
+
+        Example:
+            >>> manager = MetadataManager()
+            >>> microdata = manager.validate_in_parallel("microdata", json.load(open("census.json")), processes=8)
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size should be at least 1, not {chunk_size}")
+        entry = self._resolve(metadata_name_or_class)
+        if list_fields is None:
+            default_fields = self._TYPE_TO_LARGE_LIST_FIELDS.get(entry.metadata_type or entry.metadata_name, ())
+            # a template may leave out some of the fields of its metadata type
+            list_fields = [path for path in default_fields if _large_list_field(entry.schema, path, False)]
+        large_lists = [_large_list_field(entry.schema, path, True) for path in list_fields]
+
+        # the rest of the metadata, with an empty list in place of each list long enough to split
+        rest = dict(data)
+        detached = []
+        for names, keys, item_class in large_lists:
+            parent = rest
+            for key in keys[:-1]:
+                if not isinstance(parent.get(key), dict):
+                    break
+                parent[key] = dict(parent[key])
+                parent = parent[key]
+            else:
+                items = parent.get(keys[-1])
+                if isinstance(items, list) and len(items) > chunk_size:
+                    parent[keys[-1]] = []
+                    detached.append((names, keys, item_class, items))
+        work = [
+            (i, start, item_class, items[start : start + chunk_size])
+            for i, (_, _, item_class, items) in enumerate(detached)
+            for start in range(0, len(items), chunk_size)
+        ]
+
+        processes = processes or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=processes) if processes > 1 and len(work) else None
+        errors = []
+        validated_lists = [[] for _ in detached]
+        try:
+            tracer = get_tracer()
+            with tracer.span("metadata_manager.validate_chunks") as span:
+                span.add("chunks", len(work))
+                if executor is not None:
+                    futures = [
+                        executor.submit(_validate_list_chunk, item_class, chunk) for _, _, item_class, chunk in work
+                    ]
+                with tracer.span("metadata_manager.validate"):
+                    try:
+                        model = entry.schema.model_validate(rest)
+                    except ValidationError as e:
+                        errors.extend(e.errors(include_url=False))
+                for n, (i, start, item_class, chunk) in enumerate(work):
+                    if executor is not None:
+                        items, chunk_errors = futures[n].result()
+                    else:
+                        items, chunk_errors = _validate_list_chunk(item_class, chunk)
+                    validated_lists[i].extend(items)
+                    prefix = detached[i][1]
+                    errors.extend(
+                        {**error, "loc": prefix + (start + error["loc"][0],) + error["loc"][1:]}
+                        for error in chunk_errors
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        if len(errors):
+            raise ValidationError.from_exception_data(entry.schema.__name__, _line_errors(errors))
+        for (names, _, _, _), items in zip(detached, validated_lists):
+            model = _with_list(model, names, items)
+        return model
 
     def _raise_if_unsupported_metadata_name(self, metadata_name: str):
         """
@@ -483,3 +1223,94 @@ class MetadataManager:
         """
         if metadata_name not in self._TYPE_TO_SCHEMA:
             raise ValueError(f"'{metadata_name}' not supported. Must be: {list(self._TYPE_TO_SCHEMA.keys())}")
+
+
+def _validate_jsonl_chunk(
+    chunk: List[Tuple[int, bytes]],
+    metadata_class: Optional[Type[BaseModel]],
+    type_field: str,
+    lenient: bool,
+    output: str,
+) -> List[Union[BaseModel, bytes, JsonlRecordError, None]]:
+    """Validate lines of a JSON Lines file in a worker process, see MetadataManager.iter_validate_jsonl"""
+    manager = MetadataManager()
+    entry = None if metadata_class is None else manager._resolve(metadata_class)
+    return [
+        manager._validate_jsonl_record(line_number, line, entry, type_field, lenient, output)
+        for line_number, line in chunk
+    ]
+
+
+def _large_list_field(
+    schema: Type[BaseModel], path: str, required: bool
+) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...], Type[BaseModel]]]:
+    """
+    The field names and the aliases along a dotted path of field names, and the model of the items of the list of
+    models it ends at, or if that path doesn't exist in schema None, or a ValueError if required.
+    """
+    names, keys = [], []
+    annotation: Any = schema
+    for name in path.split("."):
+        model_class = _optional_model_class(annotation)
+        if model_class is None or name not in model_class.model_fields:
+            break
+        field = model_class.model_fields[name]
+        names.append(name)
+        keys.append(field.alias or name)
+        annotation = field.annotation
+    else:
+        item_class = _list_item_class(annotation)
+        if item_class is not None:
+            return tuple(names), tuple(keys), item_class
+    if required:
+        raise ValueError(f"{schema.__name__}.{path} is not a list of models")
+    return None
+
+
+def _optional_model_class(annotation: Any) -> Optional[Type[BaseModel]]:
+    """The model of a Model or Optional[Model] annotation, None for other annotations"""
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    if get_origin(annotation) is Union and len(args) == 1:
+        annotation = args[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+def _validate_list_chunk(item_class: Type[BaseModel], chunk: List[Any]) -> Tuple[List[BaseModel], List[Dict[str, Any]]]:
+    """
+    Validate items of a list in a worker process, see MetadataManager.validate_in_parallel, returning them, or if any
+    is invalid no items and the errors, located by the index in the chunk.
+    """
+    try:
+        return _batch_adapter(item_class).validate_python(chunk), []
+    except ValidationError as e:
+        return [], e.errors(include_url=False)
+
+
+# the error types that pydantic-core can make an error of by name
+_ERROR_TYPES = frozenset(get_args(ErrorType))
+
+
+def _line_errors(errors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The errors of ValidationError.errors() as errors for ValidationError.from_exception_data, which only knows the
+    error types of pydantic-core, so others, such as that of a PydanticCustomError raised by a validator, are made
+    custom errors again.
+    """
+    line_errors = []
+    for error in errors:
+        if error["type"] in _ERROR_TYPES:
+            line_errors.append(error)
+        else:
+            custom_error = PydanticCustomError(error["type"], error["msg"], error.get("ctx"))
+            line_errors.append({**{k: v for k, v in error.items() if k != "ctx"}, "type": custom_error})
+    return line_errors
+
+
+def _with_list(model: BaseModel, names: Tuple[str, ...], items: List[BaseModel]) -> BaseModel:
+    """A copy of model with items at the path of field names, made with model_construct so nothing is revalidated"""
+    value = items if len(names) == 1 else _with_list(getattr(model, names[0]), names[1:], items)
+    constructed = type(model).model_construct(_fields_set=model.model_fields_set, **{**model.__dict__, names[0]: value})
+    object.__setattr__(constructed, "__pydantic_private__", model.__pydantic_private__)
+    return constructed
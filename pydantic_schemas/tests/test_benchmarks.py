@@ -0,0 +1,124 @@
+import pytest
+
+from pydantic_schemas.benchmarks.compare_benchmarks import (
+    compare_results,
+    format_comparisons,
+    parse_selection,
+    rerun_benchmarks,
+)
+from pydantic_schemas.benchmarks.run_benchmarks import (
+    _repeat_list_items,
+    interquartile_range,
+    run_benchmarks,
+)
+
+
+def test_repeat_list_items_only_lengthens_outermost_lists():
+    data = {"a": [{"b": [{"c": 1}], "d": ["x"]}], "e": {"f": [{"g": 2}, {"g": 3}]}, "h": ["y"]}
+    actual = _repeat_list_items(data, 3)
+    assert actual == {
+        "a": [{"b": [{"c": 1}], "d": ["x"]}] * 3,
+        "e": {"f": [{"g": 2}, {"g": 3}, {"g": 2}]},
+        "h": ["y"],
+    }
+    assert actual["a"][0] is not actual["a"][1]
+
+
+def test_run_benchmarks():
+    benchmark_results = run_benchmarks(["video"], ["small"], ["make_skeleton", "round_trip"], repeats=1, verbose=False)
+    assert benchmark_results["metadata"]["sizes"] == {"small": 1}
+    results = benchmark_results["results"]
+    assert [(r["operation"], r["size"]) for r in results] == [("make_skeleton", None), ("round_trip", "small")]
+    for result in results:
+        assert "error" not in result, result
+        assert len(result["times"]) == 1
+        assert result["peak_memory_bytes"] > 0
+    assert results[0]["output_size_bytes"] is None
+    assert results[1]["output_size_bytes"] > 0
+
+
+def test_interquartile_range():
+    assert interquartile_range([1.0]) == 0.0
+    assert interquartile_range([1.0, 2.0, 3.0, 4.0, 100.0]) == 2.0
+
+
+def _result(operation, time_median, time_iqr=0.0, peak_memory_bytes=1000, size=None):
+    return {
+        "metadata_type": "microdata",
+        "operation": operation,
+        "size": size,
+        "time_median": time_median,
+        "time_iqr": time_iqr,
+        "peak_memory_bytes": peak_memory_bytes,
+    }
+
+
+def test_compare_results_flags_regressions_beyond_tolerance_and_noise():
+    baseline = [
+        _result("write_outline", 1.0, time_iqr=0.05),
+        _result("read", 1.0, time_iqr=0.5, size="small"),
+        _result("save", 1.0, size="small"),
+    ]
+    current = [
+        _result("write_outline", 1.5, time_iqr=0.05, peak_memory_bytes=1050),
+        _result("read", 1.4, time_iqr=0.1, size="small"),
+        _result("save", 0.5, peak_memory_bytes=2000, size="small"),
+        _result("round_trip", 1.0, size="small"),
+        {"metadata_type": "microdata", "operation": "make_skeleton", "size": None, "error": "ValueError: bad"},
+    ]
+    comparisons = compare_results(baseline, current, time_tolerance=0.25, memory_tolerance=0.1)
+    regressed = {(c["operation"], c["metric"]): c["regressed"] for c in comparisons}
+    assert regressed == {
+        ("write_outline", "time_median"): True,
+        ("write_outline", "peak_memory_bytes"): False,
+        # slower than the tolerance allows but within the noise of the baseline
+        ("read", "time_median"): False,
+        ("read", "peak_memory_bytes"): False,
+        ("save", "time_median"): False,
+        ("save", "peak_memory_bytes"): True,
+        ("round_trip", None): True,
+        ("make_skeleton", None): True,
+    }
+    table = format_comparisons(comparisons)
+    assert "REGRESSED" in table
+    assert "+50%" in table
+    assert "not in baseline" in table
+    assert "ValueError: bad" in table
+    assert table.splitlines()[-1] == "4 of 8 comparisons regressed"
+
+
+def test_compare_results_flags_benchmarks_without_a_result():
+    baseline = [_result("write_outline", 1.0), _result("read", 1.0, size="small")]
+    current = [_result("write_outline", 1.0)]
+    comparisons = compare_results(baseline, current)
+    assert [(c["operation"], c["regressed"], c.get("error")) for c in comparisons] == [
+        ("read", True, "no result"),
+        ("write_outline", False, None),
+        ("write_outline", False, None),
+    ]
+    assert compare_results(baseline, current, expected=[("microdata", "write_outline", None)]) == comparisons[1:]
+    assert compare_results(baseline, [], expected=[("microdata", "save", "small")])[0]["error"] == "no result"
+
+
+def test_parse_selection_and_rerun_benchmarks():
+    assert parse_selection("microdata:read:small") == ("microdata", "read", "small")
+    assert parse_selection("geospatial:write_outline") == ("geospatial", "write_outline", None)
+    with pytest.raises(ValueError):
+        parse_selection("microdata")
+    with pytest.raises(ValueError):
+        parse_selection("microdata:read:huge")
+    with pytest.raises(ValueError, match="unknown operation"):
+        parse_selection("microdata:raed:small")
+    with pytest.raises(ValueError, match="unknown metadata type"):
+        parse_selection("microdta:read:small")
+    with pytest.raises(ValueError, match="needs a size"):
+        parse_selection("microdata:read")
+    with pytest.raises(ValueError, match="does not depend on the size"):
+        parse_selection("microdata:write_outline:small")
+
+    results = rerun_benchmarks([("video", "make_skeleton", None), ("resource", "make_skeleton", None)], repeats=2)
+    assert [(r["metadata_type"], r["operation"]) for r in results] == [
+        ("video", "make_skeleton"),
+        ("resource", "make_skeleton"),
+    ]
+    assert compare_results(results, results)[0]["regressed"] is False
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from pydantic_schemas.geospatial_schema import GeospatialSchema
+from pydantic_schemas.indicator_schema import DataStructureItem, TimeseriesSchema
+from pydantic_schemas.microdata_schema import MicrodataSchema, VariableSchema
+from pydantic_schemas.utils import columnar
+from pydantic_schemas.utils.columnar import (
+    export_items,
+    export_list_field,
+    items_to_dataframes,
+    read_items,
+    tables_to_items,
+)
+from pydantic_schemas.utils.quick_start import make_skeleton
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
+
+
+def _microdata() -> MicrodataSchema:
+    generator = SyntheticDataGenerator(seed=5, list_lengths={"variables": 30, "var_catgry": 3, "stats": 2})
+    return generator.generate(MicrodataSchema)
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "csv"])
+def test_variables_are_written_as_tables_and_read_back(tmpdir, file_format):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    microdata = _microdata()
+    microdata.variables[0].var_catgry = None
+    microdata.variables[1].var_catgry = []
+    microdata.variables[2].var_format = None
+
+    paths = export_list_field(microdata, "variables", str(tmpdir), file_format=file_format, batch_size=7)
+    assert {"variables", "variables.var_catgry", "variables.var_catgry.stats"} <= set(paths)
+    assert all(path.endswith(f".{file_format}") and os.path.exists(path) for path in paths.values())
+    assert read_items(str(tmpdir), VariableSchema, "variables") == microdata.variables
+
+
+def test_csv_is_written_without_pyarrow(tmpdir, monkeypatch):
+    monkeypatch.setattr(columnar, "_import_pyarrow", lambda: None)
+    microdata = _microdata()
+    paths = export_list_field(microdata, "variables", str(tmpdir))
+    assert paths["variables"].endswith(".csv")
+    assert read_items(str(tmpdir), VariableSchema, "variables") == microdata.variables
+    with pytest.raises(ImportError, match="pyarrow"):
+        export_list_field(microdata, "variables", str(tmpdir), file_format="parquet")
+
+
+def test_csv_keeps_empty_strings_apart_from_null(tmpdir):
+    microdata = _microdata()
+    microdata.variables[0].labl = ""
+    microdata.variables[1].labl = "\\N"
+    microdata.variables[2].labl = "\\\\"
+    microdata.variables[3].var_txt = ""
+    microdata.variables[4].var_txt = None
+    export_list_field(microdata, "variables", str(tmpdir), file_format="csv")
+    variables = read_items(str(tmpdir), VariableSchema, "variables")
+    assert variables == microdata.variables
+    assert [variable.labl for variable in variables[:3]] == ["", "\\N", "\\\\"]
+    assert variables[3].var_txt == "" and variables[4].var_txt is None
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "csv"])
+def test_models_whose_fields_are_all_null_are_kept(tmpdir, file_format):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    skeleton = make_skeleton(VariableSchema)
+    assert skeleton.var_format is not None and skeleton.var_std_catgry is not None
+    variable = VariableSchema(file_id="F1", vid="V1", name="a", labl="A")
+    export_items([skeleton, variable], VariableSchema, str(tmpdir), "variables", file_format=file_format)
+    assert read_items(str(tmpdir), VariableSchema, "variables") == [skeleton, variable]
+
+    frames = items_to_dataframes([skeleton, variable], VariableSchema, "variables")
+    assert list(frames["variables"]["var_format"]) == [True, False]
+    assert tables_to_items(frames, VariableSchema, "variables") == [skeleton, variable]
+
+
+def test_dataframes_have_a_row_per_item():
+    microdata = _microdata()
+    frames = items_to_dataframes(microdata.variables, VariableSchema, "variables")
+    variables, categories = frames["variables"], frames["variables.var_catgry"]
+    assert len(variables) == 30
+    assert list(variables["name"]) == [variable.name for variable in microdata.variables]
+    assert "var_format.type" in variables.columns
+    assert len(categories) == sum(len(variable.var_catgry or []) for variable in microdata.variables)
+    first = categories[categories["_parent_row"] == 0]
+    assert list(first["value"]) == [category.value for category in microdata.variables[0].var_catgry]
+    assert tables_to_items(frames, VariableSchema, "variables") == microdata.variables
+
+
+def test_lists_of_models_can_be_json_columns(tmpdir):
+    microdata = _microdata()
+    paths = export_items(microdata.variables, VariableSchema, str(tmpdir), "variables", child_tables=False)
+    assert list(paths) == ["variables"]
+    assert read_items(str(tmpdir), VariableSchema, "variables", child_tables=False) == microdata.variables
+
+
+def test_other_list_fields(tmpdir):
+    generator = SyntheticDataGenerator(seed=6, list_length=3)
+    indicator = generator.generate(TimeseriesSchema)
+    export_list_field(indicator, "data_structure", str(tmpdir.join("indicator")))
+    assert read_items(str(tmpdir.join("indicator")), DataStructureItem, "data_structure") == indicator.data_structure
+
+    geospatial = generator.generate(GeospatialSchema)
+    paths = export_list_field(geospatial, "description.contact", str(tmpdir.join("geospatial")))
+    contacts = read_items(str(tmpdir.join("geospatial")), type(geospatial.description.contact[0]), "contact")
+    assert list(paths) == ["contact"] and contacts == geospatial.description.contact
+
+    with pytest.raises(ValueError, match="not a list of models"):
+        export_list_field(geospatial, "description.identificationInfo", str(tmpdir))
+    with pytest.raises(FileNotFoundError):
+        read_items(str(tmpdir), VariableSchema, "variables")
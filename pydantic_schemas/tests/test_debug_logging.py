@@ -0,0 +1,114 @@
+import logging
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.debug_logging import (
+    ENVIRONMENT_VARIABLE,
+    SUBSYSTEMS,
+    disable_debug_logging,
+    enable_debug_logging,
+    get_logger,
+    summarize,
+)
+from pydantic_schemas.video_schema import Model as VideoModel
+
+
+@pytest.fixture
+def debug_logging():
+    handler = logging.NullHandler()
+    enable_debug_logging(handler=handler)
+    yield
+    disable_debug_logging()
+    get_logger("all").removeHandler(handler)
+
+
+def test_subsystem_loggers_are_the_module_loggers():
+    from pydantic_schemas.utils import excel_to_pydantic, pydantic_to_excel, quick_start
+
+    assert get_logger("excel_to_pydantic") is excel_to_pydantic.logger
+    assert get_logger("pydantic_to_excel") is pydantic_to_excel.logger
+    assert get_logger("quick_start") is quick_start.logger
+    for name in SUBSYSTEMS:
+        assert get_logger(name).name.startswith(get_logger("all").name + ".")
+    with pytest.raises(ValueError, match="Unknown subsystem"):
+        get_logger("excel")
+
+
+def test_enable_and_disable_debug_logging():
+    handler = logging.NullHandler()
+    enable_debug_logging("quick_start", handler=handler)
+    try:
+        assert get_logger("quick_start").isEnabledFor(logging.DEBUG)
+        assert not get_logger("excel_to_pydantic").isEnabledFor(logging.DEBUG)
+    finally:
+        disable_debug_logging()
+        get_logger("all").removeHandler(handler)
+    assert not get_logger("quick_start").isEnabledFor(logging.DEBUG)
+
+
+def test_unknown_subsystems_in_the_environment_are_skipped():
+    code = (
+        "import pydantic_schemas.metadata_manager\n"
+        "from pydantic_schemas.utils.debug_logging import get_logger\n"
+        "print(get_logger('quick_start').isEnabledFor(10), get_logger('utils').isEnabledFor(10))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, ENVIRONMENT_VARIABLE: "excel, quick_start"},
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["True", "False"]
+    assert "unknown subsystem 'excel' in METADATA_SCHEMAS_DEBUG" in result.stderr
+
+    handlers = list(get_logger("all").handlers)
+    with pytest.raises(ValueError, match="Unknown subsystem"):
+        enable_debug_logging("excel", handler=logging.NullHandler())
+    assert get_logger("all").handlers == handlers
+
+
+def test_summarize_is_short():
+    df = pd.DataFrame({"a": range(100), "b": ["x" * 1000] * 100})
+    text = str(summarize(df, max_rows=3))
+    assert text.startswith("DataFrame of shape (100, 2)")
+    assert "... 97 more rows" in text
+    assert len(text.splitlines()) == 6
+
+    assert str(summarize(list(range(1000)))).startswith("list of 1000 items starting [0, 1, 2, 3, 4]")
+    assert len(str(summarize("y" * 10000))) < 250
+
+    model = VideoModel(repositoryid="repository id", video_description={"idno": "idno", "title": "title"})
+    assert str(summarize(model)) == "Model with fields set ['repositoryid', 'video_description']"
+
+
+def test_round_trip_logs_instead_of_printing(tmpdir, capsys, caplog, debug_logging):
+    mm = MetadataManager()
+    filename = str(tmpdir.join("video.xlsx"))
+    with caplog.at_level(logging.DEBUG, logger=get_logger("all").name):
+        mm.write_metadata_outline_to_excel("video", filename, title="video")
+        mm.read_metadata_from_excel(filename, verbose=True)
+
+    assert capsys.readouterr().out == ""
+    loggers = {record.name for record in caplog.records}
+    assert get_logger("excel_to_pydantic").name in loggers
+    assert get_logger("pydantic_to_excel").name in loggers
+    assert get_logger("quick_start").name in loggers
+    assert get_logger("metadata_manager").name in loggers
+
+
+def test_debug_messages_are_not_formatted_when_off(tmpdir, capsys, caplog):
+    mm = MetadataManager()
+    filename = str(tmpdir.join("video.xlsx"))
+    with caplog.at_level(logging.INFO, logger=get_logger("all").name):
+        mm.write_metadata_outline_to_excel("video", filename, title="video")
+        mm.read_metadata_from_excel(filename, verbose=True)
+    assert capsys.readouterr().out == ""
+    assert [r for r in caplog.records if r.levelno == logging.DEBUG] == []
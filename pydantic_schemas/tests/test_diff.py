@@ -0,0 +1,123 @@
+import pytest
+from pydantic import ValidationError
+
+from pydantic_schemas.microdata_schema import MicrodataSchema, VariableSchema
+from pydantic_schemas.utils.diff import DiffOperation, ItemKey, apply_patch, diff
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
+from pydantic_schemas.video_schema import Model as VideoModel
+
+
+def _microdata() -> MicrodataSchema:
+    generator = SyntheticDataGenerator(seed=9, list_lengths={"variables": 40, "var_catgry": 3, "data_files": 3})
+    microdata = generator.generate(MicrodataSchema)
+    for i, variable in enumerate(microdata.variables):
+        variable.vid = f"V{i}"
+    for i, data_file in enumerate(microdata.data_files):
+        data_file.file_id = f"F{i}"
+    return microdata
+
+
+def test_lists_are_matched_by_identifying_fields():
+    a = _microdata()
+    b = a.model_copy(deep=True)
+    assert diff(a, b) == []
+
+    b.study_desc.title_statement.title = "A new title"
+    b.variables[3].labl = "A new label"
+    b.variables[4].var_intrvl = "discrete" if a.variables[4].var_intrvl == "contin" else "contin"
+    del b.variables[10]
+    b.variables.insert(2, VariableSchema(file_id="F0", vid="V99", name="new", labl="New variable"))
+    b.variables[20].var_catgry[1].label = "A new category"
+    b.data_files[1].file_name = ""
+
+    operations = diff(a, b)
+    assert [(operation.op, operation.path) for operation in operations] == [
+        ("change", "study_desc.title_statement.title"),
+        ("remove", "data_files[file_id=F1].file_name"),
+        ("change", "variables[vid=V3].labl"),
+        ("change", "variables[vid=V4].var_intrvl"),
+        ("remove", "variables[vid=V10]"),
+        ("change", "variables[vid=V20].var_catgry[1].label"),
+        ("add", "variables[vid=V99]"),
+    ]
+    assert operations[2] == DiffOperation(
+        "change", ("variables", ItemKey("vid", "V3"), "labl"), a.variables[3].labl, "A new label"
+    )
+    assert operations[-1].index == 2
+
+    original = a.model_copy(deep=True)
+    patched = apply_patch(a, operations)
+    assert patched == b
+    assert a == original
+
+
+def test_reordered_items_are_reported():
+    a = _microdata()
+    b = a.model_copy(deep=True)
+    b.variables.insert(0, b.variables.pop(5))
+    del b.variables[1]
+    b.variables.append(VariableSchema(file_id="F0", vid="V99", name="new", labl="New variable"))
+
+    operations = diff(a, b)
+    assert [(operation.op, operation.path) for operation in operations] == [
+        ("remove", "variables[vid=V0]"),
+        ("add", "variables[vid=V99]"),
+        ("reorder", "variables"),
+    ]
+    assert operations[-1].new[:3] == [ItemKey("vid", "V5"), ItemKey("vid", "V1"), ItemKey("vid", "V2")]
+    assert apply_patch(a, operations) == b
+
+    with pytest.raises(KeyError, match="not those of the reorder"):
+        apply_patch(a, operations[-1:])
+
+
+def test_new_items_are_validated():
+    a = _microdata()
+    operations = [
+        DiffOperation("add", ("variables", ItemKey("vid", "V99")), None, {"file_id": "F0", "vid": "V99"}, 0),
+    ]
+    with pytest.raises(ValidationError):
+        apply_patch(a, operations)
+
+    operations[0].new = {"file_id": "F0", "vid": "V99", "name": "new", "labl": "New variable"}
+    operations.append(DiffOperation("change", ("variables", ItemKey("vid", "V1"), "var_catgry", 0), None, {}))
+    patched = apply_patch(a, operations)
+    assert patched.variables[0] == VariableSchema(file_id="F0", vid="V99", name="new", labl="New variable")
+    assert isinstance(patched.variables[2].var_catgry[0], type(a.variables[1].var_catgry[0]))
+
+
+def test_empty_values_are_the_same():
+    a = VideoModel(video_description={"idno": "v1", "title": "A video", "keywords": None, "contacts": []})
+    b = VideoModel(video_description={"idno": "v1", "title": "A video", "keywords": [], "contacts": [{"name": ""}]})
+    assert diff(a, b) == []
+
+    b.video_description.keywords = [{"name": "rain"}]
+    b.video_description.title = ""
+    assert [(operation.op, operation.path) for operation in diff(a, b)] == [
+        ("remove", "video_description.title"),
+        ("add", "video_description.keywords"),
+    ]
+
+
+def test_lists_without_identifying_fields_are_compared_by_position():
+    a = _microdata()
+    b = a.model_copy(deep=True)
+    b.variables[0].var_catgry[1].label = "A new category"
+    b.variables[1].var_catgry.append(b.variables[2].var_catgry[0])
+    del b.variables[2].var_catgry[1:]
+
+    assert [(operation.op, operation.path) for operation in diff(a, b)] == [
+        ("change", "variables[vid=V0].var_catgry[1].label"),
+        ("add", "variables[vid=V1].var_catgry[3]"),
+        ("remove", "variables[vid=V2].var_catgry[2]"),
+        ("remove", "variables[vid=V2].var_catgry[1]"),
+    ]
+    assert apply_patch(a, diff(a, b)) == b
+
+
+def test_errors():
+    a = _microdata()
+    with pytest.raises(ValueError, match="same type"):
+        diff(a, a.variables[0])
+    with pytest.raises(KeyError):
+        apply_patch(a, [DiffOperation("change", ("variables", ItemKey("vid", "nope"), "labl"), None, "x")])
@@ -0,0 +1,83 @@
+import pytest
+from openpyxl import load_workbook
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.embedded_payload import PAYLOAD_SHEET, read_payload
+from pydantic_schemas.utils.pydantic_to_excel import create_version
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
+from pydantic_schemas.utils.tracing import SpanCollector, use_tracer
+
+
+def _sheets_read(mm, filename, **kwargs):
+    collector = SpanCollector()
+    with use_tracer(collector):
+        metadata = mm.read_metadata_from_excel(filename, **kwargs)
+    return metadata, [span.attributes["sheet"] for span in collector.spans_named("excel.read_sheet")]
+
+
+def _edit_cell(filename, sheetname, label, value):
+    """Set the value of the first row labelled label, which is two columns to the right of the label"""
+    workbook = load_workbook(filename)
+    worksheet = workbook[sheetname]
+    for row in worksheet.iter_rows():
+        for cell in row:
+            if cell.value == label:
+                worksheet.cell(cell.row, cell.column + 2).value = value
+                workbook.save(filename)
+                return
+    raise KeyError(label)
+
+
+@pytest.mark.parametrize("metadata_name", ["document", "microdata", "indicator", "resource", "table", "video"])
+def test_unchanged_file_is_read_from_the_payload(tmpdir, metadata_name):
+    mm = MetadataManager()
+    schema = mm.metadata_class_from_name(metadata_name)
+    metadata = SyntheticDataGenerator(seed=5, list_length=2).generate(schema)
+    filename = mm.save_metadata_to_excel(
+        metadata, str(tmpdir.join(f"{metadata_name}.xlsx")), title="title", embed_payload=True
+    )
+    assert load_workbook(filename)[PAYLOAD_SHEET].sheet_state == "veryHidden"
+
+    parsed, parsed_sheets = _sheets_read(mm, filename, use_payload=False)
+    assert len(parsed_sheets) > 0
+    embedded, embedded_sheets = _sheets_read(mm, filename)
+    assert embedded_sheets == []
+    assert embedded == parsed
+    assert mm.excel_to_json(filename, validate="full") == parsed.model_dump(mode="json", by_alias=True)
+
+
+def test_only_edited_sheets_are_parsed(tmpdir):
+    mm = MetadataManager()
+    schema = mm.metadata_class_from_name("microdata")
+    metadata = SyntheticDataGenerator(seed=5, list_length=2).generate(schema)
+    filename = mm.save_metadata_to_excel(
+        metadata, str(tmpdir.join("microdata.xlsx")), title="title", embed_payload=True
+    )
+    _edit_cell(filename, "metadata", "repositoryid", "edited")
+
+    edited, sheets = _sheets_read(mm, filename)
+    assert sheets == ["metadata"]
+    assert edited.repositoryid == "edited"
+    assert edited == mm.read_metadata_from_excel(filename, use_payload=False)
+    assert mm.excel_to_json(filename)["repositoryid"] == "edited"
+
+
+def test_payload_is_only_used_when_it_matches(tmpdir):
+    mm = MetadataManager()
+    video = mm.create_metadata_outline("video")
+    video.video_description.title = "A video"
+    filename = mm.save_metadata_to_excel(video, str(tmpdir.join("video.xlsx")))
+    assert PAYLOAD_SHEET not in load_workbook(filename).sheetnames
+    assert read_payload(filename, create_version(type(video))) is None
+
+    filename = mm.save_metadata_to_excel(video, str(tmpdir.join("video_payload.xlsx")), embed_payload=True)
+    assert read_payload(filename, "metadata_type: video, metadata_type_version: 0.0.1") is None
+    assert read_payload(filename, create_version(type(video))).is_unchanged
+
+    workbook = load_workbook(filename)
+    workbook[PAYLOAD_SHEET]["A2"] = "not base64"
+    workbook.save(filename)
+    with pytest.warns(UserWarning, match="could not be read"):
+        metadata, sheets = _sheets_read(mm, filename)
+    assert sheets == ["metadata"]
+    assert metadata.video_description.title == "A video"
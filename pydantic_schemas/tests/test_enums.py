@@ -150,3 +150,64 @@ def test_mixed_types():
 
     with pytest.raises(ValueError):
         Indicator(type="Three")
+
+
+def test_case_and_whitespace_insensitive():
+    class IndicatorType(EnumWithValueOrKey):
+        Concept = "concept"
+        Disaggregation = "disaggregation"
+        Derivation = "derivation"
+
+    assert IndicatorType("CONCEPT") == IndicatorType.Concept
+    assert IndicatorType("  Derivation ") == IndicatorType.Derivation
+    assert IndicatorType("disaggregation\n") == IndicatorType.Disaggregation
+
+    class Indicator(BaseModel):
+        type: IndicatorType
+
+    assert Indicator(type=" DERIVATION").type == IndicatorType.Derivation
+
+    with pytest.raises(ValueError):
+        IndicatorType("con cept")
+
+
+def test_ambiguous_normalized_keys_are_not_guessed():
+    class Response(EnumWithValueOrKey):
+        yes = "Yes"
+        YES = "y"
+
+    assert Response("Yes") == Response.yes
+    assert Response("yes") == Response.yes
+    assert Response("YES") == Response.YES
+    with pytest.raises(ValueError):
+        Response("yEs")
+
+
+def test_normalize_many():
+    class IndicatorType(EnumWithValueOrKey):
+        Concept = "concept"
+        Disaggregation = "disaggregation"
+        Derivation = "derivation"
+
+    assert IndicatorType.normalize_many(["Concept", "derivation", None, float("nan"), "", " DISAGGREGATION"]) == [
+        "concept",
+        "derivation",
+        None,
+        None,
+        None,
+        "disaggregation",
+    ]
+
+    with pytest.raises(ValueError):
+        IndicatorType.normalize_many(["Concept", "Invalid"])
+
+    assert IndicatorType.normalize_many(["Concept", "Invalid"], errors="ignore") == ["concept", "Invalid"]
+    assert IndicatorType.normalize_many([["Concept"], {"a": 1}], errors="ignore") == [["Concept"], {"a": 1}]
+    with pytest.raises(ValueError, match=r"\[\['Concept'\]\] are not valid"):
+        IndicatorType.normalize_many(["Concept", ["Concept"]])
+
+    class Mixed(EnumWithValueOrKey):
+        One = 1
+        Two = 2
+
+    assert Mixed.normalize_many([1, "Two", "one"]) == [1, 2, 1]
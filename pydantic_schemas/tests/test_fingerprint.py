@@ -0,0 +1,96 @@
+import gc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pydantic_schemas.microdata_schema import MicrodataSchema, VariableSchema
+from pydantic_schemas.utils import fingerprint as fingerprint_module
+from pydantic_schemas.utils.fingerprint import (
+    EMPTY_FINGERPRINT,
+    FingerprintCache,
+    canonical_json,
+)
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
+from pydantic_schemas.video_schema import Model as VideoModel
+
+
+def _microdata() -> MicrodataSchema:
+    generator = SyntheticDataGenerator(seed=11, list_lengths={"variables": 20, "var_catgry": 3, "data_files": 2})
+    return generator.generate(MicrodataSchema)
+
+
+def test_canonical_form_leaves_out_empty_values():
+    a = VideoModel(video_description={"idno": "v1", "title": "A video", "keywords": None, "contacts": []})
+    b = VideoModel(video_description={"title": "A video", "contacts": [{"name": ""}], "idno": "v1", "keywords": []})
+    assert canonical_json(a) == canonical_json(b) == b'{"video_description":{"idno":"v1","title":"A video"}}'
+    assert a.fingerprint() == b.fingerprint()
+    assert VideoModel(video_description={"idno": "", "title": ""}).fingerprint() == EMPTY_FINGERPRINT
+
+    b.video_description.keywords = [{"name": "rain"}]
+    assert a.fingerprint() != b.fingerprint()
+    assert a.fingerprint("video_description.idno") == b.fingerprint("video_description.idno")
+
+
+def test_a_cache_remembers_fingerprints_until_they_are_forgotten(monkeypatch):
+    a = _microdata()
+    b = a.model_copy(deep=True)
+    cache = FingerprintCache()
+    assert a.fingerprint(cache=cache) == b.fingerprint()
+    assert a == b  # the remembered fingerprints are not part of the model
+
+    study_desc = a.fingerprint("study_desc", cache=cache)
+    variables = a.fingerprint("variables", cache=cache)
+    calls = []
+    monkeypatch.setattr(fingerprint_module, "_hash_pairs", lambda pairs: calls.append(pairs) or b"x")
+    monkeypatch.setattr(fingerprint_module, "_hash_items", lambda items: calls.append(items) or b"x")
+    a.fingerprint(cache=cache)
+    a.fingerprint("variables", cache=cache)
+    a.fingerprint("variables.3", cache=cache)
+    assert calls == []
+    monkeypatch.undo()
+
+    a.variables[3].labl = "A new label"
+    assert a.fingerprint(cache=cache) == b.fingerprint()
+    cache.forget(a.variables[3])
+    assert a.fingerprint(cache=cache) == a.fingerprint() != b.fingerprint()
+    assert a.fingerprint("study_desc", cache=cache) == study_desc
+    assert a.fingerprint("variables", cache=cache) != variables
+    assert a.fingerprint("variables.4", cache=cache) == b.fingerprint("variables.4")
+
+    with a.variables[3].bulk_update():
+        a.variables[3].labl = b.variables[3].labl
+    cache.forget(a.variables[3])
+    assert a.fingerprint(cache=cache) == b.fingerprint()
+
+    del a
+    gc.collect()
+    assert len(cache) == 0
+
+
+def test_fingerprints_are_computed_afresh_by_default():
+    a = _microdata()
+    before = a.fingerprint()
+    a.variables.append(VariableSchema(file_id="F1", vid="V99", name="new", labl="New variable"))
+    assert a.fingerprint() != before
+    del a.variables[-1]
+    assert a.fingerprint() == before
+
+
+def test_a_cache_can_be_shared_between_threads():
+    records = [_microdata() for _ in range(4)]
+    expected = [record.fingerprint(f"variables.{i}") for record in records for i in range(20)]
+    cache = FingerprintCache()
+
+    def fingerprints(_):
+        return [record.fingerprint(f"variables.{i}", cache=cache) for record in records for i in range(20)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert all(result == expected for result in executor.map(fingerprints, range(8)))
+
+
+def test_bad_paths():
+    a = _microdata()
+    with pytest.raises(ValueError, match="has no field"):
+        a.fingerprint("study_desc.colour")
+    with pytest.raises(ValueError, match="not a field or an index"):
+        a.fingerprint("variables.1000")
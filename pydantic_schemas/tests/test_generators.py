@@ -76,3 +76,145 @@ def test_every_schema_has_version():
             m._template_name__.default is None
         ), f"_template_name__ is not None for {v} = {m._template_name__.default}"
         assert m._template_uid__.default is None, f"_template_uid__ is not None for {v} = {m._template_uid__.default}"
+
+
+def test_referenced_files_are_found_transitively():
+    from pydantic_schemas.generators.generate_pydantic_schemas import referenced_files
+
+    assert referenced_files("microdata-schema.json") == [
+        "datafile-schema.json",
+        "ddi-schema.json",
+        "microdata-schema.json",
+        "provenance-schema.json",
+        "variable-group-schema.json",
+        "variable-schema.json",
+    ]
+    assert "iptc-phovidmdshared-schema.json" in referenced_files("image-schema.json")
+    assert referenced_files("video-schema.json") == ["provenance-schema.json", "video-schema.json"]
+
+
+def test_generate_only_regenerates_stale_schemas(tmpdir):
+    import shutil
+    import subprocess
+
+    import pytest
+
+    from pydantic_schemas.generators.generate_pydantic_schemas import generate
+
+    schema_dir = str(tmpdir.join("schemas"))
+    shutil.copytree("schemas", schema_dir)
+    output_dir = str(tmpdir.join("output"))
+    config_file = str(tmpdir.join("config.yaml"))
+    with open("json_to_python_config.yaml") as file:
+        config = yaml.safe_load(file)
+    with open(config_file, "w") as file:
+        yaml.safe_dump({section: config[section] for section in ["microdata", "video"]}, file)
+
+    generated = []
+    failing = set()
+
+    def fake_codegen(input_path, output_path):
+        generated.append(os.path.basename(input_path))
+        if os.path.basename(input_path) in failing:
+            raise subprocess.CalledProcessError(1, "datamodel-codegen", stderr="invalid schema")
+        with open(output_path, "w") as file:
+            file.write(f"from pydantic import BaseModel\nfrom enum import Enum\n# {input_path}\n")
+
+    def run(**kwargs):
+        generated.clear()
+        kwargs = {"schema_dir": schema_dir, "output_dir": output_dir, "codegen": fake_codegen, **kwargs}
+        generate(config_file=config_file, manifest_path=str(tmpdir.join("manifest.json")), **kwargs)
+        return sorted(generated)
+
+    assert run() == ["microdata-schema.json", "video-schema.json"]
+    with open(os.path.join(output_dir, "video_schema.py")) as file:
+        assert "from .utils.enum_with_value_or_key import EnumWithValueOrKey" in file.read()
+    assert run() == []
+
+    # a file referenced by the microdata schema through the ddi schema
+    with open(os.path.join(schema_dir, "variable-schema.json"), "a") as file:
+        file.write("\n")
+    assert run() == ["microdata-schema.json"]
+
+    os.remove(os.path.join(output_dir, "video_schema.py"))
+    assert run() == ["video-schema.json"]
+    assert run(force=True, sections=["video"]) == ["video-schema.json"]
+
+    # a schema that fails to generate is still stale the next time, while the others are recorded
+    with open(os.path.join(schema_dir, "provenance-schema.json"), "a") as file:
+        file.write("\n")
+    failing.add("microdata-schema.json")
+    with pytest.raises(RuntimeError, match="invalid schema"):
+        run()
+    failing.clear()
+    assert run() == ["microdata-schema.json"]
+
+
+def test_workbook_fingerprint_ignores_how_the_file_was_written(tmpdir):
+    import openpyxl
+
+    from pydantic_schemas.generators.generate_excel_files import (
+        compare_excel_files,
+        sheet_fingerprints,
+    )
+
+    mm = MetadataManager()
+    filename1 = mm.write_metadata_outline_to_excel("video", filename=str(tmpdir.join("video1.xlsx")))
+    filename2 = mm.write_metadata_outline_to_excel("video", filename=str(tmpdir.join("video2.xlsx")))
+    assert compare_excel_files(filename1, filename2)
+
+    # resaving renumbers the styles but doesn't change what is shown
+    workbook = openpyxl.load_workbook(filename2)
+    workbook.save(filename2)
+    assert compare_excel_files(filename1, filename2)
+
+    workbook["metadata"]["B2"].font = openpyxl.styles.Font(name="Courier New")
+    workbook.save(filename2)
+    assert not compare_excel_files(filename1, filename2)
+
+    # a cell added to the second workbook is a difference too
+    workbook = openpyxl.load_workbook(filename1)
+    workbook["metadata"].cell(workbook["metadata"].max_row + 1, 2).value = "new field"
+    workbook.save(filename2)
+    assert sheet_fingerprints(filename1)["metadata"] != sheet_fingerprints(filename2)["metadata"]
+
+
+def test_generate_excel_files_only_replaces_changed_outlines(tmpdir):
+    import openpyxl
+
+    from pydantic_schemas.generators.generate_excel_files import generate, outline_path
+
+    excel_dir = str(tmpdir.join("excel_sheets"))
+    manifest_path = str(tmpdir.join("manifest.json"))
+
+    def run(**kwargs):
+        return sorted(generate(["video", "table"], excel_dir=excel_dir, manifest_path=manifest_path, jobs=2, **kwargs))
+
+    assert run() == ["table", "video"]
+    video_file = outline_path("video", excel_dir)
+    with open(video_file, "rb") as file:
+        written = file.read()
+
+    assert run() == []
+    # written again, but the same as the committed outline, which is left alone
+    assert run(force=True) == []
+    with open(video_file, "rb") as file:
+        assert file.read() == written
+
+    workbook = openpyxl.load_workbook(video_file)
+    workbook["metadata"]["B2"] = "edited"
+    workbook.save(video_file)
+    assert run() == ["video"]
+    assert openpyxl.load_workbook(video_file)["metadata"]["B2"].value != "edited"
+    assert sorted(os.listdir(excel_dir)) == ["Table_metadata.xlsx", "Video_metadata.xlsx"]
+
+
+def test_outline_inputs_are_the_schema_and_the_writer_modules():
+    from pydantic_schemas.generators.generate_excel_files import (
+        PACKAGE_DIR,
+        WRITER_MODULES,
+        input_fingerprint,
+    )
+
+    assert all(os.path.exists(os.path.join(PACKAGE_DIR, path)) for path in WRITER_MODULES)
+    assert input_fingerprint("video") == input_fingerprint("video") != input_fingerprint("microdata")
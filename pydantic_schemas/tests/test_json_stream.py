@@ -0,0 +1,109 @@
+import gzip
+import io
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from pydantic_schemas.microdata_schema import (
+    DatafileSchema,
+    MicrodataSchema,
+    VariableSchema,
+)
+from pydantic_schemas.utils.json_stream import (
+    iter_json_fields,
+    streamable_fields,
+    write_json_fields,
+)
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
+
+
+def _microdata_json() -> bytes:
+    generator = SyntheticDataGenerator(
+        seed=3, list_lengths={"variables": 23, "var_catgry": 2, "data_files": 3, "variable_groups": 2}
+    )
+    stream = io.StringIO()
+    generator.write_json(MicrodataSchema, stream)
+    return stream.getvalue().encode()
+
+
+def test_streamable_fields():
+    assert {"data_files", "variables", "variable_groups"} <= set(streamable_fields(MicrodataSchema))
+    assert "study_desc" not in streamable_fields(MicrodataSchema)
+
+
+@pytest.mark.parametrize("batch_size", [None, 1, 5, 100])
+def test_fields_are_read_item_by_item_and_written_back(batch_size):
+    data = _microdata_json()
+    expected = MicrodataSchema.model_validate_json(data)
+
+    # a small buffer splits values, strings and escapes across reads
+    fields = list(iter_json_fields(io.BytesIO(data), MicrodataSchema, batch_size=batch_size, buffer_size=16))
+    variables = [value for field, value in fields if field == "variables"]
+    if batch_size is None:
+        assert all(isinstance(v, VariableSchema) for v in variables)
+        assert variables == expected.variables
+    else:
+        assert all(len(batch) <= batch_size for batch in variables)
+        assert [v for batch in variables for v in batch] == expected.variables
+    assert dict(fields)["study_desc"] == expected.study_desc
+
+    out = io.BytesIO()
+    write_json_fields(fields, out, MicrodataSchema)
+    assert MicrodataSchema.model_validate_json(out.getvalue()) == expected
+
+
+def test_only_the_chosen_fields_are_streamed(tmpdir):
+    data = _microdata_json()
+    filename = str(tmpdir.join("microdata.json.gz"))
+    with gzip.open(filename, "wb") as f:
+        f.write(data)
+
+    fields = list(iter_json_fields(filename, MicrodataSchema, streamed_fields=["data_files"]))
+    names = [field for field, _ in fields]
+    assert names.count("data_files") == 3 and names.count("variables") == 1
+    assert all(isinstance(value, DatafileSchema) for field, value in fields if field == "data_files")
+
+    out = io.StringIO()
+    write_json_fields(fields, out, MicrodataSchema, streamed_fields=["data_files"])
+    assert MicrodataSchema.model_validate_json(out.getvalue()) == MicrodataSchema.model_validate_json(data)
+
+    with pytest.raises(ValueError, match="not a list of models"):
+        list(iter_json_fields(filename, MicrodataSchema, streamed_fields=["study_desc"]))
+
+
+def test_values_spanning_many_reads():
+    # long enough that scanning a value again on each read would take minutes
+    label = 'a "quoted" \\ label ' * 100_000
+    categories = [{"value": str(i), "label": f"category {i}"} for i in range(20_000)]
+    variable = VariableSchema(file_id="F1", vid="V1", name="a", labl=label, var_catgry=categories)
+    data = json.dumps({"variables": [variable.model_dump(exclude_none=True)]}).encode()
+    fields = list(iter_json_fields(io.BytesIO(data), MicrodataSchema, buffer_size=1024))
+    assert fields == [("variables", variable)]
+
+
+def test_errors_are_located_in_the_whole_model():
+    data = json.loads(_microdata_json())
+    data["variables"][12]["var_intrvl"] = 5
+    with pytest.raises(ValidationError) as expected:
+        MicrodataSchema.model_validate(data)
+    for batch_size in (None, 5):
+        with pytest.raises(ValidationError) as e:
+            list(iter_json_fields(io.BytesIO(json.dumps(data).encode()), MicrodataSchema, batch_size=batch_size))
+        assert e.value.errors()[0]["loc"] == expected.value.errors()[0]["loc"] == ("variables", 12, "var_intrvl")
+
+    with pytest.raises(ValidationError) as e:
+        list(iter_json_fields(io.BytesIO(b'{"file_id": "F1", "name": "a", "labl": "A"}'), VariableSchema))
+    assert [error["loc"] for error in e.value.errors()] == [("vid",)]
+
+    with pytest.raises(ValueError, match="end of the document"):
+        list(iter_json_fields(io.BytesIO(b'{"variables": [{"name": "a"'), MicrodataSchema))
+    with pytest.raises(ValueError, match="Expected '{'"):
+        list(iter_json_fields(io.BytesIO(b"[1, 2]"), MicrodataSchema))
+
+
+def test_a_field_cannot_be_written_twice():
+    with pytest.raises(ValueError, match="written twice"):
+        write_json_fields([("doc_desc", None), ("variables", []), ("doc_desc", None)], io.BytesIO(), MicrodataSchema)
+    with pytest.raises(ValueError, match="has no field"):
+        write_json_fields([("colour", None)], io.BytesIO(), MicrodataSchema)
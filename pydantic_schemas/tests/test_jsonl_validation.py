@@ -0,0 +1,118 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.jsonl import JsonlRecordError
+from pydantic_schemas.utils.parallel import chunks, imap_ordered
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
+
+
+def _catalog(n_records: int = 6):
+    """Records of alternating types, labelled as a catalog would, and the models they should validate to"""
+    mm = MetadataManager()
+    generator = SyntheticDataGenerator(seed=4, list_length=2)
+    records, expected = [], []
+    for i in range(n_records):
+        type_name, metadata_name = [("survey", "microdata"), ("video", "video"), ("timeseries", "indicator")][i % 3]
+        model = generator.generate(mm.metadata_class_from_name(metadata_name))
+        records.append({"type": type_name, **model.model_dump(mode="json", by_alias=True)})
+        expected.append(model)
+    return records, expected
+
+
+def _write_jsonl(path, records, extra_lines=()):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        for line in extra_lines:
+            f.write(line + "\n")
+    return str(path)
+
+
+def test_records_are_validated_as_their_type(tmpdir):
+    mm = MetadataManager()
+    records, expected = _catalog()
+    filename = _write_jsonl(tmpdir.join("catalog.jsonl"), records, ["", '{"type": "video", "video_description": 3}'])
+
+    results = list(mm.iter_validate_jsonl(filename))
+    assert results[:-1] == expected
+    error = results[-1]
+    assert isinstance(error, JsonlRecordError)
+    assert (error.line_number, error.metadata_name) == (len(records) + 2, "video")
+    assert error.errors[0]["loc"] == ("video_description",)
+    assert "input" not in error.errors[0]
+
+    # the same from an open stream, in text or binary mode, and from a gzipped file
+    with open(filename) as f:
+        assert list(mm.iter_validate_jsonl(f)) == results
+    with open(filename, "rb") as f, gzip.open(str(tmpdir.join("catalog.jsonl.gz")), "wb") as gz:
+        gz.write(f.read())
+    assert list(mm.iter_validate_jsonl(str(tmpdir.join("catalog.jsonl.gz")))) == results
+
+
+def test_records_of_a_fixed_type_and_broken_records():
+    mm = MetadataManager()
+    records, expected = _catalog(3)
+    video = records[1]
+    del video["type"]
+    stream = io.StringIO("\n".join([json.dumps(video), "{not json", "[1, 2]"]))
+    results = list(mm.iter_validate_jsonl(stream, "video"))
+    assert results[0] == expected[1]
+    assert [(r.line_number, r.metadata_name) for r in results[1:]] == [(2, "video"), (3, "video")]
+    assert results[1].message == "1 validation error for Model"
+    assert results[1].errors[0]["type"] == "json_invalid"
+
+    stream = io.StringIO("\n".join([json.dumps(video), json.dumps({"type": "movie"}), "[1, 2]"]))
+    results = list(mm.iter_validate_jsonl(stream))
+    assert [r.message for r in results] == [
+        "The record has no 'type' field",
+        f"'movie' not supported. Must be: {mm.metadata_type_names}",
+        "The record has no 'type' field",
+    ]
+    with pytest.raises(ValueError, match="not supported"):
+        list(mm.iter_validate_jsonl(stream, "movie"))
+    with pytest.raises(ValueError, match="output should be"):
+        list(mm.iter_validate_jsonl(stream, output="dicts"))
+
+
+def test_lenient_records_are_filled_in():
+    mm = MetadataManager()
+    stream = io.StringIO(json.dumps({"type": "table", "table_description": {"title_statement": {"title": "t"}}}))
+    (error,) = mm.iter_validate_jsonl(stream)
+    assert error.errors[0]["loc"] == ("table_description", "title_statement", "idno")
+    stream.seek(0)
+    (table,) = mm.iter_validate_jsonl(stream, lenient=True)
+    assert table.table_description.title_statement.idno == ""
+
+
+def test_processes_give_the_same_results_in_order(tmpdir):
+    mm = MetadataManager()
+    records, _ = _catalog(7)
+    filename = _write_jsonl(tmpdir.join("catalog.jsonl"), records, ['{"type": "video", "video_description": 3}'])
+    expected = list(mm.iter_validate_jsonl(filename))
+    assert list(mm.iter_validate_jsonl(filename, processes=2, chunk_size=2)) == expected
+    as_json = list(mm.iter_validate_jsonl(filename, output="json", processes=2, chunk_size=3))
+    assert as_json[:-1] == [model.model_dump_json(by_alias=True).encode() for model in expected[:-1]]
+    assert as_json[-1] == expected[-1]
+    assert list(mm.iter_validate_jsonl(filename, output="errors", processes=2)) == [expected[-1]]
+    assert list(mm.iter_validate_jsonl(filename, "auto", processes=3, chunk_size=1, lenient=True)) == list(
+        mm.iter_validate_jsonl(filename, lenient=True)
+    )
+
+
+def test_imap_ordered_bounds_the_work_in_flight():
+    read = []
+
+    def items():
+        for i in range(20):
+            read.append(i)
+            yield i
+
+    results = imap_ordered(abs, items(), processes=2, max_pending=3)
+    assert next(results) == 0
+    assert len(read) == 3
+    assert list(results) == list(range(1, 20))
+    assert list(chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
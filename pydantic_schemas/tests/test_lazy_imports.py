@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl", "rich"]
+
+
+def _modules_loaded_after(import_statement: str) -> dict:
+    """Run the import in a fresh interpreter, since this test process has most likely imported pandas already."""
+    code = (
+        "import json, sys\n"
+        f"{import_statement}\n"
+        f"print(json.dumps({{m: m in sys.modules for m in {HEAVY_MODULES!r}}}))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "import_statement",
+    [
+        "from pydantic_schemas import microdata_schema",
+        "from pydantic_schemas import geospatial_schema",
+        "from pydantic_schemas.metadata_manager import MetadataManager",
+        "from pydantic_schemas.metadata_manager import MetadataManager; "
+        "MetadataManager().create_metadata_outline('indicator')",
+    ],
+)
+def test_plain_import_does_not_load_heavy_modules(import_statement):
+    loaded = _modules_loaded_after(import_statement)
+    assert not any(loaded.values()), f"heavy modules imported eagerly: {[m for m, v in loaded.items() if v]}"
+
+
+def test_excel_path_loads_excel_stack(tmpdir):
+    filename = tmpdir.join("lazy_outline.xlsx")
+    loaded = _modules_loaded_after(
+        "from pydantic_schemas.metadata_manager import MetadataManager; "
+        f"MetadataManager().write_metadata_outline_to_excel('video', filename={str(filename)!r})"
+    )
+    assert loaded["openpyxl"]
+    assert loaded["pandas"]
+    assert not loaded["rich"]
@@ -0,0 +1,42 @@
+import tracemalloc
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.memory_profiling import MemoryProfiler
+from pydantic_schemas.utils.tracing import SpanCollector, Tracer, get_tracer, use_tracer
+
+
+def test_memory_profiler_reports_each_phase(tmpdir):
+    mm = MetadataManager()
+    video = mm.create_metadata_outline("video")
+    video.video_description.title = "A video"
+
+    collector = SpanCollector()
+    save_profiler = MemoryProfiler(top_n=2)
+    read_profiler = MemoryProfiler(top_n=2, max_snapshots_per_phase=1)
+    with use_tracer(collector):
+        filename = mm.save_metadata_to_excel(video, tmpdir.join("video.xlsx"), memory_profiler=save_profiler)
+        read_video = mm.read_metadata_from_excel(filename, memory_profiler=read_profiler, use_payload=False)
+        # the tracer in use before profiling is restored and still sees every span
+        assert get_tracer() is collector
+    assert type(get_tracer()) is Tracer
+    assert not tracemalloc.is_tracing()
+    assert read_video.video_description.title == "A video"
+    assert "excel.write_sheet" in collector.summary()
+
+    save_result = save_profiler.result
+    assert {"skeleton", "merge", "dataframe build", "sheet write", "save"} <= set(save_result["phases"])
+    # saving writes the dump of the model it is given, without validating a new model
+    assert "validation" not in save_result["phases"]
+    read_result = read_profiler.result
+    assert {"workbook load", "model instantiation", "skeleton", "merge", "validation"} <= set(read_result["phases"])
+    for result in [save_result, read_result]:
+        assert result["peak_bytes"] > 0
+        for phase in result["phases"].values():
+            assert phase["calls"] >= 1
+            assert phase["peak_bytes"] >= phase["peak_increase_bytes"] >= 0
+            assert len(phase["top_allocations"]) <= 2
+            for site in phase["top_allocations"]:
+                assert site["size_bytes"] > 0
+                assert "memory_profiling.py" not in site["site"]
+    assert save_result["phases"]["sheet write"]["top_allocations"]
+    assert "sheet write" in save_profiler.format_result()
@@ -1,11 +1,16 @@
+import json
 from typing import List, Optional
 
 import pytest
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, field_validator
+from pydantic_core import PydanticCustomError
 from utils.schema_base_model import SchemaBaseModel
 from utils.test_utils import assert_pydantic_models_equal, fill_in_pydantic_outline
 
 from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.microdata_schema import MicrodataSchema
+from pydantic_schemas.utils import utils
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
 
 
 @pytest.mark.parametrize(
@@ -67,6 +72,142 @@ def test_metadata_by_class(tmpdir, metadata_name):
     mm.read_metadata_from_excel(filename=filename_class)
 
 
+def _cell_values(filename):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filename)
+    return {
+        ws.title: [[cell.value for cell in row] for row in ws.iter_rows()]
+        for ws in workbook
+        if ws.sheet_state == "visible"
+    }
+
+
+@pytest.mark.parametrize("metadata_name", ["document", "microdata", "indicator", "geospatial", "video"])
+def test_save_writes_the_merged_dump_without_validating_again(tmpdir, monkeypatch, metadata_name):
+    mm = MetadataManager()
+    schema = mm.metadata_class_from_name(metadata_name)
+    metadata = SyntheticDataGenerator(seed=3).generate(schema)
+    skeleton_dump = mm.create_metadata_outline(schema).model_dump()
+    combined = utils.merge_dicts(
+        skeleton_dump,
+        metadata.model_dump(exclude_none=False, exclude_unset=True, exclude_defaults=True),
+        skeleton_mode=True,
+    )
+    validated = schema.model_validate(utils.standardize_keys_in_dict(combined))
+    assert utils.normalize_model_dump(schema, combined) == validated.model_dump()
+
+    # the model that was written before the save pipeline was changed to write the merged dump directly
+    expected_filename = str(tmpdir.join(f"{metadata_name}_expected.xlsx"))
+    mm._resolve(schema).writer(expected_filename, validated, "title")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("validated during save")
+
+    monkeypatch.setattr(schema, "model_validate", fail)
+    monkeypatch.setattr(utils, "subset_pydantic_model", fail)
+    filename = mm.save_metadata_to_excel(metadata, str(tmpdir.join(f"{metadata_name}.xlsx")), title="title")
+    monkeypatch.undo()
+    assert _cell_values(filename) == _cell_values(expected_filename)
+
+
+def test_normalize_model_dump_fills_defaults_and_drops_unknown_fields():
+    class Inner(BaseModel):
+        a: Optional[str] = None
+        b: List[str] = ["b"]
+
+    class Outer(BaseModel):
+        inner: Optional[Inner] = None
+        inners: Optional[List[Inner]] = None
+        x: int = 1
+
+    data = {"inners": [{"a": "a"}, {"b": [], "unknown": 1}], "inner": {}, "unknown": 2}
+    normalized = utils.normalize_model_dump(Outer, data)
+    assert normalized == Outer.model_validate(data).model_dump()
+    assert list(normalized) == ["inner", "inners", "x"]
+    assert normalized["inner"]["b"] is not Inner.model_fields["b"].default
+
+
+@pytest.mark.parametrize("metadata_name", ["document", "microdata", "indicator", "geospatial", "table", "video"])
+def test_excel_to_json_matches_reading_the_model(tmpdir, metadata_name):
+    mm = MetadataManager()
+    schema = mm.metadata_class_from_name(metadata_name)
+    metadata = mm.create_metadata_outline(schema)
+    fill_in_pydantic_outline(metadata)
+    filename = mm.save_metadata_to_excel(metadata, str(tmpdir.join(f"{metadata_name}.xlsx")), title="title")
+    expected = mm.read_metadata_from_excel(filename).model_dump(mode="json", by_alias=True)
+
+    assert mm.excel_to_json(filename, validate="full") == expected
+    fast = mm.excel_to_json(filename, validate="fast")
+    assert fast == mm.excel_to_json(filename)
+    assert schema.model_validate(fast).model_dump(mode="json", by_alias=True) == expected
+
+
+def test_excel_to_json_does_not_instantiate_models(tmpdir, monkeypatch):
+    mm = MetadataManager()
+    schema = mm.metadata_class_from_name("microdata")
+    metadata = SyntheticDataGenerator(seed=1, list_length=2, max_depth=4).generate(schema)
+    filename = mm.save_metadata_to_excel(metadata, str(tmpdir.join("microdata.xlsx")), title="title")
+    _, reader = mm._entry_and_reader_for_excel_file(filename)
+    # the first read measures the layout of each list from a skeleton, which is then cached
+    expected = reader(filename, schema, as_dict=True)
+
+    def fail(self, *args, **kwargs):
+        raise AssertionError(f"instantiated {type(self).__name__}")
+
+    monkeypatch.setattr(BaseModel, "__init__", fail)
+    assert reader(filename, schema, as_dict=True) == expected
+    monkeypatch.undo()
+
+    with pytest.raises(ValueError, match="validate should be"):
+        mm.excel_to_json(filename, validate="yes")
+
+
+@pytest.mark.parametrize(
+    "metadata_name",
+    [
+        "document",
+        "geospatial",
+        "image",
+        "indicator",
+        "indicators_db",
+        "microdata",
+        "resource",
+        "script",
+        "table",
+        "video",
+    ],
+)
+def test_validate_json_matches_validating_the_dict(metadata_name):
+    mm = MetadataManager()
+    schema = mm.metadata_class_from_name(metadata_name)
+    metadata = SyntheticDataGenerator(seed=3, list_length=2).generate(schema)
+    data = metadata.model_dump_json(by_alias=True).encode()
+
+    expected = schema.model_validate(json.loads(data))
+    assert mm.validate_json(metadata_name, data) == expected
+    assert mm.validate_json(schema, memoryview(data)) == expected
+    assert mm.validate_json(metadata_name, memoryview(data)[0:]) == expected
+    assert mm.validate_json(metadata_name, data, lenient=True) == expected
+
+
+def test_validate_json_lenient_fills_in_what_is_missing():
+    mm = MetadataManager()
+    data = b'{"table_description": {"title_statement": {"title": "t"}, "time_periods": [{"from_": "2000"}]}}'
+    with pytest.raises(ValidationError, match="idno"):
+        mm.validate_json("table", data)
+
+    table = mm.validate_json("table", data, lenient=True)
+    assert table.table_description.title_statement.title == "t"
+    assert table.table_description.title_statement.idno == ""
+    assert [period.from_ for period in table.table_description.time_periods] == ["2000"]
+
+    with pytest.raises(ValidationError, match="Invalid JSON"):
+        mm.validate_json("table", b'{"repositoryid": ')
+    with pytest.raises(ValueError, match="Expected a JSON object"):
+        mm.validate_json("table", b"[]", lenient=True)
+
+
 def test_standardize_metadata_name():
     mm = MetadataManager()
     inputs = [
@@ -159,3 +300,152 @@ def test_write_read_and_save_for_templates(tmpdir):
 
     actual = mm.read_metadata_from_excel(filename2, TopLevel)
     assert actual == example
+
+
+def test_registry_resolves_names_aliases_classes_and_instances():
+    mm = MetadataManager()
+    for metadata_name, schema in mm._TYPE_TO_SCHEMA.items():
+        entry = mm._resolve(metadata_name)
+        assert entry.schema is schema
+        assert entry.is_standard
+        assert mm._resolve(schema) is entry
+        assert mm._resolve(metadata_name.upper().replace("_", "-")) is entry
+        assert mm.metadata_class_from_name(metadata_name) is schema
+        assert entry.metadata_type == metadata_name
+        assert entry.metadata_type_version is not None
+        assert entry.template_uid is None
+
+    assert mm._resolve("survey") is mm._resolve("microdata")
+    assert mm._resolve("timeseries") is mm._resolve("indicator")
+    assert mm._resolve("timeseries_db") is mm._resolve("indicators_db")
+    assert mm._resolve(mm.create_metadata_outline("video")) is mm._resolve("video")
+
+    with pytest.raises(ValueError):
+        mm._resolve("Bad-name")
+
+
+def test_registry_does_not_keep_other_template_classes():
+    class MyTemplate(SchemaBaseModel):
+        title: Optional[str] = None
+        _metadata_type__ = "document"
+        _metadata_type_version__ = "0.1.0"
+        _template_uid__ = "registry-test-uid"
+        _template_name__ = "Registry Test"
+
+    mm = MetadataManager()
+    entry = mm._resolve(MyTemplate)
+    assert not entry.is_standard
+    assert entry.metadata_name == "MyTemplate"
+    assert entry.template_uid == "registry-test-uid"
+    assert entry.template_name == "Registry Test"
+    assert entry.writer_name == "write_to_single_sheet"
+    assert entry.reader_name == mm._resolve("document").reader_name
+
+    assert MyTemplate not in mm._REGISTRY_BY_CLASS
+    assert mm._resolve(MyTemplate(title="a")).schema is MyTemplate
+    with pytest.raises(ValueError):
+        mm._resolve("registry-test-uid")
+
+
+def test_create_template_class_is_cached_and_read_back_without_class(tmpdir):
+    template_definition = {
+        "uid": "test-minimal-survey",
+        "name": "Minimal survey",
+        "metadata_type": "survey",
+        "fields": [
+            "repositoryid",
+            "study_desc.title_statement.idno",
+            "study_desc.title_statement.title",
+            "variables.name",
+            "variables.labl",
+        ],
+        "labels": {"study_desc.title_statement.title": "Survey title"},
+    }
+    mm = MetadataManager()
+    template_class = mm.create_template_class(template_definition)
+    assert mm.create_template_class(dict(template_definition)) is template_class
+    assert MetadataManager()._resolve("test-minimal-survey").schema is template_class
+    with pytest.raises(ValueError, match="different template"):
+        mm.create_template_class({**template_definition, "name": "Another survey"})
+    # a template uid can not take the place of a standard metadata type
+    microdata_template = mm.create_template_class({**template_definition, "uid": "microdata"})
+    assert mm._resolve(microdata_template).template_uid == "microdata"
+    assert mm.metadata_class_from_name("microdata") is MicrodataSchema
+    assert mm._resolve("microdata").schema is MicrodataSchema
+
+    assert list(template_class.model_fields) == ["study_desc", "variables", "repositoryid"]
+    example = template_class(
+        repositoryid="repo",
+        study_desc={"title_statement": {"idno": "idno", "title": "the title"}},
+        variables=[{"name": "v1", "labl": "label 1"}, {"name": "v2", "labl": "label 2"}],
+    )
+    title_statement_fields = example.study_desc.title_statement.model_fields
+    assert list(title_statement_fields) == ["idno", "title"]
+    assert title_statement_fields["title"].title == "Survey title"
+
+    filename = mm.save_metadata_to_excel(example, filename=tmpdir.join("test_template_definition.xlsx"))
+    assert mm.get_metadata_type_info_from_excel_file(filename) == {
+        "metadata_type": "microdata",
+        "metadata_type_version": "0.1.0",
+        "template_uid": "test-minimal-survey",
+        "template_name": "Minimal survey",
+    }
+
+    actual = MetadataManager().read_metadata_from_excel(filename)
+    assert type(actual) is template_class
+    assert actual == example
+
+    with pytest.raises(ValueError):
+        mm.create_template_class({**template_definition, "uid": "test-bad-field", "fields": ["not_a_field"]})
+
+
+def test_validate_in_parallel():
+    mm = MetadataManager()
+    generator = SyntheticDataGenerator(seed=8, list_lengths={"variables": 45, "var_catgry": 2, "data_files": 3})
+    data = generator.generate(mm.metadata_class_from_name("microdata")).model_dump(mode="json", by_alias=True)
+    expected = mm.metadata_class_from_name("microdata").model_validate(data)
+    for processes in [1, 2]:
+        actual = mm.validate_in_parallel("microdata", data, processes=processes, chunk_size=10)
+        assert actual == expected
+        assert actual.model_fields_set == expected.model_fields_set
+    assert len(data["variables"]) == 45
+
+    invalid = {**data, "variables": [dict(v) for v in data["variables"]], "study_desc": 3}
+    invalid["variables"][37]["var_intrvl"] = 5
+    with pytest.raises(ValidationError) as e:
+        mm.validate_in_parallel("microdata", invalid, processes=2, chunk_size=10)
+    assert [error["loc"] for error in e.value.errors()] == [("study_desc",), ("variables", 37, "var_intrvl")]
+
+    geospatial_class = mm.metadata_class_from_name("geospatial")
+    generator = SyntheticDataGenerator(seed=8, list_lengths={"featureType": 25, "memberNames": 2})
+    data = generator.generate(geospatial_class).model_dump(mode="json", by_alias=True)
+    assert len(data["description"]["feature_catalogue"]["featureType"]) == 25
+    actual = mm.validate_in_parallel("geospatial", data, processes=1, chunk_size=4)
+    assert actual == geospatial_class.model_validate(data)
+
+    with pytest.raises(ValueError, match="not a list of models"):
+        mm.validate_in_parallel("microdata", data, list_fields=["study_desc"])
+
+
+def test_validate_in_parallel_keeps_custom_errors():
+    class Item(BaseModel):
+        value: int
+
+        @field_validator("value")
+        @classmethod
+        def check_value(cls, value):
+            if value < 0:
+                raise PydanticCustomError("negative", "{value} is negative", {"value": value})
+            return value
+
+    class Doc(BaseModel):
+        title: str
+        items: List[Item]
+
+    data = {"title": 1, "items": [{"value": 1}, {"value": -2}, {"value": "x"}, {"value": -4}]}
+    with pytest.raises(ValidationError) as expected:
+        Doc.model_validate(data)
+    with pytest.raises(ValidationError) as e:
+        MetadataManager().validate_in_parallel(Doc, data, processes=1, chunk_size=2, list_fields=["items"])
+    assert e.value.errors(include_url=False) == expected.value.errors(include_url=False)
+    assert [error["type"] for error in e.value.errors()] == ["string_type", "negative", "int_parsing", "negative"]
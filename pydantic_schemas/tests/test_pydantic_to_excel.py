@@ -542,8 +542,8 @@ def test_write_real_skeleton(tmpdir, name, type_writer_reader):
     # assert False
 
 
-def test_demo():
-    filename = "demo_output.xlsx"
+def test_demo(tmpdir):
+    filename = os.path.join(tmpdir, "demo_output.xlsx")
     sheet_title = "Formatting metadata examples"
 
     class SingleLevelData(BaseModel):
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.read_cache import ReadCache
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
+from pydantic_schemas.utils.tracing import SpanCollector, use_tracer
+
+
+def _read(mm, filename, cache):
+    collector = SpanCollector()
+    with use_tracer(collector):
+        metadata = mm.read_metadata_from_excel(filename, cache=cache)
+    return metadata, set(collector.summary())
+
+
+def test_repeat_reads_come_from_the_cache(tmpdir):
+    mm = MetadataManager()
+    schema = mm.metadata_class_from_name("microdata")
+    metadata = SyntheticDataGenerator(seed=2, list_length=2).generate(schema)
+    filename = mm.save_metadata_to_excel(
+        metadata, str(tmpdir.join("microdata.xlsx")), title="title", embed_payload=True
+    )
+    cache = ReadCache(str(tmpdir.join("cache")))
+
+    first, phases = _read(mm, filename, cache)
+    assert "metadata_manager.write_cache" in phases
+    assert len(os.listdir(cache.directory)) == 1
+    second, phases = _read(mm, filename, cache)
+    assert "metadata_manager.write_cache" not in phases
+    assert "metadata_manager.read_payload" not in phases
+    assert second == first == mm.read_metadata_from_excel(filename)
+
+    # an invalid entry is replaced by reading the file again
+    key = cache.key(filename, schema)
+    with open(os.path.join(cache.directory, key + ".json"), "w") as f:
+        f.write('{"not": "microdata"')
+    third, phases = _read(mm, filename, cache)
+    assert "metadata_manager.write_cache" in phases
+    assert third == first
+
+
+def test_key_depends_on_the_file_and_the_schema(tmpdir):
+    mm = MetadataManager()
+    cache = ReadCache(str(tmpdir.join("cache")))
+    filename = mm.write_metadata_outline_to_excel("video", filename=str(tmpdir.join("video.xlsx")))
+    video_class = mm.metadata_class_from_name("video")
+    key = cache.key(filename, video_class)
+    assert cache.key(filename, video_class) == key
+    assert cache.key(filename, mm.metadata_class_from_name("table")) != key
+
+    with open(filename, "ab") as f:
+        f.write(b"\0")
+    assert cache.key(filename, video_class) != key
+
+
+def test_least_recently_used_entries_are_evicted(tmpdir):
+    cache = ReadCache(str(tmpdir.join("cache")), max_bytes=25)
+    now = time.time()
+    cache.put("a", b"a" * 10)
+    os.utime(cache._path("a"), (now - 100, now - 100))
+    cache.put("b", b"b" * 10)
+    os.utime(cache._path("b"), (now - 50, now - 50))
+    assert cache.get("a") == b"a" * 10
+
+    cache.put("c", b"c" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a" * 10
+    assert cache.get("c") == b"c" * 10
+
+    cache.clear()
+    assert os.listdir(cache.directory) == []
+
+
+def test_concurrent_writers_and_readers_only_see_whole_entries(tmpdir):
+    cache = ReadCache(str(tmpdir.join("cache")))
+    data = b"x" * 1_000_000
+    seen = []
+
+    def write():
+        for _ in range(20):
+            cache.put("key", data)
+
+    def read():
+        for _ in range(200):
+            seen.append(cache.get("key"))
+
+    threads = [threading.Thread(target=write) for _ in range(4)] + [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(value is None or value == data for value in seen)
+    assert os.listdir(cache.directory) == ["key.json"]
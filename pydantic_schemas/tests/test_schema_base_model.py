@@ -0,0 +1,77 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import Field, ValidationError
+
+from pydantic_schemas.microdata_schema import VariableSchema
+from pydantic_schemas.table_schema import TimePeriod
+from pydantic_schemas.utils.schema_base_model import SchemaBaseModel
+
+
+def test_bulk_update_validates_on_exit():
+    variable = VariableSchema(file_id="F1", vid="V1", name="", labl="")
+    with variable.bulk_update():
+        variable.name = "hhid"
+        variable.var_intrvl = "Discrete"
+        variable.var_wgt = "1"
+        # not validated until the block exits
+        assert variable.var_wgt == "1"
+    assert variable.name == "hhid"
+    assert variable.var_intrvl == "discrete"
+    assert variable.var_wgt == 1
+    assert variable.model_fields_set == {"file_id", "vid", "name", "labl", "var_intrvl", "var_wgt"}
+    assert variable == VariableSchema(file_id="F1", vid="V1", name="hhid", labl="", var_intrvl="discrete", var_wgt=1)
+
+
+def test_bulk_update_restores_model_on_error():
+    variable = VariableSchema(file_id="F1", vid="V1", name="hhid", labl="")
+    variable._metadata_type__ = "custom"
+
+    with pytest.raises(ValidationError) as e, variable.bulk_update():
+        variable.var_wgt = "not a weight"
+        variable.name = "renamed"
+        variable.var_intrvl = "not an interval"
+    assert e.value.title == "VariableSchema"
+    assert [err["loc"] for err in e.value.errors()] == [("var_intrvl",), ("var_wgt",)]
+    assert type(variable) is VariableSchema
+    assert variable.name == "hhid"
+    assert variable.var_intrvl is None
+    assert variable.model_fields_set == {"file_id", "vid", "name", "labl"}
+
+    with pytest.raises(RuntimeError), variable.bulk_update():
+        variable.name = "renamed"
+        raise RuntimeError("stop")
+    assert variable.name == "hhid"
+    assert type(variable) is VariableSchema
+
+    # private attributes survive validation and assignment is validated again afterwards
+    with variable.bulk_update():
+        variable.labl = "Household ID"
+    assert variable._metadata_type__ == "custom"
+    with pytest.raises(ValidationError):
+        variable.var_intrvl = "not an interval"
+
+
+def test_bulk_update_with_aliases_and_nesting():
+    period = TimePeriod(**{"from": "2000"})
+    with period.bulk_update():
+        period.from_ = "2001"
+        period.to = "2002"
+    assert period.from_ == "2001"
+    assert period.to == "2002"
+
+    class Child(SchemaBaseModel):
+        value: int
+
+    class Parent(SchemaBaseModel):
+        children: Optional[List[Child]] = Field(None)
+        count: Optional[int] = None
+
+    parent = Parent()
+    with parent.bulk_update():
+        parent.children = [{"value": "1"}, {"value": 2}]
+        with parent.bulk_update():
+            parent.count = "2"
+        assert parent.count == "2"
+    assert parent.children == [Child(value=1), Child(value=2)]
+    assert parent.count == 2
@@ -0,0 +1,92 @@
+import os
+import shutil
+
+import pytest
+
+from pydantic_schemas.utils import schema_bundles
+from pydantic_schemas.utils.schema_bundles import (
+    build_bundles,
+    bundled_metadata_names,
+    copy_bundled_schema,
+    load_bundled_schema,
+    stale_bundles,
+)
+
+
+def _refs(node):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "$ref":
+                yield value
+            else:
+                yield from _refs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _refs(value)
+
+
+def _resolve_pointer(document, ref):
+    node = document
+    for token in ref.removeprefix("#/").split("/"):
+        node = node[token.replace("~1", "/").replace("~0", "~")]
+    return node
+
+
+def test_committed_bundles_are_up_to_date():
+    # rebuild them with python -m pydantic_schemas.generators.bundle_json_schemas
+    assert stale_bundles("schemas") == []
+
+
+@pytest.mark.parametrize("metadata_name", bundled_metadata_names())
+def test_bundles_only_refer_to_themselves(metadata_name):
+    bundle = load_bundled_schema(metadata_name)
+    for ref in set(_refs(bundle)):
+        assert ref.startswith("#"), ref
+        if ref != "#":
+            assert isinstance(_resolve_pointer(bundle, ref), dict), ref
+
+
+def test_documents_are_embedded_once():
+    microdata = load_bundled_schema("microdata")
+    assert sorted(microdata["$defs"]) == [
+        "datafile-schema",
+        "ddi-schema",
+        "provenance-schema",
+        "variable-group-schema",
+        "variable-schema",
+    ]
+    assert "$id" not in microdata["$defs"]["ddi-schema"]
+    variables = _resolve_pointer(microdata, "#/$defs/ddi-schema/properties/variables")
+    assert variables["items"] == {"$ref": "#/$defs/variable-schema"}
+
+    image = load_bundled_schema("image")
+    assert "#/$defs/iptc-phovidmdshared-schema/definitions/CvTerm" in set(_refs(image))
+
+
+def test_loading_is_memoized():
+    assert load_bundled_schema("video") is load_bundled_schema("video")
+    copied = copy_bundled_schema("video")
+    copied["$defs"].clear()
+    assert len(load_bundled_schema("video")["$defs"]) == 1
+    with pytest.raises(ValueError, match="no bundled schema"):
+        load_bundled_schema("not a metadata type")
+
+
+def test_bundles_are_stale_when_a_file_they_were_built_from_changes(tmpdir, monkeypatch):
+    schema_dir = str(tmpdir.join("schemas"))
+    bundle_dir = str(tmpdir.join("bundles"))
+    shutil.copytree("schemas", schema_dir)
+    build_bundles({"microdata": "microdata-schema.json", "video": "video-schema.json"}, schema_dir, bundle_dir)
+    assert stale_bundles(schema_dir, bundle_dir) == []
+
+    with open(os.path.join(schema_dir, "variable-schema.json"), "a") as file:
+        file.write("\n")
+    assert stale_bundles(schema_dir, bundle_dir) == ["microdata"]
+    os.remove(os.path.join(schema_dir, "provenance-schema.json"))
+    assert stale_bundles(schema_dir, bundle_dir) == ["microdata", "video"]
+
+    shutil.copy(os.path.join("schemas", "provenance-schema.json"), schema_dir)
+    build_bundles({"video": "video-schema.json"}, schema_dir, bundle_dir)
+    assert stale_bundles(schema_dir, bundle_dir) == []
+    monkeypatch.setattr(schema_bundles, "BUNDLER_VERSION", schema_bundles.BUNDLER_VERSION + 1)
+    assert stale_bundles(schema_dir, bundle_dir) == ["video"]
@@ -0,0 +1,49 @@
+import io
+import json
+
+import pytest
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.microdata_schema import MicrodataSchema
+from pydantic_schemas.utils.synthetic_data import SyntheticDataGenerator
+
+
+@pytest.mark.parametrize("metadata_name", MetadataManager().metadata_type_names)
+def test_synthetic_data_is_valid_and_seeded(metadata_name):
+    schema = MetadataManager().metadata_class_from_name(metadata_name)
+    generator = SyntheticDataGenerator(seed=1)
+    model = generator.generate(schema)
+    assert isinstance(model, schema)
+    assert model == schema.model_validate(generator.generate_dict(schema))
+    assert model == SyntheticDataGenerator(seed=1).generate(schema)
+    assert model != SyntheticDataGenerator(seed=2).generate(schema)
+
+
+def test_synthetic_data_list_lengths():
+    generator = SyntheticDataGenerator(
+        seed=0, list_length=1, list_lengths={"variables": 25, "var_catgry": 3, "study_desc.authoring_entity": 4}
+    )
+    model = generator.generate(MicrodataSchema)
+    assert len(model.variables) == 25
+    assert all(len(variable.var_catgry) == 3 for variable in model.variables)
+    assert len(model.study_desc.authoring_entity) == 4
+    assert len(model.data_files) == 1
+    # every field is filled in, including enums and nested objects
+    assert model.variables[0].var_intrvl in ("discrete", "contin")
+    assert model.study_desc.title_statement.title
+
+
+def test_synthetic_data_streams_json():
+    generator = SyntheticDataGenerator(seed=3, list_lengths={"variables": 50})
+    chunks = list(generator.iter_json(MicrodataSchema))
+    assert len(chunks) > 50
+    assert json.loads("".join(chunks)) == generator.generate_dict(MicrodataSchema)
+
+    file = io.StringIO()
+    generator.write_jsonl(MicrodataSchema, file, n_instances=3)
+    lines = file.getvalue().splitlines()
+    assert len(lines) == 3
+    models = [MicrodataSchema.model_validate_json(line) for line in lines]
+    assert models[0] == generator.generate(MicrodataSchema)
+    assert models[0] != models[1]
+    assert generator.seed == 3
@@ -0,0 +1,131 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from pydantic_schemas.metadata_manager import MetadataManager
+from pydantic_schemas.utils.tracing import (
+    OpenTelemetryTracer,
+    SpanCollector,
+    Tracer,
+    get_tracer,
+    traced,
+    use_tracer,
+)
+
+
+@traced("double")
+def double(x):
+    return 2 * x
+
+
+def test_tracing_is_off_by_default():
+    assert type(get_tracer()) is Tracer
+    assert get_tracer().enabled is False
+    with get_tracer().span("anything", sheet="metadata") as span:
+        span.add("rows", 3)
+        span.set_attribute("cells", 4)
+    assert double(2) == 4
+
+
+def test_span_collector_records_nesting_counts_and_errors():
+    collector = SpanCollector()
+    with use_tracer(collector):
+        assert get_tracer() is collector
+        with collector.span("outer", sheet="metadata") as outer:
+            assert double(1) == 2
+            assert double(2) == 4
+            outer.add("rows", 5)
+            outer.add("rows", 2)
+        with pytest.raises(ValueError), collector.span("failing"):
+            raise ValueError("stop")
+    assert type(get_tracer()) is Tracer
+
+    doubles = collector.spans_named("double")
+    assert len(doubles) == 2
+    assert all(span.parent is collector.spans_named("outer")[0] for span in doubles)
+    assert collector.spans_named("failing")[0].attributes == {"error": "ValueError"}
+
+    summary = collector.summary()
+    assert list(summary) == ["outer", "double", "failing"]
+    assert summary["outer"]["calls"] == 1
+    assert summary["outer"]["counts"] == {"rows": 7}
+    assert summary["double"]["calls"] == 2
+    assert summary["outer"]["total_time"] >= summary["double"]["total_time"]
+    assert "rows=7" in collector.format_summary()
+
+
+def test_span_collector_keeps_a_bounded_number_of_spans():
+    collector = SpanCollector(max_spans=3)
+    with use_tracer(collector):
+        for i in range(10):
+            double(i)
+    assert len(collector.spans) == 3
+    assert collector.summary()["double"]["calls"] == 10
+    collector.clear()
+    assert collector.summary() == {}
+
+
+def test_tracer_is_not_shared_between_threads():
+    collector = SpanCollector()
+    other_thread_tracers = []
+    with use_tracer(collector):
+        thread = threading.Thread(target=lambda: other_thread_tracers.append(get_tracer()) or double(1))
+        thread.start()
+        thread.join()
+    assert type(other_thread_tracers[0]) is Tracer
+    assert collector.summary() == {}
+
+
+def test_excel_round_trip_is_traced_by_phase(tmpdir):
+    mm = MetadataManager()
+    collector = SpanCollector()
+    with use_tracer(collector):
+        filename = mm.write_metadata_outline_to_excel("video", filename=tmpdir.join("video.xlsx"))
+        mm.read_metadata_from_excel(filename)
+    summary = collector.summary()
+    for phase in [
+        "metadata_manager.write_metadata_outline_to_excel",
+        "quick_start.make_skeleton",
+        "excel.pydantic_to_dataframe",
+        "excel.protect_sheet",
+        "excel.save_workbook",
+        "metadata_manager.read_metadata_from_excel",
+        "metadata_manager.read_workbook",
+        "metadata_manager.merge",
+        "metadata_manager.validate",
+    ]:
+        assert phase in summary, phase
+    sheets = collector.spans_named("excel.write_sheet")
+    assert [span.attributes["sheet"] for span in sheets] == ["metadata"]
+    assert sheets[0].counts["rows"] > 0
+    assert sheets[0].counts["cells"] >= sheets[0].counts["rows"]
+    assert summary["excel.read_sheet"]["counts"]["rows"] > 0
+
+
+def test_open_telemetry_tracer_forwards_spans():
+    class FakeSpan:
+        def __init__(self):
+            self.attributes = {}
+
+        def set_attribute(self, key, value):
+            self.attributes[key] = value
+
+    class FakeTracer:
+        def __init__(self):
+            self.spans = []
+
+        @contextmanager
+        def start_as_current_span(self, name, attributes=None):
+            span = FakeSpan()
+            span.attributes.update(attributes or {})
+            self.spans.append((name, span))
+            yield span
+
+    fake = FakeTracer()
+    with use_tracer(OpenTelemetryTracer(fake)), get_tracer().span("excel.write_sheet", sheet="metadata") as span:
+        span.add("rows", 2)
+        span.add("rows", 3)
+    assert [(name, span.attributes) for name, span in fake.spans] == [
+        ("excel.write_sheet", {"sheet": "metadata", "rows": 5})
+    ]
@@ -0,0 +1,560 @@
+"""
+Export the long lists of a metadata model, such as the variables of a MicrodataSchema or the data_structure of a
+TimeseriesSchema, as tables with one row per item, for analytics, and read them back.
+
+    >>> paths = export_list_field(microdata, "variables", "census_tables")
+    >>> paths["variables.var_catgry"]
+    'census_tables/variables.var_catgry.parquet'
+    >>> variables = read_items("census_tables", VariableSchema, "variables")
+
+Each field of an item is a column. Nested models are flattened into columns named by the path to each of their
+fields, such as var_format.type, after a boolean column named by the path to the model, such as var_format, telling a
+null model from one whose fields are all null. Lists of plain values such as strings are list columns. Lists of models
+become child tables, one row per element, named after the parent table and the field, for instance
+variables.var_catgry. Every table has a _row column numbering its rows from 0, and each child row has the _parent_row
+of the item it belongs to and its _position in the item's list. The parent has a column of the same name as the child
+table's field holding the length of the list, or null if the list was null, so nothing is lost on the way back. Values that fit no column
+type, such as unions of several types or recursive models, are held as JSON text.
+
+Tables are written as Parquet when pyarrow is installed and as CSV otherwise. CSV has no null, so a null cell is
+written as \\N and a string starting with a backslash gets another one in front, which keeps null apart from the empty
+string. Items are converted and written in batches, so the items can come from a stream, as yielded by
+json_stream.iter_json_fields, without ever being held in memory together.
+"""
+
+import contextlib
+import csv
+import functools
+import inspect
+import itertools
+import json
+import os
+import typing
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, RootModel
+
+from .json_stream import _batch_adapter, _list_item_class
+
+ROW = "_row"
+PARENT_ROW = "_parent_row"
+POSITION = "_position"
+
+# the kinds of column: a JSON scalar of the given type, a list of them, the length of a child table's list, whether a
+# nested model is there, or JSON
+_STRING, _INTEGER, _FLOAT, _BOOLEAN = "string", "integer", "float", "boolean"
+_LIST, _COUNT, _PRESENT, _JSON = "list", "count", "present", "json"
+
+# a null cell of a CSV table, as in PostgreSQL's text format
+_CSV_NULL = "\\N"
+
+
+class _TablePlan:
+    """
+    The columns of the table of a model class and the child tables of its lists of models.
+
+    Attributes:
+        columns (List[Tuple[str, Tuple[str, ...], str, Optional[str]]]): For each column its name, the path of keys
+            to its value in the model's dump by alias, its kind, and for a list column the type of its elements.
+        children (List[Tuple[str, Tuple[str, ...], _TablePlan]]): For each child table the name of its field, which
+            is also the name of the parent's count column, the path of keys to the list, and the child's plan.
+    """
+
+    def __init__(self):
+        self.columns: List[Tuple[str, Tuple[str, ...], str, Optional[str]]] = []
+        self.children: List[Tuple[str, Tuple[str, ...], _TablePlan]] = []
+
+    def table_names(self, name: str) -> List[str]:
+        """The names of this table and all its descendants, for a table called name"""
+        names = [name]
+        for field, _, child in self.children:
+            names.extend(child.table_names(f"{name}.{field}"))
+        return names
+
+    def column_names(self, is_child: bool) -> List[str]:
+        keys = [ROW, PARENT_ROW, POSITION] if is_child else [ROW]
+        return keys + [column for column, _, _, _ in self.columns]
+
+
+def _unwrap(annotation: Any) -> Tuple[Any, bool]:
+    """The annotation without Optional, Annotated or RootModel, and whether it was a union of several types"""
+    while True:
+        origin = typing.get_origin(annotation)
+        args = typing.get_args(annotation)
+        if origin is typing.Annotated:
+            annotation = args[0]
+        elif origin is Union:
+            not_none = [arg for arg in args if arg is not type(None)]
+            if len(not_none) != 1:
+                return annotation, True
+            annotation = not_none[0]
+        elif inspect.isclass(annotation) and issubclass(annotation, RootModel):
+            annotation = annotation.model_fields["root"].annotation
+        else:
+            return annotation, False
+
+
+def _scalar_kind(annotation: Any) -> str:
+    """The kind of column of a field with a scalar annotation, JSON if it isn't one"""
+    if not inspect.isclass(annotation):
+        return _JSON
+    if issubclass(annotation, bool):
+        return _BOOLEAN
+    if issubclass(annotation, Enum):
+        return _STRING if all(isinstance(member.value, str) for member in annotation) else _JSON
+    if issubclass(annotation, int):
+        return _INTEGER
+    if issubclass(annotation, float):
+        return _FLOAT
+    if issubclass(annotation, (BaseModel, list, dict, tuple, set)):
+        return _JSON
+    # str, urls, dates and the like are strings in a JSON dump
+    return _STRING
+
+
+@functools.cache
+def _table_plan(model_class: Type[BaseModel], child_tables: bool) -> _TablePlan:
+    plan = _TablePlan()
+    _add_fields(plan, model_class, (), child_tables, (model_class,))
+    return plan
+
+
+def _add_fields(
+    plan: _TablePlan, model_class: Type[BaseModel], prefix: Tuple[str, ...], child_tables: bool, stack: Tuple
+):
+    for name, field in model_class.model_fields.items():
+        path = prefix + (field.alias or name,)
+        column = ".".join(path)
+        annotation, is_union = _unwrap(field.annotation)
+        item_class = _list_item_class(annotation)
+        if is_union:
+            plan.columns.append((column, path, _JSON, None))
+        elif inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+            if annotation in stack:
+                plan.columns.append((column, path, _JSON, None))
+            else:
+                plan.columns.append((column, path, _PRESENT, None))
+                _add_fields(plan, annotation, path, child_tables, stack + (annotation,))
+        elif item_class is not None:
+            if child_tables and item_class not in stack:
+                child = _TablePlan()
+                _add_fields(child, item_class, (), child_tables, stack + (item_class,))
+                plan.children.append((column, path, child))
+                plan.columns.append((column, path, _COUNT, None))
+            else:
+                plan.columns.append((column, path, _JSON, None))
+        elif typing.get_origin(annotation) is list:
+            args = typing.get_args(annotation)
+            element_kind = _scalar_kind(_unwrap(args[0])[0]) if args else _JSON
+            if element_kind == _JSON or (args and _unwrap(args[0])[1]):
+                plan.columns.append((column, path, _JSON, None))
+            else:
+                plan.columns.append((column, path, _LIST, element_kind))
+        else:
+            plan.columns.append((column, path, _scalar_kind(annotation), None))
+
+
+def _nested(containers: Dict[Tuple[str, ...], List[Any]], prefix: Tuple[str, ...]) -> List[Any]:
+    """The values at prefix of the dumped rows, containers[()], cached in containers along with those of its parents"""
+    if prefix not in containers:
+        outer = _nested(containers, prefix[:-1])
+        containers[prefix] = [None if value is None else value.get(prefix[-1]) for value in outer]
+    return containers[prefix]
+
+
+def _flatten(
+    rows: List[Dict[str, Any]],
+    plan: _TablePlan,
+    name: str,
+    first_row: int,
+    parents: Optional[List[Tuple[int, int]]],
+    counters: Dict[str, int],
+    tables: Dict[str, Dict[str, List[Any]]],
+):
+    """Add the columns of the dumped rows, and of their child tables, to tables, row numbers following on from counters"""
+    table = tables[name]
+    table[ROW].extend(range(first_row, first_row + len(rows)))
+    if parents is not None:
+        table[PARENT_ROW].extend(parent for parent, _ in parents)
+        table[POSITION].extend(position for _, position in parents)
+    containers = {(): rows}
+    for column, path, kind, _ in plan.columns:
+        values = _nested(containers, path)
+        if kind == _COUNT:
+            values = [None if value is None else len(value) for value in values]
+        elif kind == _PRESENT:
+            values = [value is not None for value in values]
+        elif kind == _JSON:
+            values = [None if value is None else json.dumps(value, ensure_ascii=False) for value in values]
+        table[column].extend(values)
+    for field, path, child in plan.children:
+        child_rows, child_parents = [], []
+        for row_number, items in enumerate(_nested(containers, path), start=first_row):
+            if items:
+                child_rows.extend(items)
+                child_parents.extend((row_number, position) for position in range(len(items)))
+        child_name = f"{name}.{field}"
+        child_first_row = counters.get(child_name, 0)
+        counters[child_name] = child_first_row + len(child_rows)
+        _flatten(child_rows, child, child_name, child_first_row, child_parents, counters, tables)
+
+
+def _iter_column_batches(
+    items: Iterable[BaseModel], item_class: Type[BaseModel], table_name: str, child_tables: bool, batch_size: int
+) -> Iterator[Dict[str, Dict[str, List[Any]]]]:
+    """Yield, for each batch of items, the columns of every table, as lists of JSON compatible values"""
+    if batch_size < 1:
+        raise ValueError(f"batch_size should be at least 1, not {batch_size}")
+    plan = _table_plan(item_class, child_tables)
+    adapter = _batch_adapter(item_class)
+    counters = {table_name: 0}
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        tables = {
+            name: {column: [] for column in _plan_at(plan, table_name, name).column_names(name != table_name)}
+            for name in plan.table_names(table_name)
+        }
+        first_row = counters[table_name]
+        counters[table_name] += len(batch)
+        rows = adapter.dump_python(batch, mode="json", by_alias=True)
+        _flatten(rows, plan, table_name, first_row, None, counters, tables)
+        yield tables
+
+
+def _plan_at(plan: _TablePlan, table_name: str, name: str) -> _TablePlan:
+    """The plan of the descendant table called name of the table table_name"""
+    if name == table_name:
+        return plan
+    for field, _, child in plan.children:
+        child_name = f"{table_name}.{field}"
+        if name == child_name or name.startswith(child_name + "."):
+            return _plan_at(child, child_name, name)
+    raise KeyError(name)
+
+
+def _column_kinds(plan: _TablePlan, is_child: bool) -> Dict[str, Tuple[str, Optional[str]]]:
+    kinds = {column: (_INTEGER, None) for column in plan.column_names(is_child)[: 3 if is_child else 1]}
+    kinds.update({column: (kind, element) for column, _, kind, element in plan.columns})
+    return kinds
+
+
+def _import_pyarrow():
+    """pyarrow and pyarrow.parquet, or None if pyarrow is not installed"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet  # noqa: F401, makes pa.parquet available
+    except ImportError:
+        return None
+    return pa
+
+
+def _arrow_schema(pa, plan: _TablePlan, is_child: bool):
+    scalar_types = {
+        _STRING: pa.string(),
+        _INTEGER: pa.int64(),
+        _FLOAT: pa.float64(),
+        _BOOLEAN: pa.bool_(),
+        _COUNT: pa.int64(),
+        _PRESENT: pa.bool_(),
+        _JSON: pa.string(),
+    }
+    fields = []
+    for column, (kind, element) in _column_kinds(plan, is_child).items():
+        arrow_type = pa.list_(scalar_types[element]) if kind == _LIST else scalar_types[kind]
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+def _resolve_format(file_format: str):
+    if file_format not in ("auto", "parquet", "csv"):
+        raise ValueError(f"file_format should be 'auto', 'parquet' or 'csv', not {file_format!r}")
+    pa = _import_pyarrow() if file_format != "csv" else None
+    if file_format == "parquet" and pa is None:
+        raise ImportError("Writing Parquet needs the pyarrow package to be installed, or choose file_format='csv'")
+    return ("parquet" if pa is not None else "csv"), pa
+
+
+def _csv_cell(value: Any, kind: str) -> str:
+    if value is None:
+        return _CSV_NULL
+    if kind == _LIST:
+        return json.dumps(value, ensure_ascii=False)
+    if kind in (_BOOLEAN, _PRESENT):
+        return "true" if value else "false"
+    text = str(value)
+    return "\\" + text if text.startswith("\\") else text
+
+
+def export_items(
+    items: Iterable[BaseModel],
+    item_class: Type[BaseModel],
+    directory: Union[str, os.PathLike],
+    table_name: str,
+    file_format: str = "auto",
+    child_tables: bool = True,
+    batch_size: int = 10000,
+) -> Dict[str, str]:
+    """
+    Write items as a table with one row per item, along with the child tables of their lists of models.
+
+    Args:
+        items (Iterable[BaseModel]): The items, instances of item_class, which are read and written batch_size at a
+            time, so they can be a generator.
+        item_class (Type[BaseModel]): The model of the items, whose fields give the columns.
+        directory (str or PathLike): Where to write the tables, created if need be. Each is written to a file named
+            after the table.
+        table_name (str): The name of the table of the items, for instance variables.
+        file_format (str): 'parquet', 'csv', or 'auto' for Parquet when pyarrow is installed and CSV otherwise.
+        child_tables (bool): If False, lists of models are written as JSON text in a column of the parent rather
+            than as child tables.
+        batch_size (int): The number of items converted and written at a time.
+
+    Returns:
+        Dict[str, str]: The path of the file of each table, keyed by the table's name. Every table is written, even
+            if it has no rows.
+
+    Raises:
+        ImportError: If the file_format is 'parquet' and pyarrow is not installed.
+    """
+    file_format, pa = _resolve_format(file_format)
+    plan = _table_plan(item_class, child_tables)
+    os.makedirs(directory, exist_ok=True)
+    paths = {name: os.path.join(directory, f"{name}.{file_format}") for name in plan.table_names(table_name)}
+    kinds = {name: _column_kinds(_plan_at(plan, table_name, name), name != table_name) for name in paths}
+
+    writers = {}
+    with contextlib.ExitStack() as stack:
+        for name, path in paths.items():
+            if file_format == "parquet":
+                schema = _arrow_schema(pa, _plan_at(plan, table_name, name), name != table_name)
+                writers[name] = (stack.enter_context(pa.parquet.ParquetWriter(path, schema)), schema)
+            else:
+                file = stack.enter_context(open(path, "w", newline="", encoding="utf-8"))
+                writers[name] = csv.writer(file)
+                writers[name].writerow(kinds[name])
+        for tables in _iter_column_batches(items, item_class, table_name, child_tables, batch_size):
+            for name, columns in tables.items():
+                if file_format == "parquet":
+                    writer, schema = writers[name]
+                    writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                else:
+                    cells = [
+                        [_csv_cell(value, kinds[name][column][0]) for value in columns[column]] for column in columns
+                    ]
+                    writers[name].writerows(zip(*cells))
+    return paths
+
+
+def _field_item_class(model_class: Type[BaseModel], field_path: str) -> Type[BaseModel]:
+    """The model of the items of the list of models at the dotted path of field names or aliases"""
+    annotation: Any = model_class
+    for name in field_path.split("."):
+        annotation, _ = _unwrap(annotation)
+        fields = annotation.model_fields if inspect.isclass(annotation) and issubclass(annotation, BaseModel) else {}
+        by_alias = {field.alias or key: key for key, field in fields.items()}
+        key = name if name in fields else by_alias.get(name)
+        if key is None:
+            raise ValueError(f"{model_class.__name__} has no field {field_path!r}")
+        annotation = fields[key].annotation
+    item_class = _list_item_class(_unwrap(annotation)[0])
+    if item_class is None:
+        raise ValueError(f"{model_class.__name__}.{field_path} is not a list of models")
+    return item_class
+
+
+def export_list_field(
+    model: BaseModel, field_path: str, directory: Union[str, os.PathLike], **kwargs
+) -> Dict[str, str]:
+    """
+    Write the list of models at field_path of model as tables, with export_items.
+
+    Args:
+        model (BaseModel): For instance a MicrodataSchema.
+        field_path (str): The field holding the list, or a dotted path of fields to reach it, for instance variables.
+            The last part names the table.
+        directory (str or PathLike): Where to write the tables.
+        **kwargs: file_format, child_tables and batch_size, as for export_items.
+
+    Returns:
+        Dict[str, str]: The path of the file of each table, keyed by the table's name.
+    """
+    item_class = _field_item_class(type(model), field_path)
+    items: Any = model
+    for name in field_path.split("."):
+        if items is None:
+            break
+        fields = type(items).model_fields
+        items = getattr(items, name if name in fields else next(k for k, f in fields.items() if f.alias == name))
+    return export_items(items or [], item_class, directory, field_path.split(".")[-1], **kwargs)
+
+
+# the dtypes of the columns of DataFrames that are not object
+_PANDAS_DTYPES = {_INTEGER: "Int64", _COUNT: "Int64", _FLOAT: "Float64", _BOOLEAN: "boolean", _PRESENT: "boolean"}
+
+
+def items_to_dataframes(
+    items: Iterable[BaseModel], item_class: Type[BaseModel], table_name: str, child_tables: bool = True
+) -> Dict[str, Any]:
+    """
+    The tables of items, as export_items would write them, as pandas DataFrames keyed by table name.
+
+    Unlike pydantic_to_dataframe, which lays a model out for Excel, these have one row per item and a column per
+    field. List columns hold lists and nullable integer columns have the Int64 dtype.
+    """
+    import pandas as pd
+
+    plan = _table_plan(item_class, child_tables)
+    batches = list(_iter_column_batches(items, item_class, table_name, child_tables, batch_size=10000))
+    frames = {}
+    for name in plan.table_names(table_name):
+        kinds = _column_kinds(_plan_at(plan, table_name, name), name != table_name)
+        columns = {}
+        for column, (kind, _) in kinds.items():
+            values = [value for tables in batches for value in tables[name][column]]
+            columns[column] = pd.Series(values, dtype=_PANDAS_DTYPES.get(kind, object))
+        frames[name] = pd.DataFrame(columns, columns=list(kinds))
+    return frames
+
+
+def _read_table(path: str, kinds: Dict[str, Tuple[str, Optional[str]]], pa) -> List[Dict[str, Any]]:
+    if path.endswith(".parquet"):
+        return pa.parquet.read_table(path).to_pylist()
+    rows = []
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            for column, cell in row.items():
+                kind = kinds.get(column, (_STRING, None))[0]
+                # an empty cell of any other kind was blanked by hand
+                if cell == _CSV_NULL or (cell == "" and kind != _STRING):
+                    row[column] = None
+                elif cell.startswith("\\"):
+                    row[column] = cell[1:]
+                elif kind == _LIST:
+                    row[column] = json.loads(cell)
+                elif kind == _PRESENT:
+                    row[column] = cell == "true"
+                elif kind == _COUNT or column in (ROW, PARENT_ROW, POSITION):
+                    row[column] = int(cell)
+            rows.append(row)
+    return rows
+
+
+def _build(rows_by_table: Dict[str, List[Dict[str, Any]]], plan: _TablePlan, name: str) -> List[Dict[str, Any]]:
+    """The dictionaries of the items of the table called name, with their children filled in"""
+    rows = rows_by_table.get(name, [])
+    row_numbers = [row[ROW] for row in rows]
+    children = {}
+    for field, _, child in plan.children:
+        child_name = f"{name}.{field}"
+        child_rows = rows_by_table.get(child_name, [])
+        keyed = zip(((row[PARENT_ROW], row[POSITION]) for row in child_rows), _build(rows_by_table, child, child_name))
+        by_parent: Dict[int, List[Dict[str, Any]]] = {}
+        for (parent, _), item in sorted(keyed, key=lambda pair: pair[0]):
+            by_parent.setdefault(parent, []).append(item)
+        children[field] = by_parent
+
+    items = [{} for _ in rows]
+    containers: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {(): items}
+    # whether each nested model is there, as told by its presence column or, in tables without one, by having a field
+    # that isn't null
+    present: Dict[Tuple[str, ...], List[bool]] = {}
+    for column, path, kind, _ in plan.columns:
+        values = [row.get(column) for row in rows]
+        if kind == _PRESENT:
+            for depth in range(1, len(path) + 1):
+                prefix = path[:depth]
+                if prefix not in containers:
+                    containers[prefix] = [{} for _ in rows]
+                    present[prefix] = [False] * len(rows)
+                flags = present[prefix]
+                for i, value in enumerate(values):
+                    if value:
+                        flags[i] = True
+            continue
+        if kind == _COUNT:
+            by_parent = children[column]
+            values = [None if value is None else by_parent.get(n, []) for value, n in zip(values, row_numbers)]
+        elif kind == _JSON:
+            values = [None if value is None else json.loads(value) for value in values]
+        elif kind == _LIST:
+            values = [None if value is None else list(value) for value in values]
+        for depth in range(1, len(path)):
+            prefix = path[:depth]
+            if prefix not in containers:
+                containers[prefix] = [{} for _ in rows]
+                present[prefix] = [False] * len(rows)
+            flags = present[prefix]
+            for i, value in enumerate(values):
+                if value is not None:
+                    flags[i] = True
+        key = path[-1]
+        for container, value in zip(containers[path[:-1]], values):
+            container[key] = value
+    for prefix, nested in containers.items():
+        if prefix:
+            key = prefix[-1]
+            for container, value, is_present in zip(containers[prefix[:-1]], nested, present[prefix]):
+                container[key] = value if is_present else None
+    return items
+
+
+def tables_to_items(
+    tables: Dict[str, Any], item_class: Type[BaseModel], table_name: str, child_tables: bool = True
+) -> List[BaseModel]:
+    """
+    Validate the items of tables as returned by items_to_dataframes, or of lists of rows as dictionaries.
+
+    Raises:
+        ValidationError: If an item is not valid, located by its index in the table.
+    """
+    plan = _table_plan(item_class, child_tables)
+    rows_by_table = {}
+    for name, table in tables.items():
+        if hasattr(table, "to_dict"):
+            # pandas fills the gaps with NaN or NA
+            rows_by_table[name] = table.astype(object).where(table.notna(), None).to_dict("records")
+        else:
+            rows_by_table[name] = list(table)
+    items = _build(rows_by_table, plan, table_name)
+    return _batch_adapter(item_class).validate_python(items)
+
+
+def read_items(
+    directory: Union[str, os.PathLike], item_class: Type[BaseModel], table_name: str, child_tables: bool = True
+) -> List[BaseModel]:
+    """
+    Read back the items written by export_items, from Parquet files if there are any for the table and CSV otherwise.
+
+    Args:
+        directory (str or PathLike): Where the tables were written.
+        item_class (Type[BaseModel]): The model of the items.
+        table_name (str): The name of their table.
+        child_tables (bool): As given to export_items.
+
+    Returns:
+        List[BaseModel]: The items, in the order they were written.
+
+    Raises:
+        FileNotFoundError: If there is no file for the table.
+        ValidationError: If an item is not valid, for instance after the tables were edited.
+    """
+    plan = _table_plan(item_class, child_tables)
+    main_parquet = os.path.join(directory, f"{table_name}.parquet")
+    file_format = "parquet" if os.path.exists(main_parquet) else "csv"
+    pa = _import_pyarrow() if file_format == "parquet" else None
+    if file_format == "parquet" and pa is None:
+        raise ImportError("Reading Parquet needs the pyarrow package to be installed")
+    if not os.path.exists(os.path.join(directory, f"{table_name}.{file_format}")):
+        raise FileNotFoundError(f"No table {table_name!r} in {directory}")
+    rows_by_table = {}
+    for name in plan.table_names(table_name):
+        path = os.path.join(directory, f"{name}.{file_format}")
+        if os.path.exists(path):
+            kinds = _column_kinds(_plan_at(plan, table_name, name), name != table_name)
+            rows_by_table[name] = _read_table(path, kinds, pa)
+    items = _build(rows_by_table, plan, table_name)
+    return _batch_adapter(item_class).validate_python(items)
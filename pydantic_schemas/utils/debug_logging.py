@@ -0,0 +1,137 @@
+"""
+Debug logging for the conversions between pydantic models, DataFrames and Excel.
+
+Each module logs to its own logger, named after the module, so that one subsystem can be debugged at a time.
+Messages are only formatted when their logger is enabled for debug, and DataFrames, models and long lists are logged
+as short summaries through summarize rather than in full, so leaving the calls in costs almost nothing.
+
+Turn debugging on from code with
+
+    >>> from pydantic_schemas.utils.debug_logging import enable_debug_logging
+    >>> enable_debug_logging("excel_to_pydantic", "quick_start")
+
+or without changing any code by listing the subsystems, or 'all', in the METADATA_SCHEMAS_DEBUG environment variable
+
+    METADATA_SCHEMAS_DEBUG=excel_to_pydantic,quick_start python my_script.py
+
+Unknown names in the environment variable are skipped with a warning, so a typo there never stops the package from
+being imported.
+
+The subsystems are metadata_manager, quick_start, pydantic_to_excel, excel_to_pydantic and utils. The loggers are
+ordinary loggers, so they can also be configured through logging.config like any other.
+"""
+
+import logging
+import os
+import reprlib
+import warnings
+from typing import Any, Optional
+
+ENVIRONMENT_VARIABLE = "METADATA_SCHEMAS_DEBUG"
+
+# the top level package, which is metadataschemas when installed and pydantic_schemas in this repository
+_PACKAGE = __name__.split(".")[0]
+
+SUBSYSTEMS = {
+    "metadata_manager": f"{_PACKAGE}.metadata_manager",
+    "quick_start": f"{_PACKAGE}.utils.quick_start",
+    "pydantic_to_excel": f"{_PACKAGE}.utils.pydantic_to_excel",
+    "excel_to_pydantic": f"{_PACKAGE}.utils.excel_to_pydantic",
+    "utils": f"{_PACKAGE}.utils.utils",
+}
+
+_repr = reprlib.Repr()
+_repr.maxstring = 200
+_repr.maxother = 200
+
+
+class summarize:
+    """
+    Wrap a value so that it is summarized, rather than printed in full, if and when a log message is formatted.
+
+    DataFrames are shown by their shape and first rows, models by their class and the fields that are set, and other
+    values by a repr shortened to a couple of hundred characters.
+
+    Example:
+        >>> logger.debug("read sheet %s: %s", sheetname, summarize(df))
+    """
+
+    __slots__ = ("value", "max_rows")
+
+    def __init__(self, value: Any, max_rows: int = 5):
+        self.value = value
+        self.max_rows = max_rows
+
+    def __str__(self) -> str:
+        value = self.value
+        shape = getattr(value, "shape", None)
+        if shape is not None and hasattr(value, "head"):
+            head = value.head(self.max_rows).to_string()
+            more = f"\n... {shape[0] - self.max_rows} more rows" if shape[0] > self.max_rows else ""
+            return f"{type(value).__name__} of shape {shape}\n{head}{more}"
+        if hasattr(type(value), "model_fields") and hasattr(value, "model_fields_set"):
+            return f"{type(value).__name__} with fields set {sorted(value.model_fields_set)}"
+        if isinstance(value, list) and len(value) > self.max_rows:
+            return f"list of {len(value)} items starting {_repr.repr(value[: self.max_rows])}"
+        return _repr.repr(value)
+
+    __repr__ = __str__
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """The logger of a subsystem, such as 'excel_to_pydantic', or of the whole package for 'all'"""
+    if subsystem == "all":
+        return logging.getLogger(_PACKAGE)
+    if subsystem not in SUBSYSTEMS:
+        raise ValueError(f"Unknown subsystem '{subsystem}', expected 'all' or one of {list(SUBSYSTEMS)}")
+    return logging.getLogger(SUBSYSTEMS[subsystem])
+
+
+def enable_debug_logging(*subsystems: str, handler: Optional[logging.Handler] = None) -> None:
+    """
+    Log debug messages from the given subsystems, or from all of them if none are given.
+
+    Args:
+        *subsystems (str): Names from SUBSYSTEMS, or 'all'.
+        handler (Optional[logging.Handler]): Where to send the messages. Defaults to standard error, unless the
+            package logger already has a handler.
+
+    Raises:
+        ValueError: If a subsystem is unknown, in which case nothing is enabled.
+    """
+    # resolved first, so that an unknown name raises before any handler is added
+    loggers = [get_logger(subsystem) for subsystem in subsystems or ("all",)]
+    package_logger = logging.getLogger(_PACKAGE)
+    if handler is not None:
+        package_logger.addHandler(handler)
+    elif not package_logger.handlers:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter("%(name)s %(funcName)s: %(message)s"))
+        package_logger.addHandler(stream_handler)
+    for logger in loggers:
+        logger.setLevel(logging.DEBUG)
+
+
+def disable_debug_logging(*subsystems: str) -> None:
+    """Stop logging debug messages from the given subsystems, or from all of them if none are given"""
+    for subsystem in subsystems or ("all", *SUBSYSTEMS):
+        get_logger(subsystem).setLevel(logging.NOTSET)
+
+
+def _enable_from_environment():
+    subsystems = []
+    for name in os.environ.get(ENVIRONMENT_VARIABLE, "").split(","):
+        subsystem = name.strip()
+        if subsystem == "all" or subsystem in SUBSYSTEMS:
+            subsystems.append(subsystem)
+        elif subsystem:
+            warnings.warn(
+                f"Ignoring the unknown subsystem '{subsystem}' in {ENVIRONMENT_VARIABLE}, "
+                f"expected 'all' or some of {list(SUBSYSTEMS)}",
+                stacklevel=2,
+            )
+    if len(subsystems):
+        enable_debug_logging(*subsystems)
+
+
+_enable_from_environment()
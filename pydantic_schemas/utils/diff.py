@@ -0,0 +1,387 @@
+"""
+Compare two versions of the same metadata, for instance an edited Excel file read back against the JSON it was made
+from, as a list of operations, and apply those operations to a model.
+
+    >>> operations = diff(previous, edited)
+    >>> for operation in operations:
+    ...     print(operation)
+    change variables[vid=V12].labl: 'Age' -> 'Age in years'
+    add variables[vid=V913]
+    >>> apply_patch(previous, operations) == edited
+    True
+
+The comparison follows the schema. Lists of models whose items have an identifying field, such as the vid of a
+variable or the file_id of a data file, are matched by it rather than by position, so inserting a variable reports one
+addition rather than a change to every variable after it, and moving variables reports one reorder of the list. Enums
+are compared by value. A value that is empty, that is
+None, an empty string, list or dictionary, or a model whose fields are all empty, is the same as any other empty
+value and as the default of its field, as when an empty cell of an outline is read back from Excel.
+"""
+
+from enum import Enum
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+from pydantic import BaseModel
+
+from .json_stream import _field_adapter, _list_item_class
+from .utils import get_pydantic_subtype, is_list_annotation, is_optional_list
+
+# the fields that identify the items of a list of models, in order of preference
+IDENTITY_FIELDS = ("vid", "vgid", "file_id", "idno")
+
+
+class ItemKey(NamedTuple):
+    """The part of a path that picks the item of a list whose field has value"""
+
+    field: str
+    value: Any
+
+    def __str__(self):
+        return f"{self.field}={self.value}"
+
+
+PathElement = Union[str, int, ItemKey]
+
+
+class DiffOperation:
+    """
+    One difference between two models.
+
+    Attributes:
+        op (str): 'add' or 'remove' for an item of a list, or for a field that was empty or becomes empty,
+            'change' for a value that changes, and 'reorder' for a list of identified items whose items in both
+            models are in a different order, old and new then being the ItemKey of those items in each order.
+        loc (Tuple[PathElement, ...]): Where the difference is: field names, and for the items of lists either their
+            index or for lists of identified items an ItemKey.
+        old (Any): The value in the first model, None for an added item.
+        new (Any): The value in the second model, None for a removed item.
+        index (Optional[int]): For an added item, its index in the list of the second model.
+    """
+
+    __slots__ = ("op", "loc", "old", "new", "index")
+
+    def __init__(self, op: str, loc: Tuple[PathElement, ...], old: Any, new: Any, index: Optional[int] = None):
+        self.op = op
+        self.loc = loc
+        self.old = old
+        self.new = new
+        self.index = index
+
+    @property
+    def path(self) -> str:
+        """The location as a string such as variables[vid=V12].labl"""
+        parts = []
+        for element in self.loc:
+            if isinstance(element, str):
+                parts.append(f".{element}" if parts else element)
+            else:
+                parts.append(f"[{element}]")
+        return "".join(parts)
+
+    def __eq__(self, other):
+        return isinstance(other, DiffOperation) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.op!r}, {self.path!r}, {self.old!r}, {self.new!r})"
+
+    def __str__(self):
+        if self.op == "change":
+            return f"change {self.path}: {_short(self.old)} -> {_short(self.new)}"
+        return f"{self.op} {self.path}"
+
+
+def _short(value: Any) -> str:
+    text = repr(value)
+    return text if len(text) <= 60 else text[:57] + "..."
+
+
+# (field name, default, model of the value or of the items of a list of models, whether it is a list) for each field
+_DIFF_FIELDS_CACHE: Dict[Type[BaseModel], List[Tuple[str, Any, Optional[Type[BaseModel]], bool]]] = {}
+
+
+def _diff_fields(model_type: Type[BaseModel]) -> List[Tuple[str, Any, Optional[Type[BaseModel]], bool]]:
+    if model_type not in _DIFF_FIELDS_CACHE:
+        fields = []
+        for name, field_info in model_type.model_fields.items():
+            annotation = field_info.annotation
+            is_list = is_list_annotation(annotation) or is_optional_list(annotation)
+            subtype = _list_item_class(annotation) if is_list else get_pydantic_subtype(annotation)
+            default = None if field_info.is_required() else field_info.get_default(call_default_factory=True)
+            fields.append((name, default, subtype, is_list))
+        _DIFF_FIELDS_CACHE[model_type] = fields
+    return _DIFF_FIELDS_CACHE[model_type]
+
+
+# the identifying field of the items of each model, None if they have none
+_IDENTITY_FIELD_CACHE: Dict[Tuple[Type[BaseModel], Tuple[str, ...]], Optional[str]] = {}
+
+
+def _identity_field(item_type: Type[BaseModel], identity_fields: Tuple[str, ...]) -> Optional[str]:
+    key = (item_type, identity_fields)
+    if key not in _IDENTITY_FIELD_CACHE:
+        names = item_type.model_fields
+        _IDENTITY_FIELD_CACHE[key] = next((name for name in identity_fields if name in names), None)
+    return _IDENTITY_FIELD_CACHE[key]
+
+
+def _value(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def _is_empty(value: Any) -> bool:
+    """Whether a value is None, an empty string, list or dictionary, or a model or list of which all is empty"""
+    if value is None or value == "":
+        return True
+    if isinstance(value, BaseModel):
+        return all(_is_empty(v) for v in value.__dict__.values())
+    if isinstance(value, (list, dict)):
+        return all(_is_empty(v) for v in (value.values() if isinstance(value, dict) else value))
+    return False
+
+
+def _is_unset(value: Any, default: Any) -> bool:
+    return _is_empty(value) or (default is not None and _value(value) == _value(default))
+
+
+def diff(a: BaseModel, b: BaseModel, identity_fields: Sequence[str] = IDENTITY_FIELDS) -> List[DiffOperation]:
+    """
+    The operations that turn model a into model b, which are of the same type.
+
+    Args:
+        a (BaseModel): The first model, for instance the metadata as last published.
+        b (BaseModel): The second model, for instance the same metadata read back from an edited Excel file.
+        identity_fields (Sequence[str]): The fields that identify the items of a list of models, in order of
+            preference. The items of a list are matched by the first of these their model has, if every item of
+            both lists has a different value of it, and by position otherwise.
+
+    Returns:
+        List[DiffOperation]: The differences, in the order of the fields of the model. An empty list if a and b only
+            differ by empty values.
+
+    Raises:
+        ValueError: If a and b are not of the same type.
+    """
+    if type(a) is not type(b):
+        raise ValueError(f"Can only compare models of the same type, not {type(a).__name__} and {type(b).__name__}")
+    operations: List[DiffOperation] = []
+    _diff_models(a, b, (), tuple(identity_fields), operations)
+    return operations
+
+
+def _diff_models(
+    a: BaseModel, b: BaseModel, loc: Tuple[PathElement, ...], identity_fields: Tuple[str, ...], out: List
+) -> None:
+    if a == b:
+        return
+    a_values, b_values = a.__dict__, b.__dict__
+    for name, default, subtype, is_list in _diff_fields(type(a)):
+        a_value, b_value = a_values.get(name), b_values.get(name)
+        if a_value is b_value:
+            continue
+        field_loc = loc + (name,)
+        a_unset, b_unset = _is_unset(a_value, default), _is_unset(b_value, default)
+        if a_unset and b_unset:
+            continue
+        if a_unset:
+            out.append(DiffOperation("add", field_loc, a_value, b_value))
+        elif b_unset:
+            out.append(DiffOperation("remove", field_loc, a_value, b_value))
+        elif is_list and isinstance(a_value, list) and isinstance(b_value, list):
+            _diff_lists(a_value, b_value, subtype, field_loc, identity_fields, out)
+        elif subtype is not None and isinstance(a_value, subtype) and isinstance(b_value, subtype):
+            _diff_models(a_value, b_value, field_loc, identity_fields, out)
+        elif _value(a_value) != _value(b_value):
+            out.append(DiffOperation("change", field_loc, a_value, b_value))
+
+
+def _keys(items: List[Any], field: str) -> Optional[List[Any]]:
+    """The values of the identifying field of items, None if they don't identify every item"""
+    keys = [getattr(item, field, None) if isinstance(item, BaseModel) else None for item in items]
+    if any(_is_empty(key) for key in keys) or len(set(keys)) < len(keys):
+        return None
+    return keys
+
+
+def _diff_items(a: Any, b: Any, loc: Tuple[PathElement, ...], identity_fields: Tuple[str, ...], out: List) -> None:
+    if isinstance(a, BaseModel) and type(a) is type(b):
+        _diff_models(a, b, loc, identity_fields, out)
+    elif _value(a) != _value(b) and not (_is_empty(a) and _is_empty(b)):
+        out.append(DiffOperation("change", loc, a, b))
+
+
+def _diff_lists(
+    a: List[Any],
+    b: List[Any],
+    item_type: Optional[Type[BaseModel]],
+    loc: Tuple[PathElement, ...],
+    identity_fields: Tuple[str, ...],
+    out: List,
+) -> None:
+    field = None if item_type is None else _identity_field(item_type, identity_fields)
+    a_keys = None if field is None else _keys(a, field)
+    b_keys = None if a_keys is None else _keys(b, field)
+    if b_keys is not None:
+        b_by_key = dict(zip(b_keys, b))
+        a_key_set = set(a_keys)
+        for key, item in zip(a_keys, a):
+            item_loc = loc + (ItemKey(field, key),)
+            if key in b_by_key:
+                _diff_items(item, b_by_key[key], item_loc, identity_fields, out)
+            else:
+                out.append(DiffOperation("remove", item_loc, item, None))
+        for index, (key, item) in enumerate(zip(b_keys, b)):
+            if key not in a_key_set:
+                out.append(DiffOperation("add", loc + (ItemKey(field, key),), None, item, index))
+        a_order = [ItemKey(field, key) for key in a_keys if key in b_by_key]
+        b_order = [ItemKey(field, key) for key in b_keys if key in a_key_set]
+        if a_order != b_order:
+            out.append(DiffOperation("reorder", loc, a_order, b_order))
+        return
+
+    for index in range(min(len(a), len(b))):
+        _diff_items(a[index], b[index], loc + (index,), identity_fields, out)
+    for index in range(len(a) - 1, len(b) - 1, -1):
+        out.append(DiffOperation("remove", loc + (index,), a[index], None))
+    for index in range(len(a), len(b)):
+        out.append(DiffOperation("add", loc + (index,), None, b[index], index))
+
+
+def _find(items: List[Any], key: ItemKey, indexes: Dict[Tuple[int, str], Dict[Any, int]]) -> Optional[int]:
+    """The index of the item of items picked by key, looking it up in an index of the list made on first use"""
+    index_key = (id(items), key.field)
+    if index_key not in indexes:
+        indexes[index_key] = {getattr(item, key.field, None): i for i, item in enumerate(items)}
+    return indexes[index_key].get(key.value)
+
+
+# what a removed item is replaced by until every operation has been applied, so that indexes stay the same
+_REMOVED = object()
+
+
+def apply_patch(model: BaseModel, operations: Iterable[DiffOperation]) -> BaseModel:
+    """
+    A copy of model with the operations of diff applied to it, so that apply_patch(a, diff(a, b)) equals b up to empty
+    values.
+
+    Only the models and lists on the way to each change are copied, the rest is shared with model, so patching a few
+    variables of a large survey is quick.
+
+    The items removed from and added to lists are only taken out and put in once every other operation has been
+    applied, so that the index of every item stays the same meanwhile. The items that are kept are then put in the
+    order of a reorder, and added items at their index in the list they were added to. New items of lists are
+    validated as items of their list, as new values of fields are when they are assigned.
+
+    Args:
+        model (BaseModel): The model to patch, which is not changed.
+        operations (Iterable[DiffOperation]): The differences, as returned by diff.
+
+    Returns:
+        BaseModel: The patched copy, each changed field and item having been validated.
+
+    Raises:
+        KeyError: If the location of an operation is not in the model, for instance if it has changed since.
+        pydantic.ValidationError: If a new value is not valid.
+    """
+    patched = model.model_copy()
+    copies = {id(patched)}
+    indexes: Dict[Tuple[int, str], Dict[Any, int]] = {}
+    # for each list with items removed, added or reordered: the list, its additions and its reorder, if any
+    changed_lists: Dict[int, List[Any]] = {}
+    for operation in operations:
+        owner: Any = None
+        parent: Any = patched
+        path = operation.loc if operation.op == "reorder" else operation.loc[:-1]
+        for element in path:
+            owner, parent = parent, _step(parent, element, indexes, copies, operation)
+        if operation.op == "reorder":
+            if not isinstance(parent, list):
+                raise KeyError(f"{operation.path} is not a list in the model")
+            changed_lists.setdefault(id(parent), [parent, [], None])[2] = operation
+            continue
+        last = operation.loc[-1]
+        if isinstance(last, str):
+            setattr(parent, last, operation.new)
+            continue
+        if not isinstance(parent, list):
+            raise KeyError(f"{operation.path} is not in the model")
+        new = _validate_item(owner, path[-1], operation.new) if operation.op != "remove" else None
+        if operation.op == "add":
+            index = operation.index if operation.index is not None else len(parent)
+            changed_lists.setdefault(id(parent), [parent, [], None])[1].append((index, new))
+            continue
+        index = last if isinstance(last, int) else _find(parent, last, indexes)
+        if index is None or index >= len(parent) or parent[index] is _REMOVED:
+            raise KeyError(f"{operation.path} is not in the model")
+        if operation.op == "remove":
+            parent[index] = _REMOVED
+            changed_lists.setdefault(id(parent), [parent, [], None])
+        else:
+            parent[index] = new
+    for items, additions, reorder in changed_lists.values():
+        kept = [item for item in items if item is not _REMOVED]
+        if reorder is not None:
+            kept = _reordered(kept, reorder)
+        merged, next_kept = [], 0
+        for index, item in sorted(additions, key=lambda addition: addition[0]):
+            while len(merged) < index and next_kept < len(kept):
+                merged.append(kept[next_kept])
+                next_kept += 1
+            merged.append(item)
+        items[:] = merged + kept[next_kept:]
+    return patched
+
+
+def _validate_item(owner: Any, field: PathElement, item: Any) -> Any:
+    """An item for the list in the field of the model owner, validated as an item of that list"""
+    if not isinstance(owner, BaseModel) or not isinstance(field, str):
+        return item
+    return _field_adapter(type(owner), field).validate_python([item])[0]
+
+
+def _reordered(items: List[Any], reorder: DiffOperation) -> List[Any]:
+    """The items in the order of the ItemKeys of a reorder operation"""
+    position = {key: i for i, key in enumerate(reorder.new)}
+    field = reorder.new[0].field if len(reorder.new) else None
+    keys = [ItemKey(field, getattr(item, field, None)) for item in items]
+    if len(keys) != len(position) or any(key not in position for key in keys):
+        raise KeyError(f"The items of {reorder.path} are not those of the reorder")
+    return [item for _, item in sorted(zip(keys, items), key=lambda pair: position[pair[0]])]
+
+
+def _step(value: Any, element: PathElement, indexes: Dict, copies: Set[int], operation: DiffOperation) -> Any:
+    """The field or item of value at element, replaced in value by a shallow copy of itself if not copied already"""
+    if isinstance(element, str):
+        if not isinstance(value, BaseModel) or element not in type(value).model_fields:
+            raise KeyError(f"{operation.path} is not in the model")
+        child = getattr(value, element)
+    else:
+        if not isinstance(value, list):
+            raise KeyError(f"{operation.path} is not in the model")
+        index = element if isinstance(element, int) else _find(value, element, indexes)
+        if index is None or index >= len(value) or value[index] is _REMOVED:
+            raise KeyError(f"{operation.path} is not in the model")
+        child = value[index]
+    if id(child) in copies or not isinstance(child, (BaseModel, list)):
+        return child
+    child = child.model_copy() if isinstance(child, BaseModel) else list(child)
+    copies.add(id(child))
+    # put back without validating, the copy being of a value that is already valid
+    if isinstance(element, str):
+        value.__dict__[element] = child
+    else:
+        value[index] = child
+    return child
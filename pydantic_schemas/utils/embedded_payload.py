@@ -0,0 +1,192 @@
+"""
+A machine readable copy of the metadata, embedded in the Excel files that are written from it.
+
+Reading a workbook back means reverse engineering the formatted sheets, which is slow for large metadata. So when
+metadata is saved, a compact copy of it is also written to a very hidden sheet, together with a hash of the visible
+values of every sheet. When the file is read the hashes are recomputed: if no sheet has been edited the copy is
+validated directly, and if only some have, only those are parsed and the fields on the others come from the copy.
+
+The copy is the JSON of the model dump, keyed by field alias, compressed with zlib and base64 encoded over as many
+cells as needed, since an Excel cell holds at most 32,767 characters. The first cell of the sheet holds a small JSON
+header with the metadata type version string, as written to cell C1 of the metadata sheet, and for every sheet the
+hash of its values and the fields written to it.
+
+Hashes are of the non empty cells, with their positions, and with values written the way they read back, so that
+opening and saving a file in Excel without changing anything leaves them the same, while any edit, including
+clearing a cell or adding a row, changes the hash of that sheet.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import warnings
+import zlib
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from openpyxl import Workbook, load_workbook
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from .utils import standardize_keys_in_dict
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_SHEET = "_payload"
+PAYLOAD_FORMAT = 1
+
+# comfortably below the 32,767 characters an Excel cell can hold
+_CHUNK_SIZE = 32_000
+
+
+def _canonical_cell_value(value: Any) -> str:
+    """The value of a cell as a string, the same whether it is about to be written or has just been read"""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        # whole floats are written without a decimal point, so read back as integers
+        return str(int(value))
+    if isinstance(value, (float, int)):
+        return repr(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def sheet_hash(cells: Iterable[Iterable[Any]]) -> str:
+    """
+    Hash the values of a worksheet.
+
+    Args:
+        cells (Iterable[Iterable[Any]]): The rows of openpyxl cells, as given by worksheet.iter_rows(), in either the
+            normal or the read only mode.
+
+    Returns:
+        str: The hex SHA-256 of the position and value of every cell that is not empty or NaN.
+    """
+    digest = hashlib.sha256()
+    for row in cells:
+        for cell in row:
+            value = cell.value
+            # NaN, from the DataFrames sheets are written from, is written as an empty cell
+            if value is None or value == "" or value != value:
+                continue
+            digest.update(f"{cell.row},{cell.column}:{_canonical_cell_value(value)}\x1e".encode())
+    return digest.hexdigest()
+
+
+def write_payload(workbook: Workbook, version: str, ob_dict: Dict[str, Any], sheet_fields: Dict[str, List[str]]):
+    """
+    Embed a copy of ob_dict, and the hashes of the sheets it was written to, in a very hidden sheet of workbook.
+
+    This should be called once every sheet has been written, since the hashes are of the values at the time.
+
+    Args:
+        workbook (Workbook): The workbook being written.
+        version (str): The metadata type version string written to cell C1 of the metadata sheet.
+        ob_dict (Dict[str, Any]): The model dump that was written.
+        sheet_fields (Dict[str, List[str]]): The names of the fields written to each sheet.
+    """
+    if PAYLOAD_SHEET in workbook.sheetnames:
+        del workbook[PAYLOAD_SHEET]
+    data = base64.b64encode(zlib.compress(to_json(standardize_keys_in_dict(ob_dict)))).decode("ascii")
+    header = {
+        "format": PAYLOAD_FORMAT,
+        "version": version,
+        "sheets": {
+            sheetname: {"hash": sheet_hash(workbook[sheetname].iter_rows()), "fields": fields}
+            for sheetname, fields in sheet_fields.items()
+        },
+    }
+    worksheet = workbook.create_sheet(PAYLOAD_SHEET)
+    worksheet.sheet_state = "veryHidden"
+    worksheet.append([json.dumps(header)])
+    for start in range(0, len(data), _CHUNK_SIZE):
+        worksheet.append([data[start : start + _CHUNK_SIZE]])
+    logger.debug("embedded a payload of %s characters for sheets %s", len(data), list(sheet_fields))
+
+
+class EmbeddedPayload:
+    """
+    The copy of the metadata embedded in an Excel file, see read_payload.
+
+    Attributes:
+        version (str): The metadata type version string of the metadata.
+        data (bytes): The JSON of the model dump, keyed by field alias.
+        sheet_fields (Dict[str, List[str]]): The names of the fields written to each sheet.
+        unchanged_sheets (List[str]): The sheets whose values are the same as when they were written.
+    """
+
+    def __init__(self, version: str, data: bytes, sheet_fields: Dict[str, List[str]], unchanged_sheets: List[str]):
+        self.version = version
+        self.data = data
+        self.sheet_fields = sheet_fields
+        self.unchanged_sheets = unchanged_sheets
+
+    @property
+    def is_unchanged(self) -> bool:
+        """True if no sheet has been edited since the file was written"""
+        return len(self.unchanged_sheets) == len(self.sheet_fields)
+
+    def unchanged_fields(self, model_type: Type[BaseModel]) -> Dict[str, Any]:
+        """
+        The values of the fields on the sheets that have not been edited.
+
+        Returns:
+            Dict[str, Any]: The values by field name, each as it would be dumped to JSON by alias.
+        """
+        values = json.loads(self.data)
+        unchanged = {}
+        for sheetname in self.unchanged_sheets:
+            for name in self.sheet_fields[sheetname]:
+                alias = model_type.model_fields[name].alias or name
+                if alias in values:
+                    unchanged[name] = values[alias]
+        return unchanged
+
+
+def read_payload(filename: str, version: str) -> Optional[EmbeddedPayload]:
+    """
+    Read the copy of the metadata embedded in an Excel file by write_payload, and find which sheets have been edited.
+
+    Args:
+        filename (str): The path to the Excel file.
+        version (str): The metadata type version string of the schema being read, the payload is ignored if it was
+            written for another.
+
+    Returns:
+        Optional[EmbeddedPayload]: The payload, or None if the file has none, it was written for another schema, or
+            it can't be read, in which case the sheets should be read as usual.
+    """
+    workbook = load_workbook(filename, read_only=True)
+    try:
+        if PAYLOAD_SHEET not in workbook.sheetnames:
+            return None
+        rows = [row[0] for row in workbook[PAYLOAD_SHEET].iter_rows(values_only=True) if len(row)]
+        try:
+            header = json.loads(rows[0])
+            if header["format"] != PAYLOAD_FORMAT or header["version"] != version:
+                logger.debug("ignoring the payload written for %s", header.get("version"))
+                return None
+            data = zlib.decompress(base64.b64decode("".join(rows[1:])))
+            sheets = header["sheets"]
+        except (IndexError, KeyError, TypeError, ValueError, zlib.error):
+            warnings.warn(
+                f"The metadata embedded in {filename} could not be read, so its sheets are read instead", stacklevel=2
+            )
+            return None
+        unchanged_sheets = [
+            sheetname
+            for sheetname, sheet in sheets.items()
+            if sheetname in workbook.sheetnames and sheet_hash(workbook[sheetname].iter_rows()) == sheet["hash"]
+        ]
+    finally:
+        workbook.close()
+    logger.debug("sheets unchanged since the payload was written: %s", unchanged_sheets)
+    return EmbeddedPayload(
+        version=version,
+        data=data,
+        sheet_fields={sheetname: sheet["fields"] for sheetname, sheet in sheets.items()},
+        unchanged_sheets=unchanged_sheets,
+    )
@@ -1,7 +1,43 @@
-from enum import Enum
+import math
+from enum import Enum, EnumMeta
+from types import MappingProxyType
+from typing import Any, Iterable, List, Mapping
 
 
-class EnumWithValueOrKey(Enum):
+def _normalize_key(value: str) -> str:
+    """Lower case and collapse whitespace so that ' Derivation ' and 'derivation' are the same key"""
+    return " ".join(value.split()).casefold()
+
+
+def _build_normalized_map(enum_class: EnumMeta) -> Mapping[str, Enum]:
+    """
+    Map the case and whitespace normalized forms of the name and value of every member to that member.
+
+    If two members normalize to the same key then neither is reachable through it, rather than picking one
+    arbitrarily.
+    """
+    normalized = {}
+    ambiguous = set()
+    for member in enum_class:
+        keys = {_normalize_key(member.name)}
+        if isinstance(member.value, str):
+            keys.add(_normalize_key(member.value))
+        for key in keys:
+            if key in normalized and normalized[key] is not member:
+                ambiguous.add(key)
+            normalized[key] = member
+    return MappingProxyType({k: v for k, v in normalized.items() if k not in ambiguous})
+
+
+class _EnumWithValueOrKeyMeta(EnumMeta):
+    def __new__(metacls, cls, bases, classdict, **kwds):
+        enum_class = super().__new__(metacls, cls, bases, classdict, **kwds)
+        # exact values are already in _value2member_map_ and exact names in _member_map_
+        enum_class._normalized_member_map_ = _build_normalized_map(enum_class)
+        return enum_class
+
+
+class EnumWithValueOrKey(Enum, metaclass=_EnumWithValueOrKeyMeta):
     """A custom Enum that allows input values to be either the key or the value.
 
     Users of the Metadata Editor tend to put either the key or the value of an Enum.
@@ -12,7 +48,8 @@ class EnumWithValueOrKey(Enum):
       Input should be 'concept', 'disaggregation' or 'derivation' [type=enum, input_value='Derivation', input_type=str]
         For further information visit https://errors.pydantic.dev/2.10/v/enum/
 
-    This custom Enum class allows the input to be either the key or the value of the Enum.
+    This custom Enum class allows the input to be either the key or the value of the Enum. Matching is also case and
+    whitespace insensitive. The lookup table is built once when the Enum class is created.
 
     Example:
     ```python
@@ -26,9 +63,13 @@ class EnumWithValueOrKey(Enum):
     # This will work
     IndicatorType("concept")  # gives IndicatorType.Concept
     IndicatorType("Concept")  # gives IndicatorType.Concept
+    IndicatorType(" CONCEPT ")  # gives IndicatorType.Concept
 
     # This will raise a ValidationError
     IndicatorType("Invalid")
+
+    # Normalize a whole column of values at once
+    IndicatorType.normalize_many(["Concept", "derivation", None])  # gives ["concept", "derivation", None]
     ```
     """
 
@@ -37,10 +78,56 @@ class EnumWithValueOrKey(Enum):
         """Handle both keys (names) and values for Enum."""
         # Check if the value is a valid key (name)
         if isinstance(value, str):
-            # Try to map the string value to the Enum's key
-            for item in cls:
-                if item.name == value or item.value == value:  # case-insensitive check
-                    return item
+            member = cls._member_map_.get(value)
+            if member is None:
+                member = cls._normalized_member_map_.get(_normalize_key(value))
+            if member is not None:
+                return member
             raise ValueError(f"{value} is not a valid {cls.__name__}")  # Raise if input is neither key nor value
         # proceed as usual
         return super()._missing_(value)
+
+    @classmethod
+    def normalize_many(cls, values: Iterable[Any], errors: str = "raise") -> List[Any]:
+        """
+        Convert many user inputs, such as a column from a spreadsheet, into the values of the Enum.
+
+        Each distinct input is only looked up once. Missing inputs (None, NaN and empty strings) become None.
+
+        Args:
+            values (Iterable[Any]): The inputs, each either a value or a key of the Enum.
+            errors (str): 'raise' to raise a ValueError listing every invalid input, or 'ignore' to leave invalid
+                inputs unchanged.
+
+        Returns:
+            List[Any]: The Enum values.
+
+        Raises:
+            ValueError: If errors='raise' and any input is not a value or key of the Enum.
+        """
+        if errors not in ("raise", "ignore"):
+            raise ValueError(f"errors must be 'raise' or 'ignore' but got '{errors}'")
+        resolved = {}
+        invalid = []
+        normalized_values = []
+        for value in values:
+            if value is None or value == "" or (isinstance(value, float) and math.isnan(value)):
+                normalized_values.append(None)
+                continue
+            try:
+                is_new = value not in resolved
+            except TypeError:
+                # a list, dictionary or other unhashable input can not be a value or key of the Enum
+                invalid.append(value)
+                normalized_values.append(value)
+                continue
+            if is_new:
+                try:
+                    resolved[value] = cls(value).value
+                except ValueError:
+                    resolved[value] = value
+                    invalid.append(value)
+            normalized_values.append(resolved[value])
+        if errors == "raise" and len(invalid):
+            raise ValueError(f"{invalid} are not valid {cls.__name__} values or keys")
+        return normalized_values
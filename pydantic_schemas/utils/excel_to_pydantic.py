@@ -1,12 +1,26 @@
 import json
-from typing import Annotated, Any, List, Optional, Type, Union, get_args, get_origin
+import logging
+from typing import (
+    Annotated,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
 
 import numpy as np
 import pandas as pd
 from pydantic import BaseModel, create_model
+from pydantic_core import PydanticUndefined
 
 from ..utils.pydantic_to_excel import pydantic_to_dataframe
+from .debug_logging import summarize
 from .quick_start import make_skeleton
+from .tracing import get_tracer, traced
 from .utils import (
     annotation_contains_pydantic,
     get_subtype_of_optional_or_list,
@@ -18,6 +32,8 @@ from .utils import (
     subset_pydantic_model_type,
 )
 
+logger = logging.getLogger(__name__)
+
 
 def find_string_and_count_nans(arr, search_str):
     """
@@ -46,6 +62,10 @@ def find_string_and_count_nans(arr, search_str):
     return int(index), nan_count
 
 
+# the title of each model's JSON schema, which labels its rows, as generating the whole schema is slow
+_MODEL_TITLE_CACHE: Dict[Type[BaseModel], str] = {}
+
+
 def get_relevant_sub_frame(m: Type[BaseModel], df: pd.DataFrame, name_of_field: Optional[str] = None, debug=False):
     """
     THe dataframe likely contains lots and lots of information about other models.
@@ -53,14 +73,11 @@ def get_relevant_sub_frame(m: Type[BaseModel], df: pd.DataFrame, name_of_field:
     THis function obtains only that information that pertains to this model
     """
     names = df.iloc[:, 0].to_numpy()
-    if debug:
-        print(f"getting subframe for {m} or {name_of_field} given {names}")
+    logger.debug("getting subframe for %s or %s given %s", m, name_of_field, summarize(list(names)))
     try:
-        json_schema = m.model_json_schema()
-        if debug:
-            print(f"get relevant sub frame using json schema: {json_schema}")
-        name_of_class = json_schema["title"]
-        idx, sze = find_string_and_count_nans(names, name_of_class)
+        if m not in _MODEL_TITLE_CACHE:
+            _MODEL_TITLE_CACHE[m] = m.model_json_schema()["title"]
+        idx, sze = find_string_and_count_nans(names, _MODEL_TITLE_CACHE[m])
     except (AttributeError, KeyError):
         idx = -1
         sze = 0
@@ -73,20 +90,15 @@ def get_relevant_sub_frame(m: Type[BaseModel], df: pd.DataFrame, name_of_field:
                 error_message += f"and '{name_of_field}' "
             error_message += f"not found in {names}"
             raise IndexError(error_message)
-        if debug:
-            print(f"get relevant sub frame sze={sze}, idx={idx}")
 
     sub = df.iloc[idx : idx + sze + 1, 1:]
-    if debug:
-        print(sub)
     sub = sub.dropna(how="all", axis=0)  # drop all null rows
     sub = sub.dropna(how="all", axis=1)  # drop all null columns
-    if debug:
-        print("SubFrame = \n", sub)
+    logger.debug("subframe at idx=%s, size=%s: %s", idx, sze, summarize(sub))
     return sub
 
 
-def handle_optional(name, annotation, df, from_within_list: bool = False, debug=False):
+def handle_optional(name, annotation, df, from_within_list: bool = False, debug=False, as_dict=False):
     args = [a for a in get_args(annotation) if a is not type(None)]
     if len(args) > 1:
         list_args = [a for a in args if is_list_annotation(a)]
@@ -100,10 +112,11 @@ def handle_optional(name, annotation, df, from_within_list: bool = False, debug=
             arg = args[0]
     else:
         arg = args[0]
-    ret = annotation_switch(name, arg, df, from_within_list=from_within_list, debug=debug)
-    if debug:
-        print(f"optional ret: {ret}")
-        print(f"isinstance(ret, list): {isinstance(ret, list)}")
+    ret = annotation_switch(name, arg, df, from_within_list=from_within_list, debug=debug, as_dict=as_dict)
+    logger.debug("optional %s: %s", name, summarize(ret))
+    if as_dict and isinstance(arg, type(BaseModel)):
+        # a model read as a dictionary is empty when every field has its default, but is still there
+        return ret
     if isinstance(ret, (list, dict)) and len(ret) == 0:
         return None
     if isinstance(ret, str) and ret == "":
@@ -111,70 +124,51 @@ def handle_optional(name, annotation, df, from_within_list: bool = False, debug=
     return ret
 
 
-def handle_list(name, anno, df, debug=False):
+def handle_list(name, anno, df, debug=False, as_dict=False):
     subtype = get_subtype_of_optional_or_list(anno)
-    if debug:
-        print(f"handle_list found subtype: {subtype} from {anno} with name {name}\n{df}")
+    logger.debug("found subtype %s from %s with name %s", subtype, anno, name)
     if isinstance(subtype, type(BaseModel)):
         try:
             subframe = get_relevant_sub_frame(subtype, df, name_of_field=name, debug=debug)
-            if debug:
-                print(f"subframe\n{subframe}")
         except IndexError:
             return []
         list_of_subs = []
-        if debug:
-            print("handle list df received")
-            print(subframe)
-            print("handle list df expected except for the specific values")
-            print(pydantic_to_dataframe([make_skeleton(subtype)])[0])
-        index_size = max(
-            [len(x) if isinstance(x, tuple) else 1 for x in pydantic_to_dataframe([make_skeleton(subtype)])[0].index]
-        )
-        if debug:
-            print(f"measured index to have depth={index_size}")
+        index_size = _list_index_depth(subtype)
+        logger.debug("received %s, measured index to have depth=%s", summarize(subframe), index_size)
         ## need to figure out the index columns and the data columns rather than assuming that the zeroth column is the *only* index column
         for c in list(range(len(subframe.columns)))[index_size:]:
             subsubframe = subframe.iloc[
                 :, list(range(index_size)) + [c]
             ]  #  subframe.loc[:, [subframe.columns[:index_size], c]]
-            if debug:
-                print("subsubframe")
-                print(subsubframe)
-                print()
-            sub = instantiate_pydantic_object(model_type=subtype, df=subsubframe, from_within_list=True, debug=debug)
-            if debug:
-                print(f"instantiated: {sub}")
+            sub = instantiate_pydantic_object(
+                model_type=subtype, df=subsubframe, from_within_list=True, debug=debug, as_dict=as_dict
+            )
+            logger.debug("instantiated %s", summarize(sub))
             list_of_subs.append(sub)
         return list_of_subs
     values = df.set_index(df.columns[0]).loc[name]
-    if debug:
-        print(f"handle_list anno:{anno}, value: {values}")
+    logger.debug("%s values: %s", name, summarize(values))
     return [v for v in values if v is not None]
 
 
-def handle_list_within_list(name, anno, df, debug=False):
-    if debug:
-        print(f"handle_list_within_list {name}, {anno}")
-        print(df)
-        print(df.set_index(df.columns[0]).loc[name])
-        print(df.columns)
+# the depth of the index of the rows written for each model type, which only depends on the type
+_LIST_INDEX_DEPTH_CACHE: Dict[Type[BaseModel], int] = {}
 
+
+def _list_index_depth(subtype: Type[BaseModel]) -> int:
+    if subtype not in _LIST_INDEX_DEPTH_CACHE:
+        expected = pydantic_to_dataframe([make_skeleton(subtype)])[0]
+        _LIST_INDEX_DEPTH_CACHE[subtype] = max([len(x) if isinstance(x, tuple) else 1 for x in expected.index])
+    return _LIST_INDEX_DEPTH_CACHE[subtype]
+
+
+def handle_list_within_list(name, anno, df, debug=False, as_dict=False):
+    logger.debug("%s, %s from %s", name, anno, summarize(df))
     df = df.dropna(axis=1, how="all")
-    if debug:
-        print("dropna")
-        print(df)
     df = df.set_index(df.columns[0])
-    if debug:
-        print("setting index")
-        print(df)
     values = df.loc[name]
-    if debug:
-        print(f"getting entry for '{name}'")
-        print(values)
     values = values.to_numpy()[-1]  # , df.columns[1]
-    if debug:
-        print(f"values: {values}, {type(values)}")
+    logger.debug("encoded values: %s", summarize(values))
     if values is None:
         return []
     try:
@@ -193,13 +187,14 @@ def handle_list_within_list(name, anno, df, debug=False):
                 )
             except json.JSONDecodeError as e:
                 raise ValueError(f"cannot decode {name}:{anno} with values {values}") from e
-    if debug:
-        print("decoded values:", values)
+    logger.debug("decoded values: %s", summarize(values))
     if len(values) == 0:
         return []
     sub_type = get_subtype_of_optional_or_list(anno)
     is_dicts = any(isinstance(v, dict) for v in values)
     if is_dicts and annotation_contains_pydantic(sub_type):
+        if as_dict:
+            return [_to_dict(sub_type, standardize_keys_in_dict(v)) for v in values]
         return [sub_type(**standardize_keys_in_dict(v)) for v in values]
     if not is_dicts and not annotation_contains_pydantic(sub_type):
         return values
@@ -207,13 +202,9 @@ def handle_list_within_list(name, anno, df, debug=False):
 
 
 def handle_builtin_or_enum(name, anno, df, debug=False):
-    if debug:
-        print(df)
     if len(df) == 0:
         return ""
     df_indexed = df.set_index(df.columns[0])
-    if debug:
-        print("handle_builtin_or_enum", df_indexed)
     if name not in df_indexed.index:
         return ""
     values = df_indexed.loc[name]
@@ -229,145 +220,184 @@ def handle_builtin_or_enum(name, anno, df, debug=False):
 
 def handle_dict(name, anno, df):
     dictionary_type = create_model(name, key=(Optional[List[str]], None), value=(Optional[List[Any]], None))
-    dict_results = annotation_switch(name, dictionary_type, df)
-    if (
-        dict_results.key is None
-        or len(dict_results.key) == 0
-        or dict_results.value is None
-        or len(dict_results.value) == 0
-    ):
+    dict_results = annotation_switch(name, dictionary_type, df, as_dict=True)
+    keys, values = dict_results.get("key"), dict_results.get("value")
+    if keys is None or len(keys) == 0 or values is None or len(values) == 0:
         return {}
-    return {k: v for k, v in zip(dict_results.key, dict_results.value) if k is not None}
+    return {k: v for k, v in zip(keys, values) if k is not None}
 
 
-def annotation_switch(name: str, anno, df: pd.DataFrame, from_within_list=False, debug=False) -> Any:
-    if debug:
-        print(f"annotation_to_value name: {name}")
+def annotation_switch(name: str, anno, df: pd.DataFrame, from_within_list=False, debug=False, as_dict=False) -> Any:
+    """
+    Read the value of the field called name, of type anno, from df.
+
+    If as_dict, models are returned as dictionaries keyed by field alias rather than instantiated, so a whole document
+    can be read without building any pydantic objects and validated once at the end, if at all.
+    """
     if is_optional_annotation(anno):
-        if debug:
-            print("optional")
-        return handle_optional(name, anno, df, from_within_list=from_within_list, debug=debug)
+        logger.debug("%s is optional", name)
+        return handle_optional(name, anno, df, from_within_list=from_within_list, debug=debug, as_dict=as_dict)
     if is_dict_annotation(anno):
         return handle_dict(name, anno, df)
     if is_list_annotation(anno):
         if from_within_list:
-            if debug:
-                print("list within a list")
-            return handle_list_within_list(name, anno, df, debug=debug)
-        if debug:
-            print("list")
-        return handle_list(name, anno, df, debug=debug)
+            logger.debug("%s is a list within a list", name)
+            return handle_list_within_list(name, anno, df, debug=debug, as_dict=as_dict)
+        logger.debug("%s is a list", name)
+        return handle_list(name, anno, df, debug=debug, as_dict=as_dict)
     if isinstance(anno, type(BaseModel)):
-        if debug:
-            print("pydantic")
-            print(anno)
-            print(name)
-            print(df)
+        logger.debug("%s is the pydantic model %s", name, anno)
         try:
             sub = get_relevant_sub_frame(anno, df, name_of_field=name, debug=debug)
-            if debug:
-                print("pydantic sub:")
-                print(sub)
         except IndexError:
-            return make_skeleton(anno)
-        return instantiate_pydantic_object(anno, sub, from_within_list=from_within_list, debug=debug)
+            skeleton = make_skeleton(anno)
+            return skeleton.model_dump(mode="json", by_alias=True, exclude_defaults=True) if as_dict else skeleton
+        return instantiate_pydantic_object(anno, sub, from_within_list=from_within_list, debug=debug, as_dict=as_dict)
     if len(get_args(anno)) == 0:
-        if debug:
-            print("builtin or enum")
+        logger.debug("%s is a builtin or enum", name)
         return handle_builtin_or_enum(name, anno, df)
     if get_origin(anno) is Annotated:
-        if debug:
-            print(f"got Annotated type: {anno}, treating as builtin or enum")
+        logger.debug("%s has Annotated type %s, treating as builtin or enum", name, anno)
         datatype = getattr(anno, "__origin__", None)
         return handle_builtin_or_enum(name, datatype, df)
     raise NotImplementedError(anno)
 
 
+@traced("excel.instantiate_model")
 def instantiate_pydantic_object(
-    model_type: Type[BaseModel], df: pd.DataFrame, from_within_list=False, debug=False
-) -> BaseModel:
+    model_type: Type[BaseModel], df: pd.DataFrame, from_within_list=False, debug=False, as_dict=False
+) -> Union[BaseModel, Dict[str, Any]]:
     ret = {}
-    if debug:
-        print(f"instantiate_pydantic_object df = {df}")
+    logger.debug("instantiating %s from %s", model_type.__name__, summarize(df))
     for field_name, field_info in model_type.model_fields.items():
         anno = field_info.annotation
-        if debug:
-            print(f"Instantiating field {field_name}, anno {anno} and args {get_args(anno)}")
-        ret[field_name] = annotation_switch(field_name, anno, df, from_within_list=from_within_list, debug=debug)
-        if debug:
-            print(ret[field_name])
-            print()
+        ret[field_name] = annotation_switch(
+            field_name, anno, df, from_within_list=from_within_list, debug=debug, as_dict=as_dict
+        )
+        logger.debug("field %s, anno %s: %s", field_name, anno, summarize(ret[field_name]))
+    if as_dict:
+        return _to_dict(model_type, ret)
     return model_type(**standardize_keys_in_dict(ret))
 
 
+def _to_dict(model_type: Type[BaseModel], ret: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The dictionary of the values read for the fields of model_type, as the model_dump(exclude_defaults=True,
+    by_alias=True) of the model instantiated from them would be, so that it merges with the skeleton in the same way.
+    """
+    model_fields = model_type.model_fields
+    dumped = {}
+    for name, value in ret.items():
+        field_info = model_fields.get(name)
+        if field_info is None:
+            dumped[name] = value
+        elif field_info.default is PydanticUndefined or value is not field_info.default and value != field_info.default:
+            dumped[field_info.alias or name] = value
+    return dumped
+
+
+@traced("excel.sheet_to_pydantic")
 def excel_sheet_to_pydantic(
-    filename: str, sheetname: str, model_type: Union[Type[BaseModel], Type[List[BaseModel]]], debug=False
+    filename: str,
+    sheetname: str,
+    model_type: Union[Type[BaseModel], Type[List[BaseModel]]],
+    debug=False,
+    as_dict=False,
 ):
-    if debug:
-        print(f"excel_sheet_to_pydantic, sheetname={sheetname}, model_type={model_type}")
-    df = pd.read_excel(filename, sheet_name=sheetname, header=None)
-    df = df.where(df.notna(), None)
-    if debug:
-        print("line 304", model_type)
-        print(df)
+    with get_tracer().span("excel.read_sheet", sheet=sheetname) as span:
+        df = pd.read_excel(filename, sheet_name=sheetname, header=None)
+        df = df.where(df.notna(), None)
+        span.add("rows", df.shape[0])
+        span.add("cells", df.size)
+    logger.debug("read sheet %s for %s: %s", sheetname, model_type, summarize(df))
 
     if is_optional_annotation(model_type):
         if not annotation_contains_pydantic(model_type):
-            return handle_optional(df.iloc[0, 0], model_type, df, debug=debug)
+            return handle_optional(df.iloc[0, 0], model_type, df, debug=debug, as_dict=as_dict)
         model_type = [x for x in get_args(model_type) if x is not type(None)][0]
 
     if is_list_annotation(model_type):
-        return handle_list(df.iloc[0, 0], model_type, df, debug=debug)
+        return handle_list(df.iloc[0, 0], model_type, df, debug=debug, as_dict=as_dict)
 
-    if debug:
-        print("getting children for", model_type)
     children = seperate_simple_from_pydantic(model_type)
-    if debug:
-        print(f"children: {children}")
+    logger.debug("children of %s: %s", model_type.__name__, children)
     ret = {}
     if "simple" in children and len(children["simple"]):
         if set(children["simple"]) != set(df.iloc[:, 0].values):
-            if debug:
-                print(f"simple children: {set(children['simple'])}")
-                print(f"df columns: {set(df.iloc[:, 0].values)}")
             sub = get_relevant_sub_frame(model_type, df, name_of_field=df.iloc[0, 0])
         else:
             sub = df
         simple_child_field_type = subset_pydantic_model_type(model_type, children["simple"])
-        fields = instantiate_pydantic_object(simple_child_field_type, sub, from_within_list=False, debug=debug)
+        fields = instantiate_pydantic_object(
+            simple_child_field_type, sub, from_within_list=False, debug=debug, as_dict=as_dict
+        )
         for child in children["simple"]:
-            ret[child] = getattr(fields, child)
+            if not as_dict:
+                ret[child] = getattr(fields, child)
+            elif child in fields:
+                ret[child] = fields[child]
     for name in children["pydantic"]:
-        if debug:
-            print(f"sheet Looking to get {name}")
+        logger.debug("sheet %s looking to get %s", sheetname, name)
         anno = model_type.model_fields[name].annotation
-        ret[name] = annotation_switch(name, anno, df, from_within_list=False, debug=debug)
+        ret[name] = annotation_switch(name, anno, df, from_within_list=False, debug=debug, as_dict=as_dict)
     for k, v in ret.items():
         if isinstance(v, (list, np.ndarray)):
             ret[k] = [elem for elem in v if elem is not None]
-    if debug:
-        print(ret)
 
+    if as_dict:
+        return _to_dict(model_type, ret)
     return model_type(**ret)
 
 
-def excel_single_sheet_to_pydantic(filename: str, model_type: Type[BaseModel], verbose=False) -> BaseModel:
-    return excel_sheet_to_pydantic(filename, "metadata", model_type, debug=verbose)
+@traced("excel.excel_single_sheet_to_pydantic")
+def excel_single_sheet_to_pydantic(
+    filename: str, model_type: Type[BaseModel], verbose=False, as_dict=False
+) -> Union[BaseModel, Dict[str, Any]]:
+    return excel_sheet_to_pydantic(filename, "metadata", model_type, debug=verbose, as_dict=as_dict)
 
 
-def excel_doc_to_pydantic(filename: str, model_type: Type[BaseModel], verbose=False) -> BaseModel:
+@traced("excel.excel_doc_to_pydantic")
+def excel_doc_to_pydantic(
+    filename: str,
+    model_type: Type[BaseModel],
+    verbose=False,
+    as_dict=False,
+    unchanged: Optional[Dict[str, Any]] = None,
+) -> Union[BaseModel, Dict[str, Any]]:
+    """
+    Read a model of model_type from an Excel file with its simple fields on a sheet called 'metadata' and each field
+    holding models on a sheet of its own.
+
+    If as_dict, no pydantic objects are created and the result is a dictionary keyed by field alias, not validated.
+    The values of fields on sheets that haven't been edited since they were written can be given by field name in
+    unchanged, see embedded_payload.py, in which case those sheets aren't read.
+    """
     children = seperate_simple_from_pydantic(model_type)
     annotations = {k: v.annotation for k, v in model_type.model_fields.items()}
+    unchanged = unchanged or {}
     ret = {}
 
-    if len(children["simple"]) > 0:
+    if len(children["simple"]) > 0 and all(child in unchanged for child in children["simple"]):
+        ret.update({child: unchanged[child] for child in children["simple"]})
+    elif len(children["simple"]) > 0:
         field_type = subset_pydantic_model_type(model_type, children["simple"])
-        fields = excel_sheet_to_pydantic(filename, sheetname="metadata", model_type=field_type, debug=verbose)
+        fields = excel_sheet_to_pydantic(
+            filename, sheetname="metadata", model_type=field_type, debug=verbose, as_dict=as_dict
+        )
         for child in children["simple"]:
-            ret[child] = getattr(fields, child)
+            if not as_dict:
+                ret[child] = getattr(fields, child)
+            elif child in fields:
+                ret[child] = fields[child]
     for fieldname in children["pydantic"]:
-        if verbose:
-            print(f"Looking to get {fieldname}")
+        if fieldname in unchanged:
+            ret[fieldname] = unchanged[fieldname]
+            continue
+        logger.debug("looking to get %s", fieldname)
         field_type = annotations[fieldname]
-        ret[fieldname] = excel_sheet_to_pydantic(filename, sheetname=fieldname, model_type=field_type, debug=verbose)
+        ret[fieldname] = excel_sheet_to_pydantic(
+            filename, sheetname=fieldname, model_type=field_type, debug=verbose, as_dict=as_dict
+        )
+    if as_dict:
+        return _to_dict(model_type, ret)
     return model_type(**ret)
@@ -0,0 +1,266 @@
+"""
+A canonical form of metadata and a fingerprint of it, for finding which records, or which parts of a record, have
+changed since they were last synced without comparing them field by field.
+
+    >>> canonical_json(microdata)
+    b'{"study_desc":{"title_statement":{"idno":"SURVEY-1","title":"Household survey"}},...}'
+    >>> microdata.fingerprint()
+    '5f1c...'
+    >>> microdata.fingerprint("study_desc.title_statement")
+    '0b7e...'
+
+The canonical form follows the same rules as diff: keys are sorted, enums are their values, URLs and dates are
+strings, and a value that is empty, that is None, an empty string, list or dictionary, or a model whose fields are all
+empty, is left out, as is a value equal to the default of its field. Two models that diff finds no difference between
+therefore have the same canonical form and the same fingerprint.
+
+The fingerprint of a model is a hash of the digests of its fields, and that of a list a hash of the digests of its
+items. By default every call computes the fingerprint afresh, which takes time in proportion to the size of the value.
+To ask many times for the fingerprints of a record and its parts, pass a FingerprintCache, which remembers the digest
+of every model computed through it, and of each of its fields, so that asking again is a lookup:
+
+    >>> cache = FingerprintCache()
+    >>> microdata.fingerprint(cache=cache)
+    '5f1c...'
+    >>> microdata.fingerprint("variables.12", cache=cache)
+    '9d2a...'
+
+Nothing tells a cache when a model changes, so forget a model after a field of it, or a list or dictionary it holds,
+is changed, which also forgets the models it is in:
+
+    >>> microdata.variables[12].labl = "Age in years"
+    >>> cache.forget(microdata.variables[12])
+"""
+
+import functools
+import hashlib
+import json
+import threading
+import weakref
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import AnyUrl, BaseModel
+from pydantic_core import Url
+
+from .diff import _diff_fields
+
+# the fingerprint of an empty value
+EMPTY_FINGERPRINT = hashlib.sha256(b"").hexdigest()
+
+
+class _Node:
+    """The remembered digest of a model, the digests of its fields and weak references to the models it is in"""
+
+    __slots__ = ("ref", "digest", "fields", "parents")
+
+    def __init__(self, ref: weakref.ref, digest: Optional[bytes], fields: Dict[str, bytes]):
+        self.ref = ref
+        self.digest = digest
+        self.fields = fields
+        self.parents: Dict[int, weakref.ref] = {}
+
+
+class FingerprintCache:
+    """
+    The digests of the models whose fingerprints were computed with this cache, keyed by the id of the model and
+    dropped when it is garbage collected. Models can not be hashed and their private attributes are compared by ==,
+    so the digests are kept here rather than on the models.
+
+    A cache can be shared between threads.
+    """
+
+    def __init__(self):
+        # reentrant, as a model can be collected, and its digest dropped, while a digest is being computed
+        self._lock = threading.RLock()
+        self._nodes: Dict[int, _Node] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def forget(self, model: BaseModel) -> None:
+        """Drop the remembered digest of a model and of every model that contains it"""
+        with self._lock:
+            self._forget(model)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._nodes.clear()
+
+    def _forget(self, model: BaseModel) -> None:
+        node = self._node(model)
+        if node is None:
+            return
+        del self._nodes[id(model)]
+        for parent_ref in node.parents.values():
+            parent = parent_ref()
+            if parent is not None:
+                self._forget(parent)
+
+    def _node(self, model: BaseModel) -> Optional[_Node]:
+        node = self._nodes.get(id(model))
+        return node if node is not None and node.ref() is model else None
+
+    def _add(self, model: BaseModel, digest: Optional[bytes], fields: Dict[str, bytes]) -> _Node:
+        key = id(model)
+        node = _Node(weakref.ref(model, functools.partial(self._collected, key)), digest, fields)
+        self._nodes[key] = node
+        return node
+
+    def _collected(self, key: int, ref: weakref.ref) -> None:
+        with self._lock:
+            node = self._nodes.get(key)
+            if node is not None and node.ref is ref:
+                del self._nodes[key]
+
+
+def _canonical_leaf(value: Any) -> Any:
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, (AnyUrl, Url)):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _is_unset_leaf(value: Any, default: Any) -> bool:
+    return value is None or value == "" or (default is not None and value == _canonical_leaf(default))
+
+
+def canonical(value: Any, default: Any = None) -> Any:
+    """
+    The canonical form of a model or value as dictionaries, lists and plain values, or None if it is empty.
+
+    Args:
+        value (Any): A model, list, dictionary or plain value.
+        default (Any): The default of the field holding the value, a value equal to it is left out.
+
+    Returns:
+        Any: The value with the fields of models under their aliases and empty values left out. Empty items of a list
+            that is not empty are kept as None so that the positions of the other items do not change.
+    """
+    if isinstance(value, BaseModel):
+        model_fields = type(value).model_fields
+        out = {}
+        for name, field_default, _, _ in _diff_fields(type(value)):
+            child = canonical(value.__dict__.get(name), field_default)
+            if child is not None:
+                out[model_fields[name].alias or name] = child
+        return out or None
+    if isinstance(value, dict):
+        out = {str(key): canonical(child) for key, child in value.items()}
+        return {key: child for key, child in out.items() if child is not None} or None
+    if isinstance(value, (list, tuple)):
+        items = [canonical(item) for item in value]
+        return items if any(item is not None for item in items) else None
+    value = _canonical_leaf(value)
+    return None if _is_unset_leaf(value, default) else value
+
+
+def canonical_json(value: Any) -> bytes:
+    """The canonical form of a model or value as compact JSON with sorted keys, b'null' if it is empty"""
+    text = json.dumps(canonical(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return text.encode("utf-8")
+
+
+def _hash_pairs(pairs: List[Tuple[bytes, bytes]]) -> Optional[bytes]:
+    if not pairs:
+        return None
+    pairs.sort()
+    return hashlib.sha256(b"".join(b"K%d:%s" % (len(key), key) + child for key, child in pairs)).digest()
+
+
+def _hash_items(items: List[Optional[bytes]]) -> Optional[bytes]:
+    if all(item is None for item in items):
+        return None
+    return hashlib.sha256(b"L" + b"".join(b"N" if item is None else item for item in items)).digest()
+
+
+def _digest(
+    value: Any, default: Any, parent: Optional[BaseModel], cache: Optional[FingerprintCache]
+) -> Optional[bytes]:
+    """
+    The sha256 digest of the canonical form of a value, or None if it is empty.
+
+    With a cache, the digests of models are looked up in it or added to it, and parent is the nearest model around the
+    value, which is forgotten along with the models inside it.
+    """
+    if isinstance(value, BaseModel):
+        node = None if cache is None else cache._node(value)
+        if node is None:
+            model_fields = type(value).model_fields
+            fields = {}
+            for name, field_default, _, _ in _diff_fields(type(value)):
+                child_digest = _digest(value.__dict__.get(name), field_default, value, cache)
+                if child_digest is not None:
+                    fields[name] = child_digest
+            digest = _hash_pairs(
+                [((model_fields[name].alias or name).encode("utf-8"), d) for name, d in fields.items()]
+            )
+            if cache is None:
+                return digest
+            node = cache._add(value, digest, fields)
+        if parent is not None:
+            node.parents.setdefault(id(parent), weakref.ref(parent))
+        return node.digest
+    if isinstance(value, dict):
+        pairs = []
+        for key, child in value.items():
+            child_digest = _digest(child, None, parent, cache)
+            if child_digest is not None:
+                pairs.append((str(key).encode("utf-8"), child_digest))
+        return _hash_pairs(pairs)
+    if isinstance(value, (list, tuple)):
+        return _hash_items([_digest(item, None, parent, cache) for item in value])
+    value = _canonical_leaf(value)
+    if _is_unset_leaf(value, default):
+        return None
+    return hashlib.sha256(b"V" + json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")).digest()
+
+
+def fingerprint(model: BaseModel, path: Optional[str] = None, cache: Optional[FingerprintCache] = None) -> str:
+    """
+    A hash of the canonical form of a model or of a part of it, the same for any two models that diff finds no
+    difference between.
+
+    Args:
+        model (BaseModel): The model.
+        path (Optional[str]): The part of the model as field names or aliases and list indexes separated by dots, such
+            as 'study_desc.title_statement' or 'variables.12', by default the whole model.
+        cache (Optional[FingerprintCache]): Where to look up and remember the digests of the models in the value, by
+            default none, so the fingerprint is computed afresh. A model changed since its digest was remembered
+            has to be forgotten by the cache first.
+
+    Returns:
+        str: The sha256 hash as 64 hexadecimal characters, EMPTY_FINGERPRINT if the value is empty.
+
+    Raises:
+        ValueError: If the path does not name a value of the model.
+    """
+    value, default, parent, field_name = model, None, None, None
+    for part in path.split(".") if path else []:
+        if isinstance(value, BaseModel):
+            parent = value
+            fields = type(value).model_fields
+            field_name = part if part in fields else next((n for n, f in fields.items() if f.alias == part), None)
+            if field_name is None:
+                raise ValueError(f"{type(value).__name__} has no field '{part}' in '{path}'")
+            value = value.__dict__.get(field_name)
+            default = next(d for n, d, _, _ in _diff_fields(type(parent)) if n == field_name)
+        elif isinstance(value, (list, tuple)) and part.isdigit() and int(part) < len(value):
+            value, default, field_name = value[int(part)], None, None
+        else:
+            raise ValueError(f"'{part}' in '{path}' is not a field or an index of a list")
+    if cache is None:
+        digest = _digest(value, default, None, None)
+    else:
+        with cache._lock:
+            if field_name is not None:
+                # the digests of the fields of a model are remembered with its own
+                _digest(parent, None, None, cache)
+                digest = cache._node(parent).fields.get(field_name)
+            else:
+                digest = _digest(value, default, None, cache)
+    return EMPTY_FINGERPRINT if digest is None else digest.hex()
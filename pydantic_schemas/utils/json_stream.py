@@ -0,0 +1,388 @@
+"""
+Read and write the JSON of a metadata model one top level field at a time, and the items of its long lists one at a
+time, so that a file of any size can be processed with memory bounded by the largest item or batch of items rather
+than by the file.
+
+    >>> with open("census.json", "rb") as file:
+    ...     for field, value in iter_json_fields(file, MicrodataSchema, batch_size=1000):
+    ...         if field == "variables":
+    ...             handle(value)  # a list of at most 1000 VariableSchema
+
+The other top level fields, for instance doc_desc and study_desc, are validated as they are read and yielded whole.
+"""
+
+import functools
+import gzip
+import io
+import os
+import re
+from typing import (
+    IO,
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+from pydantic_core import from_json, to_json
+
+# the parts of a model's config that also apply to validating one of its fields on its own
+_FIELD_CONFIG_KEYS = ("use_enum_values", "strict", "str_strip_whitespace", "coerce_numbers_to_str")
+
+_STRUCTURE = re.compile(rb'[\[\]{}"]')
+_STRING_END = re.compile(rb'["\\]')
+_SCALAR_END = re.compile(rb"[,\]}\s]")
+_WHITESPACE = b" \t\r\n"
+
+
+class _JsonReader:
+    """Split a JSON document read from a binary stream into the raw bytes of its values, without parsing them"""
+
+    def __init__(self, stream: IO[bytes], buffer_size: int):
+        self._stream = stream
+        self._buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._pos = 0
+        self._consumed = 0  # the number of bytes dropped from the front of the buffer
+
+    def _fill(self) -> int:
+        """Read more of the stream, dropping what has been consumed, and return how far the buffer shifted"""
+        chunk = self._stream.read(self._buffer_size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        shift = self._pos
+        # in place, so that the start of a value spanning many reads isn't copied again on each of them
+        del self._buffer[:shift]
+        self._buffer += chunk
+        self._consumed += shift
+        self._pos = 0
+        if not chunk:
+            return -1
+        return shift
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"{message} at byte {self._consumed + self._pos}")
+
+    def peek(self) -> bytes:
+        """The next byte that isn't whitespace, without consuming it, or b"" at the end of the document"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return bytes(self._buffer[self._pos : self._pos + 1])
+            if self._fill() < 0:
+                return b""
+
+    def expect(self, char: bytes):
+        found = self.peek()
+        if found != char:
+            raise self.error(f"Expected {char.decode()!r} but found {found.decode(errors='replace') or 'the end'!r}")
+        self._pos += 1
+
+    def read_value(self) -> bytes:
+        """Consume the next value, of any type, and return its bytes"""
+        first = self.peek()
+        if first == b"":
+            raise self.error("Expected a value but found the end")
+        if first in b",:]}":
+            raise self.error(f"Expected a value but found {first.decode()!r}")
+        i = self._pos + 1
+        if first == b'"':
+            i = self._skip_string(i)
+        elif first in b"[{":
+            depth = 1
+            while depth:
+                match = _STRUCTURE.search(self._buffer, i)
+                if match is None:
+                    i = self._more(len(self._buffer))
+                    continue
+                char = match.group()
+                i = match.end()
+                if char == b'"':
+                    i = self._skip_string(i)
+                elif char in b"[{":
+                    depth += 1
+                else:
+                    depth -= 1
+        else:
+            while True:
+                match = _SCALAR_END.search(self._buffer, i)
+                if match is not None:
+                    i = match.start()
+                    break
+                i = self._more(len(self._buffer))
+        value = bytes(self._buffer[self._pos : i])
+        self._pos = i
+        return value
+
+    def _skip_string(self, i: int) -> int:
+        """Return the position after the end of the string whose contents start at i"""
+        while True:
+            match = _STRING_END.search(self._buffer, i)
+            if match is None:
+                i = self._more(len(self._buffer))
+            elif match.group() == b'"':
+                return match.end()
+            elif match.end() < len(self._buffer):
+                i = match.end() + 1
+            else:
+                i = self._more(match.start())
+
+    def _more(self, i: int) -> int:
+        """
+        Read more of the stream while in the middle of a value, returning i adjusted to the shifted buffer.
+
+        Searches resume from i, the end of what has been searched, so that the bytes of a long value are only scanned
+        once however many reads it spans.
+        """
+        shift = self._fill()
+        if shift < 0:
+            raise self.error("Unexpected end of the document")
+        return i - shift
+
+
+def _list_item_class(annotation: Any) -> Optional[Type[BaseModel]]:
+    """The model of the items of a List[Model] or Optional[List[Model]] annotation, None for other annotations"""
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    if get_origin(annotation) is Union and len(args) == 1:
+        annotation = args[0]
+    if get_origin(annotation) is not list or len(get_args(annotation)) != 1:
+        return None
+    item = get_args(annotation)[0]
+    if isinstance(item, type) and issubclass(item, BaseModel):
+        return item
+    return None
+
+
+def streamable_fields(model_class: Type[BaseModel]) -> List[str]:
+    """
+    The top level fields of model_class that are lists of models, and so can be read and written item by item.
+
+    For MicrodataSchema these include data_files, variables and variable_groups.
+    """
+    return [name for name, field in model_class.model_fields.items() if _list_item_class(field.annotation)]
+
+
+@functools.cache
+def _field_adapter(model_class: Type[BaseModel], field_name: str) -> TypeAdapter:
+    field = model_class.model_fields[field_name]
+    config = {key: value for key, value in model_class.model_config.items() if key in _FIELD_CONFIG_KEYS}
+    return TypeAdapter(field.annotation, config=ConfigDict(**config))
+
+
+@functools.cache
+def _batch_adapter(item_class: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[item_class])
+
+
+def _located(error: ValidationError, title: str, prefix: Tuple, batch_start: Optional[int] = None) -> ValidationError:
+    """
+    The same errors, located from the top level of the whole model as a ValidationError of it would give.
+
+    The errors of a batch are located by the index in the batch, which is offset by batch_start, the index of the
+    first item of the batch in the whole list.
+    """
+    line_errors = []
+    for detail in error.errors(include_url=False):
+        loc = detail["loc"]
+        if batch_start is not None:
+            loc = (batch_start + loc[0],) + loc[1:] if len(loc) else (batch_start,)
+        line_errors.append({**detail, "loc": prefix + loc})
+    return ValidationError.from_exception_data(title, line_errors)
+
+
+def _open_binary(path_or_stream: Union[str, os.PathLike, IO]) -> Tuple[IO, bool]:
+    """The stream to read, and whether it was opened here and so should be closed"""
+    if isinstance(path_or_stream, (str, os.PathLike)):
+        opener = gzip.open if os.fspath(path_or_stream).endswith(".gz") else open
+        return opener(path_or_stream, "rb"), True
+    return path_or_stream, False
+
+
+def iter_json_fields(
+    path_or_stream: Union[str, os.PathLike, IO],
+    model_class: Type[BaseModel],
+    streamed_fields: Optional[Iterable[str]] = None,
+    batch_size: Optional[int] = None,
+    buffer_size: int = 1 << 20,
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Read the JSON of an instance of model_class and yield (field name, value) for each of its top level fields, in
+    the order of the file.
+
+    The items of each streamed field that is a list are yielded one at a time, as (field name, item), or with a
+    batch_size in lists of at most that many items, so that only one item or batch is held in memory at once. Every
+    other field is yielded whole, validated as a field of model_class, as soon as it has been read. Fields that
+    model_class doesn't have are skipped.
+
+    Args:
+        path_or_stream (str, PathLike or file object): The path of the JSON file, which is decompressed if it ends in
+            .gz, or an open file, preferably in binary mode, which is read but not closed.
+        model_class (Type[BaseModel]): The model the JSON is of, for instance MicrodataSchema.
+        streamed_fields (Optional[Iterable[str]]): The fields whose items are yielded one at a time, by default all
+            those of streamable_fields(model_class).
+        batch_size (Optional[int]): If given, the items are yielded in lists of at most this many.
+        buffer_size (int): The number of bytes read from the file at a time.
+
+    Yields:
+        Tuple[str, Any]: The name of a field and either its validated value, or for a streamed field one of its items
+            or a batch of them. A streamed field that is null is yielded as (field name, None).
+
+    Raises:
+        ValidationError: If a field or an item is invalid, or a required field is missing, with the location of the
+            error in the whole model, as model_class.model_validate_json would give.
+        ValueError: If the file isn't a JSON object, or if it ends early.
+    """
+    if batch_size is not None and batch_size < 1:
+        raise ValueError(f"batch_size should be at least 1, not {batch_size}")
+    if streamed_fields is None:
+        streamed_fields = streamable_fields(model_class)
+    item_classes = {}
+    for field_name in streamed_fields:
+        if field_name not in model_class.model_fields:
+            raise ValueError(f"{model_class.__name__} has no field {field_name!r}")
+        item_classes[field_name] = _list_item_class(model_class.model_fields[field_name].annotation)
+        if item_classes[field_name] is None:
+            raise ValueError(f"{model_class.__name__}.{field_name} is not a list of models")
+    field_names = {field.alias or name: name for name, field in model_class.model_fields.items()}
+    title = model_class.__name__
+
+    stream, opened = _open_binary(path_or_stream)
+    try:
+        reader = _JsonReader(stream, buffer_size)
+        seen = set()
+        reader.expect(b"{")
+        more = reader.peek() != b"}"
+        while more:
+            key = from_json(reader.read_value())
+            if not isinstance(key, str):
+                raise reader.error("Expected a field name")
+            reader.expect(b":")
+            field_name = field_names.get(key)
+            seen.add(field_name)
+            if field_name in item_classes and reader.peek() == b"[":
+                yield from _iter_items(reader, title, field_name, item_classes[field_name], batch_size)
+            elif field_name is not None:
+                raw = reader.read_value()
+                try:
+                    value = _field_adapter(model_class, field_name).validate_json(raw)
+                except ValidationError as e:
+                    raise _located(e, title, (field_name,)) from None
+                yield field_name, value
+            else:
+                reader.read_value()
+            more = reader.peek() == b","
+            if more:
+                reader.expect(b",")
+        reader.expect(b"}")
+        if reader.peek() != b"":
+            raise reader.error("Unexpected data after the JSON object")
+    finally:
+        if opened:
+            stream.close()
+
+    missing = [name for name, field in model_class.model_fields.items() if field.is_required() and name not in seen]
+    if len(missing):
+        raise ValidationError.from_exception_data(
+            title, [{"type": "missing", "loc": (name,), "input": {}} for name in missing]
+        )
+
+
+def _iter_items(
+    reader: _JsonReader, title: str, field_name: str, item_class: Type[BaseModel], batch_size: Optional[int]
+) -> Iterator[Tuple[str, Any]]:
+    reader.expect(b"[")
+    index = 0
+    batch = []
+    more = reader.peek() != b"]"
+    while more:
+        raw = reader.read_value()
+        more = reader.peek() == b","
+        if more:
+            reader.expect(b",")
+        if batch_size is None:
+            try:
+                yield field_name, item_class.model_validate_json(raw)
+            except ValidationError as e:
+                raise _located(e, title, (field_name, index)) from None
+            index += 1
+            continue
+        batch.append(raw)
+        if len(batch) == batch_size or not more:
+            try:
+                items = _batch_adapter(item_class).validate_json(b"[" + b",".join(batch) + b"]")
+            except ValidationError as e:
+                raise _located(e, title, (field_name,), index) from None
+            yield field_name, items
+            index += len(batch)
+            batch = []
+    reader.expect(b"]")
+
+
+def write_json_fields(
+    fields: Iterable[Tuple[str, Any]],
+    stream: IO,
+    model_class: Type[BaseModel],
+    streamed_fields: Optional[Iterable[str]] = None,
+):
+    """
+    Write the JSON of an instance of model_class from (field name, value) pairs, as yielded by iter_json_fields.
+
+    The consecutive items and batches of items of a streamed field are written as one list, so a file can be read,
+    changed and written back one item or batch at a time.
+
+    Args:
+        fields (Iterable[Tuple[str, Any]]): The fields, in the order to write them. The values of a streamed field
+            are single items or lists of them, or None for null.
+        stream (file object): Where to write the JSON, in binary or text mode.
+        model_class (Type[BaseModel]): The model the JSON is of, whose field aliases are written.
+        streamed_fields (Optional[Iterable[str]]): As for iter_json_fields.
+
+    Raises:
+        ValueError: If a field is written twice, or isn't a field of model_class.
+    """
+    if streamed_fields is None:
+        streamed_fields = streamable_fields(model_class)
+    streamed_fields = set(streamed_fields)
+    binary = not isinstance(stream, io.TextIOBase)
+
+    def write(data: bytes):
+        stream.write(data if binary else data.decode())
+
+    written = set()
+    open_list = None  # the streamed field whose list is being written
+    open_list_empty = True
+    write(b"{")
+    for field_name, value in fields:
+        if field_name == open_list and value is not None:
+            for item in value if isinstance(value, list) else [value]:
+                write((b"" if open_list_empty else b",") + to_json(item, by_alias=True))
+                open_list_empty = False
+            continue
+        if open_list is not None:
+            write(b"]")
+            open_list = None
+        if field_name not in model_class.model_fields:
+            raise ValueError(f"{model_class.__name__} has no field {field_name!r}")
+        if field_name in written:
+            raise ValueError(f"The field {field_name!r} was written twice")
+        key = model_class.model_fields[field_name].alias or field_name
+        write((b"," if len(written) else b"") + to_json(key) + b":")
+        written.add(field_name)
+        if field_name in streamed_fields and value is not None:
+            items = value if isinstance(value, list) else [value]
+            write(b"[" + b",".join(to_json(item, by_alias=True) for item in items))
+            open_list = field_name
+            open_list_empty = len(items) == 0
+        else:
+            write(to_json(value, by_alias=True))
+    if open_list is not None:
+        write(b"]")
+    write(b"}")
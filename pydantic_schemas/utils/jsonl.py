@@ -0,0 +1,68 @@
+"""
+Reading JSON Lines files of metadata records, one JSON object per line, as exported from catalogs.
+
+See MetadataManager.iter_validate_jsonl, which validates them.
+"""
+
+import gzip
+import os
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+class JsonlRecordError:
+    """
+    Why a record of a JSON Lines file could not be validated, yielded in its place.
+
+    Attributes:
+        line_number (int): The line of the record, counting from 1.
+        metadata_name (Optional[str]): The metadata type it was validated as, None if that couldn't be determined.
+        message (str): A summary of what is wrong.
+        errors (List[Dict[str, Any]]): For validation errors, those of pydantic without the input, each with the
+            type, loc and msg of one invalid value. Empty otherwise.
+    """
+
+    def __init__(
+        self,
+        line_number: int,
+        metadata_name: Optional[str],
+        message: str,
+        errors: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.line_number = line_number
+        self.metadata_name = metadata_name
+        self.message = message
+        self.errors = errors or []
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The error as a JSON compatible dictionary, for writing out a report"""
+        return {
+            "line_number": self.line_number,
+            "metadata_name": self.metadata_name,
+            "message": self.message,
+            "errors": self.errors,
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, JsonlRecordError) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(line {self.line_number}, {self.metadata_name!r}, {self.message!r})"
+
+
+def iter_jsonl_lines(path_or_stream: Union[str, os.PathLike, IO]) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield the line number, counting from 1, and the bytes of every line of a JSON Lines file that isn't blank.
+
+    Args:
+        path_or_stream (str, PathLike or file object): The path of the file, which is decompressed if it ends in .gz,
+            or an open file, in binary or text mode, which is read but not closed.
+    """
+    if isinstance(path_or_stream, (str, os.PathLike)):
+        opener = gzip.open if os.fspath(path_or_stream).endswith(".gz") else open
+        with opener(path_or_stream, "rb") as file:
+            yield from iter_jsonl_lines(file)
+        return
+    for line_number, line in enumerate(path_or_stream, start=1):
+        data = line.encode() if isinstance(line, str) else line
+        if data.strip():
+            yield line_number, data
@@ -0,0 +1,190 @@
+"""
+Find which phases of reading and writing Excel files use the most memory.
+
+MemoryProfiler is a tracer, see tracing.py, that takes a tracemalloc snapshot at the start and end of each phase of the
+pipeline: loading the workbook, building DataFrames, instantiating models, building the skeleton, merging,
+validating, writing sheets and saving. For each phase it reports the peak memory, how far memory rose above where it
+was when the phase started, the memory still held when it finished and the lines of code that allocated the most.
+
+    >>> from pydantic_schemas.utils.memory_profiling import MemoryProfiler
+    >>> profiler = MemoryProfiler()
+    >>> metadata = mm.read_metadata_from_excel("microdata.xlsx", memory_profiler=profiler)
+    >>> print(profiler.format_result())
+
+Phases are inclusive, so memory allocated while writing a sheet also counts towards the DataFrames built for it.
+Profiling is slow, since every allocation is traced and each snapshot copies the list of live allocations, so it is
+meant for investigating a problem rather than leaving on. To limit the cost, allocation sites are only found for the
+first few calls of phases that run many times, such as building the DataFrame of each nested object.
+"""
+
+import os
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .tracing import Tracer, set_tracer
+
+# the phase that each traced span belongs to
+PHASES = {
+    "excel.open_workbook": "workbook load",
+    "excel.read_sheet": "workbook load",
+    "metadata_manager.read_payload": "workbook load",
+    "excel.pydantic_to_dataframe": "dataframe build",
+    "excel.instantiate_model": "model instantiation",
+    "quick_start.make_skeleton": "skeleton",
+    "metadata_manager.merge": "merge",
+    "metadata_manager.validate": "validation",
+    "excel.write_sheet": "sheet write",
+    "excel.save_workbook": "save",
+}
+
+# allocations made by the profiler itself
+_IGNORED_FILES = {tracemalloc.__file__, __file__, os.path.join(os.path.dirname(__file__), "tracing.py")}
+
+
+class MemoryProfiler(Tracer):
+    """
+    A tracer that records the memory used in each phase of the Excel pipeline.
+
+    Args:
+        top_n (int): How many allocation sites to report for each phase.
+        max_snapshots_per_phase (Optional[int]): Allocation sites are only found for this many calls of each phase,
+            as each snapshot takes time in proportion to the number of live allocations. The peaks are measured for
+            every call. None to find the allocation sites of every call.
+        phases (Optional[Dict[str, str]]): The phase of each span name, by default PHASES. Spans not listed are
+            passed on to the tracer that was in use before profiling started, but are not profiled.
+    """
+
+    enabled = True
+
+    def __init__(
+        self, top_n: int = 10, max_snapshots_per_phase: Optional[int] = 5, phases: Optional[Dict[str, str]] = None
+    ):
+        self.top_n = top_n
+        self.max_snapshots_per_phase = max_snapshots_per_phase
+        self.phases = PHASES if phases is None else phases
+        self.peak_bytes = 0
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._sites: Dict[str, Dict[str, List[int]]] = {}
+        self._open: Dict[str, Dict[str, Any]] = {}
+        # memory held by the snapshots of open phases, which is not counted against the phases
+        self._overhead = 0
+        self._inner: Tracer = Tracer()
+
+    @contextmanager
+    def profile(self) -> Iterator["MemoryProfiler"]:
+        """Trace allocations and profile every phase run within the block"""
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        self._inner = set_tracer(self)
+        try:
+            yield self
+        finally:
+            self._update_peaks()
+            set_tracer(self._inner)
+            self._inner = Tracer()
+            self._open = {}
+            self._overhead = 0
+            if started_tracing:
+                tracemalloc.stop()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any):
+        phase = self.phases.get(name)
+        # a phase nested in itself, such as recursive model instantiation, is measured once from the outermost call
+        outermost = phase is not None and phase not in self._open and tracemalloc.is_tracing()
+        with self._inner.span(name, **attributes) as inner_span:
+            if outermost:
+                self._start(phase)
+            try:
+                yield inner_span
+            finally:
+                if outermost:
+                    self._finish(phase)
+
+    def _update_peaks(self) -> int:
+        """Update the peak of every open phase and return the memory currently in use, less the overhead"""
+        current, peak = tracemalloc.get_traced_memory()
+        peak -= self._overhead
+        for state in self._open.values():
+            state["peak"] = max(state["peak"], peak)
+        self.peak_bytes = max(self.peak_bytes, peak)
+        tracemalloc.reset_peak()
+        return current - self._overhead
+
+    def _start(self, phase: str):
+        start = self._update_peaks()
+        snapshot, held = None, 0
+        calls = self._results.get(phase, {}).get("calls", 0)
+        if self.max_snapshots_per_phase is None or calls < self.max_snapshots_per_phase:
+            snapshot = tracemalloc.take_snapshot()
+            held = tracemalloc.get_traced_memory()[0] - self._overhead - start
+            self._overhead += held
+            tracemalloc.reset_peak()
+        self._open[phase] = {"start": start, "peak": start, "snapshot": snapshot, "held": held}
+
+    def _finish(self, phase: str):
+        end = self._update_peaks()
+        state = self._open.pop(phase)
+        differences = []
+        if state["snapshot"] is not None:
+            differences = tracemalloc.take_snapshot().compare_to(state["snapshot"], "lineno")
+            del state["snapshot"]
+            self._overhead -= state["held"]
+
+        result = self._results.setdefault(
+            phase, {"calls": 0, "peak_bytes": 0, "peak_increase_bytes": 0, "net_bytes": 0}
+        )
+        result["calls"] += 1
+        result["peak_bytes"] = max(result["peak_bytes"], state["peak"])
+        result["peak_increase_bytes"] = max(result["peak_increase_bytes"], state["peak"] - state["start"])
+        result["net_bytes"] += end - state["start"]
+        sites = self._sites.setdefault(phase, {})
+        for difference in differences:
+            frame = difference.traceback[0]
+            if difference.size_diff <= 0 or frame.filename in _IGNORED_FILES:
+                continue
+            site = sites.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+            site[0] += difference.size_diff
+            site[1] += difference.count_diff
+        tracemalloc.reset_peak()
+
+    @property
+    def result(self) -> Dict[str, Any]:
+        """
+        The memory used by each phase profiled so far.
+
+        Returns:
+            Dict[str, Any]: The overall 'peak_bytes' and, under 'phases', for each phase in the order it first
+                finished: the number of 'calls', the 'peak_bytes' in use during it, the largest 'peak_increase_bytes'
+                above the memory in use when it started, the 'net_bytes' still held when it finished, summed over
+                calls, and the 'top_allocations', the sites that allocated the most memory still held at the end of
+                the phase, as dictionaries of 'site', 'size_bytes' and 'count'.
+        """
+        phases = {}
+        for phase, result in self._results.items():
+            sites = sorted(self._sites.get(phase, {}).items(), key=lambda item: item[1][0], reverse=True)
+            phases[phase] = {
+                **result,
+                "top_allocations": [
+                    {"site": site, "size_bytes": size, "count": count} for site, (size, count) in sites[: self.top_n]
+                ],
+            }
+        return {"peak_bytes": self.peak_bytes, "phases": phases}
+
+    def format_result(self, top_n: int = 3) -> str:
+        """The result as text, with the top_n allocation sites of each phase, for printing"""
+        result = self.result
+        lines = [f"peak {result['peak_bytes'] / 1e6:.1f}MB"]
+        lines.append(f"{'phase':<22}{'calls':>6}{'peak':>11}{'increase':>11}{'net':>11}")
+        for phase, phase_result in result["phases"].items():
+            lines.append(
+                f"{phase:<22}{phase_result['calls']:>6}"
+                f"{phase_result['peak_bytes'] / 1e6:>9.1f}MB"
+                f"{phase_result['peak_increase_bytes'] / 1e6:>9.1f}MB"
+                f"{phase_result['net_bytes'] / 1e6:>9.1f}MB"
+            )
+            for site in phase_result["top_allocations"][:top_n]:
+                lines.append(f"    {site['size_bytes'] / 1e3:>9.1f}kB  {site['site']}")
+        return "\n".join(lines)
@@ -0,0 +1,62 @@
+"""
+Apply a function to a stream of work in a pool of processes, in order and with bounded memory.
+
+    >>> for result in imap_ordered(validate_chunk, chunks(records, 1000), processes=8):
+    ...     handle(result)
+
+Unlike Executor.map, which submits every item before yielding the first result, at most max_pending items are
+submitted and not yet yielded at any time, so a stream of any length can be processed with memory proportional to
+max_pending, while the workers are kept busy.
+"""
+
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def chunks(items: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    """Split items into lists of chunk_size, the last of which may be shorter"""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size should be at least 1, not {chunk_size}")
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def imap_ordered(
+    func: Callable[[T], R], items: Iterable[T], processes: int, max_pending: Optional[int] = None
+) -> Iterator[R]:
+    """
+    Yield func(item) for each item, in the order of items, computing them in a pool of processes.
+
+    Args:
+        func (Callable): A function the workers can import, that is one defined at the top level of a module, or a
+            functools.partial of one.
+        items (Iterable): The arguments, read only as fast as the workers need them.
+        processes (int): The number of worker processes.
+        max_pending (Optional[int]): The most items submitted to the pool but not yet yielded, by default twice the
+            number of processes.
+
+    Raises:
+        Whatever func raises, when its result would have been yielded.
+    """
+    max_pending = max_pending or 2 * processes
+    executor = ProcessPoolExecutor(max_workers=processes)
+    try:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while len(pending):
+            yield pending.popleft().result()
+    finally:
+        # if the caller stops early the work still queued is dropped rather than waited for
+        executor.shutdown(cancel_futures=True)
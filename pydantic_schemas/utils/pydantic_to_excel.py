@@ -1,9 +1,10 @@
 import copy
 import json
+import logging
 import os
 import warnings
 from enum import Enum
-from typing import List, Optional, Tuple, Union, get_args
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, get_args
 
 import pandas as pd
 from openpyxl import Workbook, load_workbook
@@ -14,19 +15,25 @@ from openpyxl.worksheet.protection import SheetProtection
 from openpyxl.worksheet.worksheet import Worksheet
 from pydantic import AnyUrl, BaseModel
 
+from .debug_logging import summarize
+from .embedded_payload import write_payload
 from .schema_base_model import SchemaBaseModel
+from .tracing import get_tracer, traced
 from .utils import (
     annotation_contains_dict,
     annotation_contains_list,
     assert_dict_annotation_is_strings_or_any,
+    get_pydantic_subtype,
     get_subtype_of_optional_or_list,
     is_list_annotation,
     is_optional_annotation,
     is_union_annotation,
     seperate_simple_from_pydantic,
-    subset_pydantic_model,
+    subset_pydantic_model_type,
 )
 
+logger = logging.getLogger(__name__)
+
 MAXCOL = 30
 
 
@@ -64,6 +71,7 @@ def protect_and_shade_col(sheet, col: int, rowmin: int, rowmax: int):
         protect_and_shade_given_cell(sheet, row, col)
 
 
+@traced("excel.shade_locked_cells")
 def shade_locked_cells(worksheet: Worksheet):
     """
     Shades every cell grey if it is locked and leaves it unshaded if it is not locked.
@@ -84,6 +92,7 @@ def shade_locked_cells(worksheet: Worksheet):
                 cell.fill = PatternFill()  # Remove any fill (reset to default)
 
 
+@traced("excel.correct_column_widths")
 def correct_column_widths(worksheet: Worksheet):
     """
     Adjusts the column widths of an Excel sheet based on the maximum length of the content in each column.
@@ -111,6 +120,7 @@ def correct_column_widths(worksheet: Worksheet):
             worksheet.column_dimensions[column].width = adjusted_width
 
 
+@traced("excel.protect_sheet")
 def shade_80_rows_and_protect_sheet(worksheet: Worksheet, startrow: int):
     """For use after all data is written so there is a clear border around the data"""
     for r in range(startrow, startrow + 80):
@@ -183,19 +193,22 @@ def pydantic_to_dataframe(
     The list of indexs is intended to be used for appropriately shading the excel sheet.
     """
     if isinstance(ob, list):
-        ob_dict = [elem.model_dump() for elem in ob]
-        annotations = {k: v.annotation for k, v in ob[0].model_fields.items()}
-        model_fields = ob[0].model_fields
-        is_list_of_objects = True
-    else:
-        ob_dict = ob.model_dump()
-        annotations = {k: v.annotation for k, v in ob.model_fields.items()}
-        model_fields = ob.model_fields
-        is_list_of_objects = False
+        return dump_to_dataframe(type(ob[0]), [elem.model_dump() for elem in ob])
+    return dump_to_dataframe(type(ob), ob.model_dump())
+
+
+@traced("excel.pydantic_to_dataframe")
+def dump_to_dataframe(
+    model_type: Type[BaseModel], ob_dict: Union[Dict[str, Any], List[Dict[str, Any]]]
+) -> Tuple[pd.DataFrame, List[int]]:
+    """
+    As pydantic_to_dataframe, but from the model_dump of a model of model_type, or a list of the dumps of several.
+    """
+    model_fields = model_type.model_fields
+    annotations = {k: v.annotation for k, v in model_fields.items()}
+    is_list_of_objects = isinstance(ob_dict, list)
     df = pd.json_normalize(ob_dict).T
-    if debug:
-        print("pydantic_to_dataframe")
-        print(df)
+    logger.debug("normalized %s into %s", model_type.__name__, summarize(df))
 
     i = 0
     list_indices = []
@@ -204,34 +217,24 @@ def pydantic_to_dataframe(
     for idx in df.index:
         if idx.split(".")[0] in observed_dicts:
             continue
-        if debug:
-            print(f"pydantic_to_dataframe::202 idx = {idx}, df = {df}")
         vals = df.loc[idx]  # [0]
         number_of_lists, anno = count_lists(model_fields, idx)
         number_of_lists = number_of_lists + int(is_list_of_objects)
-        if debug:
-            print(f"vals: {vals}")
-            print(f'idx.split(".")[0]: {idx.split(".")[0]}')
-            print(f'annotations[idx.split(".")[0]]: {annotations[idx.split(".")[0]]}')
-            print(f"number of lists = {number_of_lists}")
-            print(f"anno = {anno}")
+        logger.debug(
+            "idx = %s, vals = %s, number of lists = %s, anno = %s", idx, summarize(vals), number_of_lists, anno
+        )
 
         if annotation_contains_dict(anno):
-            if debug:
-                print(f"annotation contains dict, {ob_dict[idx.split('.')[0]]}")
             fieldname = idx.split(".")[0]
             subdf = df[df.index.str.startswith(f"{fieldname}.")]
             field = {"".join(i.split(".")[1:]): v[0] for i, v in zip(subdf.index, subdf.values)}
-            if debug:
-                print(f"field: {field}")
+            logger.debug("annotation contains dict, field: %s", summarize(field))
             if is_union_annotation(anno) and (len(subdf) == 0 or (field is not None and not isinstance(field, dict))):
                 args = [a for a in get_args(anno) if a is not type(None)]
                 anno = [a for a in args if not annotation_contains_dict(a)][0]
-                if debug:
-                    print(f"falling back to {anno}")
+                logger.debug("falling back to %s", anno)
             else:
-                if debug:
-                    print("Found a dictionary")
+                logger.debug("Found a dictionary")
                 if is_list_of_objects:
                     continue
                 assert_dict_annotation_is_strings_or_any(anno)
@@ -240,8 +243,7 @@ def pydantic_to_dataframe(
                     dict_df = pd.DataFrame(["", ""], index=["key", "value"])
                 else:
                     dict_df = pd.DataFrame([field.keys(), field.values()], index=["key", "value"])
-                if debug:
-                    print(f"created a dict_df:\n{dict_df}")
+                logger.debug("created a dict_df: %s", summarize(dict_df))
                 dict_df.index = dict_df.index.map(lambda x, fieldname=fieldname: f"{fieldname}.{x}")
                 df = df[~df.index.str.startswith(f"{fieldname}.")]
                 df = df[df.index != fieldname]
@@ -254,43 +256,24 @@ def pydantic_to_dataframe(
         if number_of_lists >= 1:  #: or annotation_contains_dict(annotations[idx.split(".")[0]]):
             # if number_of_lists > 0:
             subtype = anno
-            if debug:
-                print("subtype = ", subtype)
-                print("isinstance(subtype, BaseModel)", isinstance(subtype, type(BaseModel)))
-                print("isinstance(subtype, dict)", annotation_contains_dict(subtype))  # isinstance(subtype, dict))
+            logger.debug("subtype = %s", subtype)
             if number_of_lists >= 2 or is_list_of_objects:  # is_list_of_objects:
-                if debug:
-                    print("list of lists")
+                logger.debug("list of lists")
                 list_indices.append(i)
                 i += 1
 
             elif isinstance(subtype, type(BaseModel)):  # isinstance(subtype, type(dict))
-                if debug:
-                    print("list of base models", vals, vals[0])
-                    print("experiment:", vals[0])
-                    print("experiment:", pd.DataFrame(vals[0]).T)
+                logger.debug("list of base models %s", summarize(vals[0]))
                 if vals[0] is None or isinstance(vals[0], list) and len(vals[0]) == 0:
                     vals[0] = [None]
                 sub = pd.json_normalize(vals[0]).T
-                if debug:
-                    print(sub)
                 sub.index = sub.index.map(lambda x, idx=idx: f"{idx}." + x)
-                if debug:
-                    print(sub)
+                logger.debug("replacing %s with %s", idx, summarize(sub))
                 df = replace_row_with_multiple_rows(df, sub, idx)
-                if debug:
-                    print(df)
-                if debug:
-                    print(list_indices)
                 list_indices += list(range(i, i + len(sub)))
-                if debug:
-                    print(list_indices)
                 i += len(sub)
-                if debug:
-                    print("done with basemodel subtype")
             else:
-                if debug:
-                    print("list of builtins or else empty")
+                logger.debug("list of builtins or else empty")
                 if vals[0] is None or isinstance(vals[0], list) and len(vals[0]) == 0:
                     vals[0] = [None]
                 sub = pd.DataFrame(vals[0]).T
@@ -299,8 +282,6 @@ def pydantic_to_dataframe(
                 else:
                     sub.index = sub.index.map(lambda x, idx=idx: f"{idx}." + x)
                 df = replace_row_with_multiple_rows(df, sub, idx)
-                if debug:
-                    print("new df:", df)
                 list_indices.append(i)
                 i += 1
         else:
@@ -315,8 +296,7 @@ def pydantic_to_dataframe(
                 )
                 enums[i] = dropdown
             i += 1
-    if debug:
-        print(df)
+    logger.debug("dataframe %s with list rows %s", summarize(df), summarize(list_indices))
     if len(df):
         df.index = df.index.str.split(".", expand=True)
     if is_list_of_objects:
@@ -343,18 +323,27 @@ def stringify_cell_element(elem):
 
 
 def write_pydantic_to_excel(ws, ob, row_number, debug=False):
-    df, list_rows, enums = pydantic_to_dataframe(ob, debug=debug)
+    if isinstance(ob, list):
+        return write_dump_to_excel(ws, type(ob[0]), [elem.model_dump() for elem in ob], row_number)
+    return write_dump_to_excel(ws, type(ob), ob.model_dump(), row_number)
+
+
+@traced("excel.write_rows")
+def write_dump_to_excel(
+    ws: Worksheet,
+    model_type: Type[BaseModel],
+    ob_dict: Union[Dict[str, Any], List[Dict[str, Any]]],
+    row_number: int,
+):
+    df, list_rows, enums = dump_to_dataframe(model_type, ob_dict)
     list_rows_tracker = {}
     list_of_enums_tracker = {}
     for i, r in enumerate(dataframe_to_rows(df, index=True, header=False)):
-        if debug:
-            print(r)
         if all(x is None for x in r):
             continue
         string_r = [stringify_cell_element(val) for val in r]
         string_r = [""] + string_r
-        if debug:
-            print("about to append", string_r)
+        logger.debug("appending row %s: %s", row_number, summarize(string_r))
         ws.append(string_r)
         for col in range(2, df.index.nlevels + 2):
             cell = ws.cell(row=row_number, column=col)
@@ -366,8 +355,6 @@ def write_pydantic_to_excel(ws, ob, row_number, debug=False):
                 bottom=Side(border_style=None),
             )
             if cell.value is not None and cell.value != "":
-                if debug:
-                    print("turning on some borders")
                 border_copy = copy.copy(cell.border)
                 border_copy.top = Side(border_style="thin")
                 cell.border = border_copy
@@ -420,17 +407,39 @@ def write_title_and_version_info(
 
 
 def write_pydantic_to_sheet(worksheet: Worksheet, ob: BaseModel, current_row: int, debug: bool = False) -> int:
-    children = seperate_simple_from_pydantic(ob)
-    if debug:
-        print("Children:")
-        print(children)
+    return write_dump_to_sheet(worksheet, type(ob), ob.model_dump(), current_row)
+
+
+def _subset_dump(
+    model_type: Type[BaseModel], ob_dict: Dict[str, Any], feature_names: List[str], name: Optional[str] = None
+) -> Tuple[Type[BaseModel], Dict[str, Any]]:
+    """
+    The model type and dump of subset_pydantic_model(ob, feature_names, name), taken from the dump of ob.
+
+    Since the dump is of a model that has already been validated, the subset is not validated again.
+    """
+    return subset_pydantic_model_type(model_type, feature_names, name=name), {k: ob_dict[k] for k in feature_names}
+
+
+def write_dump_to_sheet(
+    worksheet: Worksheet, model_type: Type[BaseModel], ob_dict: Dict[str, Any], current_row: int
+) -> int:
+    """
+    Write the model_dump of a model of model_type to the worksheet, starting at current_row.
+
+    Simple fields are written first, then each field holding a model or list of models under a heading of its own.
+
+    Returns:
+        int: The row after the last one written.
+    """
+    children = seperate_simple_from_pydantic(model_type)
+    logger.debug("writing %s with children %s", model_type.__name__, children)
     list_rows = {}
     enum_list_rows = {}
 
     if len(children["simple"]):
-        child_object = subset_pydantic_model(ob, children["simple"])
-        current_row, sub_list_rows, sub_list_enums = write_pydantic_to_excel(
-            ws=worksheet, ob=child_object, row_number=current_row
+        current_row, sub_list_rows, sub_list_enums = write_dump_to_excel(
+            worksheet, *_subset_dump(model_type, ob_dict, children["simple"]), row_number=current_row
         )
         list_rows.update(sub_list_rows)
         enum_list_rows.update(sub_list_enums)
@@ -439,9 +448,9 @@ def write_pydantic_to_sheet(worksheet: Worksheet, ob: BaseModel, current_row: in
         worksheet.append([mfield])
         worksheet.cell(row=current_row, column=1).font = Font(bold=True, size=12)
         current_row += 1
-        child_object = getattr(ob, mfield)
-        current_row, sub_list_rows, sub_list_enums = write_pydantic_to_excel(
-            ws=worksheet, ob=child_object, row_number=current_row, debug=debug
+        child_type = get_pydantic_subtype(model_type.model_fields[mfield].annotation)
+        current_row, sub_list_rows, sub_list_enums = write_dump_to_excel(
+            worksheet, child_type, ob_dict[mfield], row_number=current_row
         )
         list_rows.update(sub_list_rows)
         enum_list_rows.update(sub_list_enums)
@@ -455,6 +464,7 @@ def write_pydantic_to_sheet(worksheet: Worksheet, ob: BaseModel, current_row: in
     return current_row
 
 
+@traced("excel.open_workbook")
 def open_or_create_workbook(doc_filepath):
     if os.path.exists(doc_filepath):
         workbook = load_workbook(doc_filepath)
@@ -483,19 +493,51 @@ def create_sheet(workbook, sheetname, sheet_number):
     return new_sheet
 
 
-def write_to_single_sheet(doc_filepath: str, ob: BaseModel, title: Optional[str] = None, verbose=False):
-    model_default_name = ob.model_json_schema()["title"]
+def _record_sheet_size(span, worksheet: Worksheet):
+    span.add("rows", worksheet.max_row)
+    span.add("cells", worksheet.max_row * worksheet.max_column)
+
+
+def _save_workbook(workbook: Workbook, doc_filepath: str):
+    with get_tracer().span("excel.save_workbook"):
+        workbook.save(doc_filepath)
+
+
+@traced("excel.write_to_single_sheet")
+def write_to_single_sheet(
+    doc_filepath: str,
+    ob: Union[BaseModel, Type[BaseModel]],
+    title: Optional[str] = None,
+    verbose=False,
+    ob_dict: Optional[Dict[str, Any]] = None,
+    embed_payload: bool = False,
+):
+    """
+    Write ob to a sheet called 'metadata' in the Excel file at doc_filepath, creating the file if needed.
+
+    If ob_dict, the model_dump of ob, has already been made it can be given instead, in which case ob need only be
+    the model type. If embed_payload, a copy of the metadata is embedded in a hidden sheet, see embedded_payload.py.
+    """
+    if ob_dict is None:
+        ob_dict = ob.model_dump()
+    model_type = ob if isinstance(ob, type) else type(ob)
+    model_default_name = model_type.model_json_schema()["title"]
     if title is None:
         title = model_default_name
     wb = open_or_create_workbook(doc_filepath)
-    ws = create_sheet(wb, "metadata", sheet_number=0)
-    version = create_version(ob)
-    current_row = write_title_and_version_info(ws, title, version, protect_title=False)
-    current_row = write_pydantic_to_sheet(ws, ob, current_row, debug=verbose)
-    correct_column_widths(worksheet=ws)
-    shade_80_rows_and_protect_sheet(worksheet=ws, startrow=current_row)
-    shade_locked_cells(worksheet=ws)
-    wb.save(doc_filepath)
+    with get_tracer().span("excel.write_sheet", sheet="metadata") as span:
+        ws = create_sheet(wb, "metadata", sheet_number=0)
+        version = create_version(ob)
+        current_row = write_title_and_version_info(ws, title, version, protect_title=False)
+        current_row = write_dump_to_sheet(ws, model_type, ob_dict, current_row)
+        correct_column_widths(worksheet=ws)
+        shade_80_rows_and_protect_sheet(worksheet=ws, startrow=current_row)
+        shade_locked_cells(worksheet=ws)
+        _record_sheet_size(span, ws)
+    if embed_payload:
+        with get_tracer().span("excel.embed_payload"):
+            write_payload(wb, version, ob_dict, {"metadata": list(model_type.model_fields)})
+    _save_workbook(wb, doc_filepath)
 
 
 def create_version(ob: SchemaBaseModel):
@@ -586,42 +628,66 @@ def parse_version(version: str):
     return version_dict
 
 
-def write_across_many_sheets(doc_filepath: str, ob: SchemaBaseModel, title: Optional[str] = None, verbose=False):
-    wb = open_or_create_workbook(doc_filepath)
-    ws = create_sheet(wb, "metadata", sheet_number=0)
-    version = create_version(ob)
-    current_row = write_title_and_version_info(ws, title, version, protect_title=False)
+@traced("excel.write_across_many_sheets")
+def write_across_many_sheets(
+    doc_filepath: str,
+    ob: Union[SchemaBaseModel, Type[SchemaBaseModel]],
+    title: Optional[str] = None,
+    verbose=False,
+    ob_dict: Optional[Dict[str, Any]] = None,
+    embed_payload: bool = False,
+):
+    """
+    Write the simple fields of ob to a sheet called 'metadata' and each field holding models to a sheet of its own, in
+    the Excel file at doc_filepath, creating the file if needed.
 
-    children = seperate_simple_from_pydantic(ob)
-    if verbose:
-        print(f"children: {children}")
+    If ob_dict, the model_dump of ob, has already been made it can be given instead, in which case ob need only be
+    the model type. If embed_payload, a copy of the metadata is embedded in a hidden sheet, see embedded_payload.py.
+    """
+    if ob_dict is None:
+        ob_dict = ob.model_dump()
+    model_type = ob if isinstance(ob, type) else type(ob)
+    tracer = get_tracer()
+    wb = open_or_create_workbook(doc_filepath)
+    children = seperate_simple_from_pydantic(model_type)
+    logger.debug("writing %s across sheets with children %s", model_type.__name__, children)
     sheet_number = 0
 
-    if len(children["simple"]):
-        child_object = subset_pydantic_model(ob, children["simple"])
-
-        current_row = write_pydantic_to_sheet(ws, child_object, current_row, debug=verbose)
-    correct_column_widths(worksheet=ws)
-    shade_80_rows_and_protect_sheet(worksheet=ws, startrow=current_row)
-    shade_locked_cells(worksheet=ws)
-    sheet_number += 1
+    with tracer.span("excel.write_sheet", sheet="metadata") as span:
+        ws = create_sheet(wb, "metadata", sheet_number=0)
+        version = create_version(ob)
+        current_row = write_title_and_version_info(ws, title, version, protect_title=False)
 
-    for fieldname in children["pydantic"]:
-        if verbose:
-            print(f"\n\n{fieldname}\n")
-        child_object = getattr(ob, fieldname)
-        if verbose:
-            print(child_object)
-        ws = create_sheet(wb, fieldname, sheet_number=sheet_number)
-        if not isinstance(child_object, BaseModel):
-            child_object = subset_pydantic_model(ob, [fieldname], name=fieldname)
-            sheet_title = None
-        else:
-            sheet_title = fieldname
-        current_row = write_title_and_version_info(ws, sheet_title, None, protect_title=True)
-        current_row = write_pydantic_to_sheet(ws, child_object, current_row, debug=verbose)
+        if len(children["simple"]):
+            current_row = write_dump_to_sheet(ws, *_subset_dump(model_type, ob_dict, children["simple"]), current_row)
         correct_column_widths(worksheet=ws)
         shade_80_rows_and_protect_sheet(worksheet=ws, startrow=current_row)
         shade_locked_cells(worksheet=ws)
+        _record_sheet_size(span, ws)
+    sheet_number += 1
+
+    for fieldname in children["pydantic"]:
+        child_dict = ob_dict[fieldname]
+        logger.debug("writing sheet %s: %s", fieldname, summarize(child_dict))
+        with tracer.span("excel.write_sheet", sheet=fieldname) as span:
+            ws = create_sheet(wb, fieldname, sheet_number=sheet_number)
+            annotation = model_type.model_fields[fieldname].annotation
+            if isinstance(child_dict, dict) and not annotation_contains_dict(annotation):
+                child_type = get_pydantic_subtype(annotation)
+                sheet_title = fieldname
+            else:
+                child_type, child_dict = _subset_dump(model_type, ob_dict, [fieldname], name=fieldname)
+                sheet_title = None
+            current_row = write_title_and_version_info(ws, sheet_title, None, protect_title=True)
+            current_row = write_dump_to_sheet(ws, child_type, child_dict, current_row)
+            correct_column_widths(worksheet=ws)
+            shade_80_rows_and_protect_sheet(worksheet=ws, startrow=current_row)
+            shade_locked_cells(worksheet=ws)
+            _record_sheet_size(span, ws)
         sheet_number += 1
-    wb.save(doc_filepath)
+    if embed_payload:
+        sheet_fields = {"metadata": children["simple"]}
+        sheet_fields.update({fieldname: [fieldname] for fieldname in children["pydantic"]})
+        with tracer.span("excel.embed_payload"):
+            write_payload(wb, version, ob_dict, sheet_fields)
+    _save_workbook(wb, doc_filepath)
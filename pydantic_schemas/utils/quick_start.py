@@ -1,12 +1,17 @@
 import inspect
+import logging
 import typing
 from enum import Enum
 from typing import Any, Callable, List, Type
 
 from pydantic import AnyUrl, BaseModel
 
+from .debug_logging import summarize
+from .tracing import get_tracer
 from .utils import standardize_keys_in_dict
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_URL = "https://www.example.com"
 MAX_DEPTH = 12
 
@@ -44,11 +49,9 @@ def _is_pydantic_annotated_string(p, debug=False, recursion_level=0):
     if typing.get_origin(p) is typing.Annotated:
         args = typing.get_args(p)
         if args[0] is str:
-            if debug:
-                print("  " * recursion_level, "Is Annotated String")
+            logger.debug("%sIs Annotated String", "  " * recursion_level)
             return True
-        if debug:
-            print("  " * recursion_level, f"Is Annotated but not a string {p}")
+        logger.debug("%sIs Annotated but not a string %s", "  " * recursion_level, p)
     return False
 
 
@@ -56,11 +59,9 @@ def _is_pydantic_annotated_float(p, debug=False, recursion_level=0):
     if typing.get_origin(p) is typing.Annotated:
         args = typing.get_args(p)
         if args[0] is float:
-            if debug:
-                print("  " * recursion_level, "Is Annotated float")
+            logger.debug("%sIs Annotated float", "  " * recursion_level)
             return True
-        if debug:
-            print("  " * recursion_level, f"Is Annotated but not a float {p}")
+        logger.debug("%sIs Annotated but not a float %s", "  " * recursion_level, p)
     return False
 
 
@@ -68,26 +69,22 @@ def _create_default_class_from_annotation(
     p: Any, is_optional: bool = False, debug: bool = False, recursion_level: int = 0
 ):
     if p is str:
-        if debug:
-            print("  " * recursion_level, "STR")
+        logger.debug("%sSTR", "  " * recursion_level)
         if is_optional:
             return None
         return ""
     if p is float:
-        if debug:
-            print("  " * recursion_level, "STR")
+        logger.debug("%sFLOAT", "  " * recursion_level)
         if is_optional:
             return None
         raise ValueError("Cannot create default float as it's not optional")
     if _is_enum_type(p):
-        if debug:
-            print("  " * recursion_level, "ENUM")
+        logger.debug("%sENUM", "  " * recursion_level)
         if is_optional:
             return None
         return list(p)[0].value  # get first value of the enum
     if _is_pydantic_subclass(p) and recursion_level < MAX_DEPTH:
-        if debug:
-            print("  " * recursion_level, "pydantic CLASS")
+        logger.debug("%spydantic CLASS", "  " * recursion_level)
         return make_skeleton(p, debug=debug, recursion_level=recursion_level + 1)
     if _is_pydantic_subclass(p) and is_optional:
         return None
@@ -105,14 +102,15 @@ def _create_default_from_list_of_args(args: List[Any], is_optional=True, debug=F
     args = _filter_list_for_condition(args, lambda a: a is not type(None))
     typed_args = _filter_list_for_condition(args, _is_typing_annotation)  # _filter_list_for_typing_args(args)
     pydantic_args = _filter_list_for_condition(args, _is_pydantic_subclass)  #  _filter_for_pydantic_args(args)
-    if debug:
-        print(
-            "  " * recursion_level,
-            f"LIST OF ARGS: {args}, LIST OF TYPED ARGS: {typed_args}, LIST_OF_PYDANTIC_ARGS: {pydantic_args}",
-        )
+    logger.debug(
+        "%sLIST OF ARGS: %s, LIST OF TYPED ARGS: %s, LIST_OF_PYDANTIC_ARGS: %s",
+        "  " * recursion_level,
+        args,
+        typed_args,
+        pydantic_args,
+    )
     if len(typed_args):
-        if debug:
-            print("  " * recursion_level, "moving to _create_default_from_typing_annotation")
+        logger.debug("%smoving to _create_default_from_typing_annotation", "  " * recursion_level)
         # because dicts are more complicated than lists, we should default to dicts
         typed_dicts = _filter_list_for_condition(typed_args, lambda p: getattr(p, "__origin__", None) is dict)
         typed_lists = _filter_list_for_condition(typed_args, lambda p: getattr(p, "__origin__", None) is list)
@@ -128,8 +126,7 @@ def _create_default_from_list_of_args(args: List[Any], is_optional=True, debug=F
     if len(pydantic_args):
         return make_skeleton(pydantic_args[0], debug=debug, recursion_level=recursion_level + 1)
     if len(_filter_list_for_condition(args, lambda a: _is_builtin_type(a) or _is_enum_type(a))):
-        if debug:
-            print("  " * recursion_level, "all builtins or enums")
+        logger.debug("%sall builtins or enums", "  " * recursion_level)
         if is_optional:
             return None
         if len(_filter_list_for_condition(args, lambda a: a is str)):
@@ -151,8 +148,7 @@ def _create_default_from_list_of_args(args: List[Any], is_optional=True, debug=F
 
 
 def _create_default_from_typing_annotation(p: Any, is_optional: bool = False, debug: bool = False, recursion_level=0):
-    if debug:
-        print("  " * recursion_level, "_create_default_from_typing_annotation")
+    logger.debug("%s_create_default_from_typing_annotation", "  " * recursion_level)
     if p is typing.Any:
         return ""
     args = typing.get_args(p)
@@ -160,28 +156,24 @@ def _create_default_from_typing_annotation(p: Any, is_optional: bool = False, de
         raise ValueError(p)
     isOptional = type(None) in args
     if isOptional:
-        if debug:
-            print("  " * recursion_level, "isOPTIONAL")
+        logger.debug("%sisOPTIONAL", "  " * recursion_level)
         if recursion_level >= MAX_DEPTH:
             return None
         return _create_default_from_list_of_args(args, is_optional=True, debug=debug, recursion_level=recursion_level)
     if getattr(p, "__origin__", None) is list:
-        if debug:
-            print("  " * recursion_level, "isLIST")
+        logger.debug("%sisLIST", "  " * recursion_level)
         if _is_pydantic_subclass(args[0]):
             return [make_skeleton(args[0], debug=debug, recursion_level=recursion_level + 1)]
         if is_optional:
             return []
         return [_create_default(args[0], is_optional=False, debug=debug, recursion_level=recursion_level + 1)]
     if getattr(p, "__origin__", None) is dict:
-        if debug:
-            print("  " * recursion_level, "isDICT")
+        logger.debug("%sisDICT", "  " * recursion_level)
         k = _create_default(args[0], debug=debug, recursion_level=recursion_level + 1)
         v = _create_default(args[1], debug=debug, recursion_level=recursion_level + 1)
         return {k: v}
     if len(args) > 1:
-        if debug:
-            print("  " * recursion_level, "isUNION")
+        logger.debug("%sisUNION", "  " * recursion_level)
         return _create_default_from_list_of_args(
             args, is_optional=is_optional, debug=debug, recursion_level=recursion_level
         )
@@ -192,20 +184,17 @@ def _create_default(p: inspect.Parameter, is_optional: bool = False, debug: bool
     if hasattr(p, "annotation"):
         p = p.annotation
     if inspect.isclass(p) and not _is_typing_annotation(p):
-        if debug:
-            print("  " * recursion_level, "CLASS")
+        logger.debug("%sCLASS", "  " * recursion_level)
         return _create_default_class_from_annotation(
             p, is_optional=is_optional, debug=debug, recursion_level=recursion_level
         )
     if _is_typing_annotation(p):
-        if debug:
-            print("  " * recursion_level, "TYPED")
+        logger.debug("%sTYPED", "  " * recursion_level)
         return _create_default_from_typing_annotation(
             p, is_optional=is_optional, debug=debug, recursion_level=recursion_level
         )
     if _is_pydantic_annotated_string(p, debug=debug, recursion_level=recursion_level):
-        if debug:
-            print("  " * recursion_level, "ANNOTATED STRING")
+        logger.debug("%sANNOTATED STRING", "  " * recursion_level)
         if is_optional:
             return None
         return ""
@@ -213,13 +202,19 @@ def _create_default(p: inspect.Parameter, is_optional: bool = False, debug: bool
 
 
 def make_skeleton(cl: Type[BaseModel], debug=False, recursion_level=0):
+    if recursion_level == 0:
+        # only the outermost call is traced, the recursive calls are part of it
+        with get_tracer().span("quick_start.make_skeleton", model=cl.__name__):
+            return _make_skeleton(cl, debug=debug, recursion_level=recursion_level)
+    return _make_skeleton(cl, debug=debug, recursion_level=recursion_level)
+
+
+def _make_skeleton(cl: Type[BaseModel], debug=False, recursion_level=0):
     parameter_map = inspect.signature(cl).parameters  # {'name': <Paramater "name: type">}
     param_values = {}
     for name, param in parameter_map.items():
-        if debug:
-            print("  " * recursion_level, f"{param.name}: {param.annotation}")
+        logger.debug("%s%s: %s", "  " * recursion_level, param.name, param.annotation)
         param_values[name] = _create_default(param, debug=debug, recursion_level=recursion_level + 1)
-        if debug:
-            print("  " * recursion_level, f"Parameter: {name}, value: {param_values[name]}")
+        logger.debug("%sParameter: %s, value: %s", "  " * recursion_level, name, summarize(param_values[name]))
     param_values = standardize_keys_in_dict(param_values)
     return cl(**param_values)
@@ -0,0 +1,142 @@
+"""
+An on disk cache of the metadata read from Excel files, for jobs that read the same files again and again.
+
+    >>> from pydantic_schemas.utils.read_cache import ReadCache
+    >>> cache = ReadCache("~/.cache/metadataschemas", max_bytes=500_000_000)
+    >>> metadata = mm.read_metadata_from_excel("microdata.xlsx", cache=cache)
+
+Entries are keyed by the SHA-256 of the bytes of the workbook together with the schema class, its metadata type,
+version and template, and the version of this package, so an edited file, or one read as another type or by another
+release, is read afresh. Each entry is the JSON of the validated model, so a repeat read costs hashing the file and
+a single model_validate_json.
+
+The cache can be shared by many processes, including on a network drive. Entries are written to a temporary file in
+the cache directory and then renamed into place, so readers only ever see whole entries, and concurrent writers of the
+same key write the same content, so whichever rename comes last wins harmlessly. Once the entries take more than
+max_bytes the least recently used are removed, recency being the modification time, which is updated on every hit.
+An entry removed by another process while being read is simply a miss.
+"""
+
+import contextlib
+import hashlib
+import importlib.metadata
+import logging
+import os
+import tempfile
+import time
+import warnings
+from typing import Optional, Type
+
+from pydantic import BaseModel
+
+from .utils import get_private_attr_default
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SUFFIX = ".json"
+_TEMPORARY_PREFIX = ".tmp-"
+# temporary files older than this were left by a writer that died before renaming them
+_STALE_TEMPORARY_SECONDS = 3600
+
+_PACKAGE_VERSION = importlib.metadata.version("metadataschemas")
+
+
+def _schema_identity(model_type: Type[BaseModel]) -> str:
+    private_attributes = ["_metadata_type__", "_metadata_type_version__", "_template_uid__"]
+    parts = [model_type.__module__, model_type.__qualname__, _PACKAGE_VERSION]
+    parts += [str(get_private_attr_default(model_type, attribute)) for attribute in private_attributes]
+    return "|".join(parts)
+
+
+class ReadCache:
+    """
+    A size bounded, least recently used, on disk cache of the metadata read from Excel files.
+
+    Args:
+        directory (str): Where to keep the entries, created if it doesn't exist.
+        max_bytes (int): The most the entries may take on disk before the least recently used are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = os.path.expanduser(str(directory))
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, filename: str, model_type: Type[BaseModel]) -> str:
+        """The key of the metadata of model_type read from the Excel file at filename, which hashes the whole file"""
+        with open(filename, "rb") as f:
+            workbook_digest = hashlib.file_digest(f, "sha256").hexdigest()
+        return hashlib.sha256(f"{workbook_digest}|{_schema_identity(model_type)}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """The JSON stored under key, or None if there is none, marking it as the most recently used"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            logger.debug("cache miss for %s", key)
+            return None
+        # evicted by another process since it was read
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        logger.debug("cache hit for %s", key)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store the JSON data under key, then remove the least recently used entries if the cache is too big"""
+        descriptor, temporary_path = tempfile.mkstemp(prefix=_TEMPORARY_PREFIX, suffix=_SUFFIX, dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(data)
+            os.replace(temporary_path, self._path(key))
+        except OSError as e:
+            # for instance a full disk, or on Windows another process reading the entry, which has the same content
+            self._remove(temporary_path)
+            warnings.warn(f"Could not write to the read cache in {self.directory}: {e}", stacklevel=2)
+            return
+        self.evict()
+
+    def discard(self, key: str) -> None:
+        """Remove the entry stored under key, if there is one"""
+        self._remove(self._path(key))
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the rest take at most max_bytes"""
+        entries = []
+        now = time.time()
+        with os.scandir(self.directory) as scan:
+            for dir_entry in scan:
+                try:
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                if dir_entry.name.startswith(_TEMPORARY_PREFIX):
+                    if now - stat.st_mtime > _STALE_TEMPORARY_SECONDS:
+                        self._remove(dir_entry.path)
+                elif dir_entry.name.endswith(_SUFFIX):
+                    entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        # already removed by another process, or on Windows still open in one
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with os.scandir(self.directory) as scan:
+            for dir_entry in scan:
+                if dir_entry.name.endswith(_SUFFIX) and not dir_entry.name.startswith(_TEMPORARY_PREFIX):
+                    self._remove(dir_entry.path)
@@ -1,7 +1,9 @@
-from typing import Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set, Type
 
-from pydantic import BaseModel, ConfigDict, PrivateAttr
-from rich import print as print_rich
+from pydantic import BaseModel, ConfigDict, PrivateAttr, ValidationError
+
+from .fingerprint import FingerprintCache, fingerprint
 
 # from rich.pretty import pretty_repr
 
@@ -12,18 +14,111 @@ class SchemaBaseModel(BaseModel):
     )  # if a subclass has a model_config then this will be overridden
 
     def pretty_print(self):
+        # rich is only needed for display so it is imported on first use rather than with every schema
+        from rich import print as print_rich
+
         print_rich(self)
 
     def pprint(self):
-        print_rich(self)
+        self.pretty_print()
 
     _metadata_type__: Optional[str] = PrivateAttr(default=None)  # None
     _metadata_type_version__: Optional[str] = PrivateAttr(default=None)  # None
     _template_name__: Optional[str] = PrivateAttr(default=None)  # None
     _template_uid__: Optional[str] = PrivateAttr(default=None)  # None
+    _bulk_update_fields__: Optional[Set[str]] = PrivateAttr(default=None)  # fields assigned inside bulk_update
+
+    @contextmanager
+    def bulk_update(self) -> Iterator["SchemaBaseModel"]:
+        """
+        Assign many fields without validating each assignment, then validate the assigned fields on leaving the block.
+
+        If that validation fails, or the block raises, the model is restored to how it was before the block and the
+        error is raised, so as with validate_assignment an invalid value is never left on the model. Nested calls
+        on the same model are validated when the outermost block exits. Inside the block the model is an instance of
+        a subclass that records the assignments, so that assigning to models outside a block costs nothing extra.
+
+        Example:
+            >>> variable = VariableSchema(name="", labl="")
+            >>> with variable.bulk_update():
+            ...     variable.name = "hhid"
+            ...     variable.labl = "Household ID"
+            ...     variable.var_intrvl = "discrete"
+        """
+        model_class = type(self)
+        if issubclass(model_class, _BulkUpdate):
+            yield self
+            return
+
+        original_dict = dict(self.__dict__)
+        original_fields_set = set(self.__pydantic_fields_set__)
+        bulk_update_fields = set()
+        self.__pydantic_private__["_bulk_update_fields__"] = bulk_update_fields
+        object.__setattr__(self, "__class__", _bulk_update_class(model_class))
+        try:
+            yield self
+            object.__setattr__(self, "__class__", model_class)
+            errors = []
+            for name in [name for name in model_class.model_fields if name in bulk_update_fields]:
+                try:
+                    # validates the value as an assignment would, pydantic only stores it if it is valid
+                    self.__pydantic_validator__.validate_assignment(self, name, self.__dict__[name])
+                except ValidationError as e:
+                    errors.extend(e.errors())
+            if len(errors):
+                raise ValidationError.from_exception_data(model_class.__name__, errors)
+        except BaseException:
+            object.__setattr__(self, "__dict__", original_dict)
+            object.__setattr__(self, "__pydantic_fields_set__", original_fields_set)
+            raise
+        finally:
+            object.__setattr__(self, "__class__", model_class)
+            self.__pydantic_private__["_bulk_update_fields__"] = None
+
+    def fingerprint(self, path: Optional[str] = None, cache: Optional[FingerprintCache] = None) -> str:
+        """
+        A hash of the canonical form of this model, or of the part of it at path, that only changes when its content
+        does, so records or parts of them that have not changed since they were last synced can be skipped.
+
+        The fingerprint is computed afresh unless a FingerprintCache is given, which remembers the digests of the
+        models inside this one until they are forgotten. See pydantic_schemas.utils.fingerprint.
+
+        Example:
+            >>> before = microdata.fingerprint("study_desc")
+            >>> microdata.study_desc.title_statement.title = "Household survey 2024"
+            >>> microdata.fingerprint("study_desc") == before
+            False
+        """
+        return fingerprint(self, path, cache)
 
     # def __repr__(self):
     #     return pretty_repr(self)
 
     # def __str__(self):
     #     return pretty_repr(self)
+
+
+class _BulkUpdate:
+    """Mixed into the class of a model inside SchemaBaseModel.bulk_update to record assignments instead of validating"""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name not in type(self).model_fields:
+            super().__setattr__(name, value)
+            return
+        self.__dict__[name] = value
+        self.__pydantic_private__["_bulk_update_fields__"].add(name)
+
+
+_BULK_UPDATE_CLASSES: Dict[Type[SchemaBaseModel], Type[SchemaBaseModel]] = {}
+
+
+def _bulk_update_class(model_class: Type[SchemaBaseModel]) -> Type[SchemaBaseModel]:
+    if model_class not in _BULK_UPDATE_CLASSES:
+        _BULK_UPDATE_CLASSES[model_class] = type(
+            model_class.__name__,
+            (_BulkUpdate, model_class),
+            {"__module__": model_class.__module__, "__qualname__": model_class.__qualname__},
+        )
+    return _BULK_UPDATE_CLASSES[model_class]
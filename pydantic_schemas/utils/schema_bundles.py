@@ -0,0 +1,212 @@
+"""
+Self-contained JSON schemas, one per metadata type, bundled from the schemas folder of the repository.
+
+The JSON schemas refer to each other, for instance microdata-schema.json to ddi-schema.json, which refers to
+variable-schema.json and others, so a consumer of one needs the rest and has to resolve the references between them.
+A bundle holds the schema of a metadata type with every document it refers to, directly or not, under its $defs,
+keyed by file name without the .json, and every $ref rewritten to point inside the bundle:
+
+    "ddi-schema.json"                               -> "#/$defs/ddi-schema"
+    "iptc-phovidmdshared-schema.json#/definitions/CvTerm"
+                                                    -> "#/$defs/iptc-phovidmdshared-schema/definitions/CvTerm"
+    "#/definitions/variable" in variable-schema.json -> "#/$defs/variable-schema/definitions/variable"
+
+Referred documents are embedded once each, rather than inlined at every reference, so bundles stay small and
+recursive definitions remain possible.
+
+The bundles are built from a checkout of the repository by
+
+    python -m pydantic_schemas.generators.bundle_json_schemas
+
+and shipped in BUNDLE_DIR, along with a manifest of the SHA-256 of each source file and of BUNDLER_VERSION, so that
+stale_bundles can tell cheaply whether they still match the schemas folder.
+
+    >>> from metadataschemas.utils.schema_bundles import load_bundled_schema
+    >>> microdata_json_schema = load_bundled_schema("microdata")
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+BUNDLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bundled_json_schemas")
+MANIFEST_NAME = "manifest.json"
+DEFS_KEYWORD = "$defs"
+# increase when a change to bundle_schema changes the bundles it builds, so that stale_bundles reports all of them
+BUNDLER_VERSION = 1
+
+# identify the document they are in, which in a bundle is the bundle, so they are dropped from embedded documents
+_DOCUMENT_KEYWORDS = ["$schema", "$id"]
+
+
+def _escape_pointer(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _defs_key(relative_path: str) -> str:
+    return os.path.splitext(relative_path)[0].replace(os.sep, "/")
+
+
+def bundle_schema(json_file: str, schema_dir: str) -> Dict[str, Any]:
+    """
+    Bundle a JSON schema with every document it refers to, so that it has no references to other files.
+
+    Args:
+        json_file (str): The path of the schema relative to schema_dir, for instance microdata-schema.json.
+        schema_dir (str): The folder the schema and the documents it refers to are in.
+
+    Returns:
+        Dict[str, Any]: The bundled schema.
+
+    Raises:
+        ValueError: If the schema already uses $defs for something else.
+    """
+    root = os.path.normpath(json_file)
+    embedded: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def load(relative_path: str) -> Dict[str, Any]:
+        with open(os.path.join(schema_dir, relative_path), encoding="utf-8") as file:
+            return json.load(file)
+
+    def rewrite_ref(ref: str, current: str) -> str:
+        ref_file, _, fragment = ref.partition("#")
+        if "://" in ref_file:
+            return ref
+        target = os.path.normpath(os.path.join(os.path.dirname(current), ref_file)) if ref_file else current
+        if target == root:
+            return "#" + fragment
+        if target not in embedded:
+            embedded[target] = None  # in progress, in case the documents refer to each other
+            document = load(target)
+            for keyword in _DOCUMENT_KEYWORDS:
+                document.pop(keyword, None)
+            embedded[target] = rewrite(document, target)
+        return f"#/{DEFS_KEYWORD}/{_escape_pointer(_defs_key(target))}{fragment}"
+
+    def rewrite(node: Any, current: str) -> Any:
+        if isinstance(node, dict):
+            return {
+                key: rewrite_ref(value, current)
+                if key == "$ref" and isinstance(value, str)
+                else rewrite(value, current)
+                for key, value in node.items()
+            }
+        if isinstance(node, list):
+            return [rewrite(value, current) for value in node]
+        return node
+
+    bundle = rewrite(load(root), root)
+    if len(embedded):
+        if DEFS_KEYWORD in bundle:
+            raise ValueError(f"{json_file} already has {DEFS_KEYWORD}, so the documents it refers to can't go there")
+        bundle[DEFS_KEYWORD] = {_defs_key(path): embedded[path] for path in sorted(embedded)}
+    return bundle
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def _bundled_files(bundle: Dict[str, Any], json_file: str) -> List[str]:
+    return sorted([os.path.normpath(json_file)] + [key + ".json" for key in bundle.get(DEFS_KEYWORD, {})])
+
+
+def build_bundles(json_files: Dict[str, str], schema_dir: str, bundle_dir: str = BUNDLE_DIR) -> None:
+    """
+    Write the bundle of each metadata type to bundle_dir, with a manifest of the files each was built from.
+
+    Args:
+        json_files (Dict[str, str]): The schema of each metadata type, relative to schema_dir.
+        schema_dir (str): The folder of the JSON schemas.
+        bundle_dir (str): Where to write the bundles and the manifest.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    manifest = {"bundler_version": BUNDLER_VERSION, "bundles": {}}
+    for metadata_name, json_file in json_files.items():
+        bundle = bundle_schema(json_file, schema_dir)
+        with open(os.path.join(bundle_dir, f"{metadata_name}.json"), "w", encoding="utf-8") as file:
+            json.dump(bundle, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+        sources = {path: _file_sha256(os.path.join(schema_dir, path)) for path in _bundled_files(bundle, json_file)}
+        manifest["bundles"][metadata_name] = {"json_file": json_file, "sources": sources}
+    with open(os.path.join(bundle_dir, MANIFEST_NAME), "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+        file.write("\n")
+    _load_manifest.cache_clear()
+    load_bundled_schema.cache_clear()
+
+
+@functools.cache
+def _load_manifest(bundle_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(bundle_dir, MANIFEST_NAME)) as file:
+        return json.load(file)
+
+
+def bundled_metadata_names(bundle_dir: str = BUNDLE_DIR) -> List[str]:
+    return list(_load_manifest(bundle_dir)["bundles"])
+
+
+def bundled_schema_path(metadata_name: str, bundle_dir: str = BUNDLE_DIR) -> str:
+    """
+    The path of the bundled JSON schema of a metadata type, for serving it as it is.
+
+    Raises:
+        ValueError: If there is no bundle for metadata_name.
+    """
+    names = bundled_metadata_names(bundle_dir)
+    if metadata_name not in names:
+        raise ValueError(f"There is no bundled schema for '{metadata_name}', there are bundles for {names}")
+    return os.path.join(bundle_dir, f"{metadata_name}.json")
+
+
+@functools.cache
+def load_bundled_schema(metadata_name: str, bundle_dir: str = BUNDLE_DIR) -> Dict[str, Any]:
+    """
+    The bundled JSON schema of a metadata type, read once per process.
+
+    Every call returns the same dictionary, so copy it with copy_bundled_schema before changing it.
+
+    Args:
+        metadata_name (str): The name of a metadata type, for instance microdata.
+
+    Returns:
+        Dict[str, Any]: The JSON schema, with no references to other files.
+
+    Raises:
+        ValueError: If there is no bundle for metadata_name.
+    """
+    with open(bundled_schema_path(metadata_name, bundle_dir), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def copy_bundled_schema(metadata_name: str, bundle_dir: str = BUNDLE_DIR) -> Dict[str, Any]:
+    """A copy of the bundled JSON schema of a metadata type, which can be changed freely"""
+    return copy.deepcopy(load_bundled_schema(metadata_name, bundle_dir))
+
+
+def stale_bundles(schema_dir: str, bundle_dir: str = BUNDLE_DIR) -> List[str]:
+    """
+    The metadata types whose bundles no longer match the JSON schemas in schema_dir, found by hashing only the files
+    they were built from.
+
+    A bundle is stale if any of those files has changed or gone, including changes that make it refer to other files,
+    or if they were built by another BUNDLER_VERSION.
+
+    Returns:
+        List[str]: The names of the stale bundles, all of them if BUNDLER_VERSION has changed.
+    """
+    manifest = _load_manifest(bundle_dir)
+    if manifest.get("bundler_version") != BUNDLER_VERSION:
+        return list(manifest["bundles"])
+    stale = []
+    for metadata_name, details in manifest["bundles"].items():
+        for relative_path, sha256 in details["sources"].items():
+            path = os.path.join(schema_dir, relative_path)
+            if not os.path.exists(path) or _file_sha256(path) != sha256:
+                stale.append(metadata_name)
+                break
+    return stale
@@ -0,0 +1,260 @@
+"""
+Generate large, fully populated metadata objects for testing how the library scales.
+
+The generator walks the annotations of a pydantic schema in the same way as quick_start.make_skeleton, but rather
+than empty defaults it fills every field with a random value of the right type: enums take one of their members,
+urls and datetimes are well formed, bounded numbers stay in their bounds and every list of objects gets a
+configurable number of elements. The output is produced as a stream of JSON text so that very large instances, such
+as a microdata schema with 50,000 variables, can be written to disk without holding the whole object in memory.
+
+Example:
+    >>> from pydantic_schemas.microdata_schema import MicrodataSchema
+    >>> generator = SyntheticDataGenerator(seed=1, list_lengths={"variables": 50000, "var_catgry": 10})
+    >>> with open("microdata.json", "w") as file:
+    ...     generator.write_json(MicrodataSchema, file)
+"""
+
+import inspect
+import json
+import random
+import typing
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from pydantic import AnyUrl, AwareDatetime, BaseModel, RootModel
+
+from .quick_start import DEFAULT_URL, MAX_DEPTH, _is_enum_type, _is_pydantic_subclass
+
+WORDS = [
+    "survey",
+    "household",
+    "income",
+    "region",
+    "district",
+    "population",
+    "health",
+    "education",
+    "labour",
+    "water",
+    "energy",
+    "poverty",
+    "census",
+    "agriculture",
+    "price",
+    "index",
+    "annual",
+    "national",
+    "urban",
+    "rural",
+]
+
+# list lengths that give large instances of the metadata types whose size is dominated by a few long lists
+LARGE_LIST_LENGTHS = {
+    "microdata": {"variables": 50000, "var_catgry": 10, "data_files": 20, "variable_groups": 100},
+    "indicator": {"data_structure": 5000},
+    "geospatial": {"contact": 500, "pointOfContact": 500, "keywords": 500, "descriptiveKeywords": 200},
+}
+
+_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# (key, key as JSON, field name, annotation) of the fields of each model, in order
+_MODEL_FIELDS_CACHE: Dict[Type[BaseModel], List[Tuple[str, str, str, Any]]] = {}
+
+
+def _model_fields(model_type: Type[BaseModel]) -> List[Tuple[str, str, str, Any]]:
+    if model_type not in _MODEL_FIELDS_CACHE:
+        _MODEL_FIELDS_CACHE[model_type] = [
+            (field.alias or name, json.dumps(field.alias or name), name, field.rebuild_annotation())
+            for name, field in model_type.model_fields.items()
+        ]
+    return _MODEL_FIELDS_CACHE[model_type]
+
+
+_ANNOTATION_KIND_CACHE: Dict[Any, Tuple[str, Any]] = {}
+
+
+def _annotation_kind(annotation: Any) -> Tuple[str, Any]:
+    try:
+        return _ANNOTATION_KIND_CACHE[annotation]
+    except KeyError:
+        kind = _ANNOTATION_KIND_CACHE[annotation] = _classify_annotation(annotation)
+        return kind
+    except TypeError:  # unhashable annotation
+        return _classify_annotation(annotation)
+
+
+def _classify_annotation(annotation: Any) -> Tuple[str, Any]:
+    """
+    Classify an annotation as a 'union', 'list', 'dict', 'model' or 'leaf', along with what is needed to generate it.
+
+    For a union that is its non-None arguments and whether it is optional, for lists and dicts the type of their
+    elements and for models the model class, with RootModels replaced by their root annotation.
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        not_none = [a for a in args if a is not type(None)]
+        return "union", (not_none, len(not_none) < len(args))
+    if origin is list:
+        return "list", args[0] if args else typing.Any
+    if origin is dict:
+        return "dict", args[1] if args else typing.Any
+    if _is_pydantic_subclass(annotation) and issubclass(annotation, RootModel):
+        return _annotation_kind(annotation.model_fields["root"].annotation)
+    if _is_pydantic_subclass(annotation):
+        return "model", annotation
+    return "leaf", _leaf_spec(annotation)
+
+
+def _leaf_spec(annotation: Any) -> Tuple[Any, Dict[str, Any]]:
+    """The underlying type of a leaf annotation with the bounds and maximum length of any constraints on it"""
+    constraints = {}
+    if typing.get_origin(annotation) is typing.Annotated:
+        annotation, *metadata = typing.get_args(annotation)
+        for constraint in metadata:
+            for bound in ("ge", "gt", "le", "lt", "max_length"):
+                if getattr(constraint, bound, None) is not None:
+                    constraints[bound] = getattr(constraint, bound)
+    return annotation, constraints
+
+
+class SyntheticDataGenerator:
+    """
+    Seeded generator of random but valid metadata for any pydantic schema.
+
+    Args:
+        seed (int): Seed for the random number generator. The same seed always gives the same output.
+        list_length (int): Number of elements in each list, unless overridden by list_lengths.
+        list_lengths (Optional[Dict[str, int]]): Lengths of particular lists, keyed either by the dotted path of the
+            field such as 'study_desc.authoring_entity' or by the bare field name such as 'variables'. The dotted
+            path takes precedence.
+        max_depth (int): Nested objects deeper than this are left empty, as in make_skeleton.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        list_length: int = 2,
+        list_lengths: Optional[Dict[str, int]] = None,
+        max_depth: int = MAX_DEPTH,
+    ):
+        self.seed = seed
+        self.list_length = list_length
+        self.list_lengths = dict(list_lengths or {})
+        self.max_depth = max_depth
+        self._random = random.Random(seed)
+
+    def iter_json(self, model_type: Type[BaseModel]) -> Iterator[str]:
+        """
+        Yield the JSON text of one instance of model_type in small pieces.
+
+        Only the value currently being generated is held in memory, so the pieces can be written straight to a file
+        however long the lists are. Each call starts again from the seed.
+        """
+        self._random = random.Random(self.seed)
+        return self._iter_value(model_type, path="", depth=0)
+
+    def write_json(self, model_type: Type[BaseModel], file: IO[str]) -> None:
+        """Write the JSON of one instance of model_type to an open text file"""
+        for chunk in self.iter_json(model_type):
+            file.write(chunk)
+
+    def write_jsonl(self, model_type: Type[BaseModel], file: IO[str], n_instances: int) -> None:
+        """Write n_instances different instances of model_type to an open text file, one JSON document per line"""
+        seed = self.seed
+        try:
+            for i in range(n_instances):
+                self.seed = seed + i
+                self.write_json(model_type, file)
+                file.write("\n")
+        finally:
+            self.seed = seed
+
+    def generate_dict(self, model_type: Type[BaseModel]) -> Dict[str, Any]:
+        """Return one instance of model_type as a JSON compatible dictionary"""
+        return json.loads("".join(self.iter_json(model_type)))
+
+    def generate(self, model_type: Type[BaseModel]) -> BaseModel:
+        """Return one validated instance of model_type"""
+        return model_type.model_validate_json("".join(self.iter_json(model_type)))
+
+    def _list_length(self, path: str) -> int:
+        if path in self.list_lengths:
+            return self.list_lengths[path]
+        return self.list_lengths.get(path.rsplit(".", 1)[-1], self.list_length)
+
+    def _iter_value(self, annotation: Any, path: str, depth: int) -> Iterator[str]:
+        """
+        Stream a value as JSON text.
+
+        Models are streamed field by field and lists element by element, each element being generated whole and
+        serialized at once, so memory is bounded by the largest single list element rather than the whole instance.
+        """
+        kind, detail = _annotation_kind(annotation)
+        if kind == "union":
+            if depth >= self.max_depth and detail[1]:
+                yield "null"
+                return
+            yield from self._iter_value(self._random.choice(detail[0]), path, depth)
+        elif kind == "model" and depth < self.max_depth:
+            yield "{"
+            for i, (_, json_key, name, field_annotation) in enumerate(_model_fields(detail)):
+                yield f"{', ' if i else ''}{json_key}: "
+                yield from self._iter_value(field_annotation, f"{path}.{name}" if path else name, depth + 1)
+            yield "}"
+        elif kind == "list":
+            yield "["
+            for i in range(self._list_length(path)):
+                yield f"{', ' if i else ''}{json.dumps(self._value(detail, path, depth))}"
+            yield "]"
+        else:
+            yield json.dumps(self._value(annotation, path, depth))
+
+    def _value(self, annotation: Any, path: str, depth: int) -> Any:
+        """Generate a JSON compatible value, making the same random choices as _iter_value"""
+        kind, detail = _annotation_kind(annotation)
+        if kind == "union":
+            if depth >= self.max_depth and detail[1]:
+                return None
+            return self._value(self._random.choice(detail[0]), path, depth)
+        if kind == "model":
+            if depth >= self.max_depth:
+                return {}
+            return {
+                key: self._value(field_annotation, f"{path}.{name}" if path else name, depth + 1)
+                for key, _, name, field_annotation in _model_fields(detail)
+            }
+        if kind == "list":
+            return [self._value(detail, path, depth) for _ in range(self._list_length(path))]
+        if kind == "dict":
+            return {f"{self._word()}_{i}": self._value(detail, path, depth) for i in range(self._list_length(path))}
+        return self._leaf(detail, path)
+
+    def _word(self) -> str:
+        return self._random.choice(WORDS)
+
+    def _leaf(self, spec: Tuple[Any, Dict[str, Any]], path: str) -> Any:
+        """A random JSON value for an annotation that is not a model, list, dict or union"""
+        annotation, constraints = spec
+        if annotation is str or annotation is typing.Any:
+            if path.endswith(("date", "Date")):
+                return (_EPOCH + timedelta(days=self._random.randint(0, 25 * 365))).date().isoformat()
+            text = " ".join(self._random.choices(WORDS, k=self._random.randint(1, 4)))
+            if "max_length" in constraints:
+                text = text[: constraints["max_length"]]
+            return text
+        if annotation is bool:
+            return self._random.random() < 0.5
+        if annotation is int:
+            return self._random.randint(0, 1000)
+        if annotation is float:
+            low = float(constraints.get("ge", constraints.get("gt", 0.0)))
+            high = float(constraints.get("le", constraints.get("lt", 1000.0)))
+            return round(self._random.uniform(low, high), 6)
+        if _is_enum_type(annotation):
+            return self._random.choice(list(annotation)).value
+        if inspect.isclass(annotation) and issubclass(annotation, AnyUrl):
+            return f"{DEFAULT_URL}/{self._word()}/{self._random.randint(0, 10**6)}"
+        if annotation is AwareDatetime or annotation is datetime:
+            return (_EPOCH + timedelta(seconds=self._random.randint(0, 25 * 365 * 86400))).isoformat()
+        raise ValueError(f"Can't generate a value for {annotation} at {path}")
@@ -0,0 +1,149 @@
+import typing
+from typing import Any, Dict, List, Optional, Type, Union
+
+from pydantic import BaseModel, PrivateAttr, RootModel
+from pydantic.fields import FieldInfo
+
+from .schema_base_model import SchemaBaseModel
+from .utils import get_private_attr_default
+
+
+def _fields_to_tree(fields: List[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Turn a list of dotted field paths into a nested dictionary. A leaf of None means keep the whole field.
+
+    For example ["idno", "study_desc.title_statement.title", "study_desc.title_statement.idno"] becomes
+        {"idno": None, "study_desc": {"title_statement": {"title": None, "idno": None}}}
+
+    If both a field and one of its sub fields are given then the whole field is kept.
+    """
+    tree = {}
+    for path in sorted(fields, key=lambda p: p.count(".")):
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _pydantic_types_in_annotation(anno: Any) -> List[Type[BaseModel]]:
+    if isinstance(anno, type) and issubclass(anno, BaseModel):
+        return [anno]
+    found = []
+    for arg in typing.get_args(anno):
+        for t in _pydantic_types_in_annotation(arg):
+            if t not in found:
+                found.append(t)
+    return found
+
+
+def _replace_type_in_annotation(anno: Any, old: Type[BaseModel], new: Type[BaseModel]) -> Any:
+    """Rebuild an annotation such as Optional[List[old]] as Optional[List[new]]."""
+    if anno is old:
+        return new
+    args = typing.get_args(anno)
+    if len(args) == 0:
+        return anno
+    new_args = tuple(_replace_type_in_annotation(a, old, new) for a in args)
+    origin = typing.get_origin(anno)
+    if origin is Union:
+        return Union[new_args]
+    if origin is list:
+        return List[new_args[0]]
+    if origin is dict:
+        return Dict[new_args[0], new_args[1]]
+    return anno.copy_with(new_args)
+
+
+def _subset_model_type(
+    model_type: Type[BaseModel],
+    tree: Dict[str, Optional[Dict]],
+    labels: Dict[str, str],
+    prefix: str = "",
+    private_attributes: Optional[Dict[str, PrivateAttr]] = None,
+) -> Type[BaseModel]:
+    if issubclass(model_type, RootModel):
+        raise ValueError(f"Cannot select sub fields of '{prefix.rstrip('.')}' as {model_type.__name__} is a root model")
+    annotations = {}
+    namespace = {
+        "__module__": model_type.__module__,
+        "__doc__": model_type.__doc__,
+        "__qualname__": model_type.__qualname__,
+        "model_config": model_type.model_config,
+    }
+    for name in tree:
+        if name not in model_type.model_fields:
+            raise ValueError(f"'{prefix}{name}' is not a field of {model_type.__name__}")
+    # keep the field order of the original schema
+    for name, field_info in model_type.model_fields.items():
+        if name not in tree:
+            continue
+        subtree = tree[name]
+        path = f"{prefix}{name}"
+        anno = field_info.annotation
+        if subtree is not None:
+            sub_types = _pydantic_types_in_annotation(anno)
+            if len(sub_types) != 1:
+                raise ValueError(f"Cannot select sub fields of '{path}' with annotation {anno}")
+            sub_type = _subset_model_type(sub_types[0], subtree, labels, prefix=f"{path}.")
+            anno = _replace_type_in_annotation(anno, sub_types[0], sub_type)
+        overrides = {"annotation": anno}
+        if path in labels:
+            overrides["title"] = labels[path]
+        annotations[name] = anno
+        namespace[name] = FieldInfo.merge_field_infos(field_info, **overrides)
+    namespace["__annotations__"] = annotations
+    if private_attributes is not None:
+        namespace.update(private_attributes)
+    base = SchemaBaseModel if issubclass(model_type, SchemaBaseModel) else BaseModel
+    # nested classes keep the name of the class they subset since the Excel reader finds sections by class title
+    return type(model_type.__name__, (base,), namespace)
+
+
+def make_template_class(
+    schema: Type[BaseModel],
+    fields: List[str],
+    template_uid: str,
+    template_name: str,
+    labels: Optional[Dict[str, str]] = None,
+    metadata_type: Optional[str] = None,
+    metadata_type_version: Optional[str] = None,
+) -> Type[SchemaBaseModel]:
+    """
+    Create a template class from a metadata schema by keeping only a subset of its fields and optionally relabelling
+    them.
+
+    Args:
+        schema (type[BaseModel]): The metadata schema the template is based on, for example MicrodataSchema.
+        fields (List[str]): Dotted paths of the fields to keep, like "study_desc.title_statement.title". Keeping a
+            field keeps everything below it. Paths may pass through lists of models such as "variables.name".
+        template_uid (str): The unique id of the template, written to the Excel file.
+        template_name (str): The name of the template, written to the Excel file.
+        labels (Optional[Dict[str, str]]): Field titles keyed by dotted path.
+        metadata_type (Optional[str]): Defaults to the _metadata_type__ of the schema.
+        metadata_type_version (Optional[str]): Defaults to the _metadata_type_version__ of the schema.
+
+    Returns:
+        type[SchemaBaseModel]: The template class.
+
+    Raises:
+        ValueError: If a path does not exist in the schema.
+    """
+    if len(fields) == 0:
+        raise ValueError("A template must keep at least one field")
+    labels = labels or {}
+    if metadata_type is None:
+        metadata_type = get_private_attr_default(schema, "_metadata_type__")
+    if metadata_type_version is None:
+        metadata_type_version = get_private_attr_default(schema, "_metadata_type_version__")
+    private_attributes = {
+        "_metadata_type__": PrivateAttr(metadata_type),
+        "_metadata_type_version__": PrivateAttr(metadata_type_version),
+        "_template_name__": PrivateAttr(template_name),
+        "_template_uid__": PrivateAttr(template_uid),
+    }
+    return _subset_model_type(schema, _fields_to_tree(fields), labels, private_attributes=private_attributes)
@@ -0,0 +1,282 @@
+"""
+Lightweight tracing of the phases of the Excel pipeline.
+
+The MetadataManager and the Excel readers and writers open a span around each phase of their work, such as building
+the skeleton, merging, validating, building DataFrames, styling sheets and saving the workbook. By default the tracer
+does nothing and a span costs a single attribute check. To find out where the time goes install a SpanCollector:
+
+    >>> from pydantic_schemas.utils.tracing import SpanCollector, use_tracer
+    >>> collector = SpanCollector()
+    >>> with use_tracer(collector):
+    ...     mm.save_metadata_to_excel(metadata, "metadata.xlsx")
+    >>> print(collector.format_summary())
+
+which reports, for every phase, how many times it ran, its total and longest wall time and any counts recorded
+against it such as the number of rows and cells written. OpenTelemetryTracer sends the same spans to OpenTelemetry
+if that package is installed.
+
+The tracer is held in a context variable, so a tracer installed in one thread or asyncio task does not trace the work
+of the others.
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+
+class Span:
+    """
+    A timed phase of work.
+
+    Attributes describe the span, such as the name of the sheet written, while counts are numbers that are summed
+    over every span of the same name, such as the number of rows written.
+    """
+
+    __slots__ = ("name", "parent", "attributes", "counts", "start", "end")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.counts: Dict[str, int] = {}
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        """Wall time of the span in seconds, so far if it has not finished"""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: int = 1) -> None:
+        self.counts[key] = self.counts.get(key, 0) + amount
+
+    def __repr__(self):
+        return f"Span({self.name!r}, duration={self.duration:.6f}, attributes={self.attributes}, counts={self.counts})"
+
+
+class _NoOpSpan:
+    """Stands in for a Span when tracing is off, so that instrumented code never needs to check"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add(self, key: str, amount: int = 1) -> None:
+        pass
+
+
+_NO_OP_SPAN = _NoOpSpan()
+
+
+class Tracer:
+    """The default tracer, which records nothing. Subclasses set enabled and override span."""
+
+    enabled = False
+
+    def span(self, name: str, **attributes: Any):
+        """A context manager for a span, which gives an object with set_attribute and add methods"""
+        return _NO_OP_SPAN
+
+
+def _empty_summary_entry() -> Dict[str, Any]:
+    return {"calls": 0, "total_time": 0.0, "max_time": 0.0, "counts": {}}
+
+
+class SpanCollector(Tracer):
+    """
+    A tracer that sums up the calls, durations and counts of finished spans by name, and keeps the most recent spans.
+
+    Spans opened inside another span on the same thread record it as their parent. The collector can be shared
+    between threads. Its memory is bounded by the number of span names and max_spans, so it can be left on.
+
+    Args:
+        max_spans (Optional[int]): The number of the most recently finished spans to keep for spans_named, None to
+            keep them all. The summary always covers every span.
+    """
+
+    enabled = True
+
+    def __init__(self, max_spans: Optional[int] = 10000):
+        self.max_spans = max_spans
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self._summary: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        span = Span(name, parent=stack[-1] if stack else None, attributes=attributes)
+        if name not in self._summary:
+            with self._lock:
+                # names are summarized in the order they were first started
+                self._summary.setdefault(name, _empty_summary_entry())
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_attribute("error", type(e).__name__)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            stack.pop()
+            duration = span.end - span.start
+            with self._lock:
+                # the collector may have been cleared while the span was open
+                entry = self._summary.setdefault(name, _empty_summary_entry())
+                entry["calls"] += 1
+                entry["total_time"] += duration
+                entry["max_time"] = max(entry["max_time"], duration)
+                for key, amount in span.counts.items():
+                    entry["counts"][key] = entry["counts"].get(key, 0) + amount
+                self.spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans = deque(maxlen=self.max_spans)
+            self._summary = {}
+
+    def spans_named(self, name: str) -> List[Span]:
+        """The kept finished spans with this name, in the order they finished"""
+        return [span for span in self.spans if span.name == name]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize the finished spans by name.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: For each span name, in the order the names were first started, the number of
+                calls, the total, mean and maximum duration in seconds and the sum of each count recorded.
+        """
+        with self._lock:
+            summary = {
+                name: {**entry, "counts": dict(entry["counts"])}
+                for name, entry in self._summary.items()
+                if entry["calls"]
+            }
+        for entry in summary.values():
+            entry["mean_time"] = entry["total_time"] / entry["calls"]
+        return summary
+
+    def format_summary(self) -> str:
+        """The summary as a table, for printing"""
+        lines = [f"{'phase':<45}{'calls':>7}{'total':>11}{'max':>11}  counts"]
+        for name, entry in self.summary().items():
+            counts = ", ".join(f"{key}={amount}" for key, amount in entry["counts"].items())
+            lines.append(
+                f"{name:<45}{entry['calls']:>7}{entry['total_time']:>10.4f}s{entry['max_time']:>10.4f}s  {counts}"
+            )
+        return "\n".join(lines)
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    A tracer that forwards spans to OpenTelemetry, with counts recorded as span attributes.
+
+    Args:
+        tracer: An OpenTelemetry tracer. Defaults to the tracer called 'pydantic_schemas' from the global provider.
+
+    Raises:
+        ImportError: If opentelemetry-api is not installed.
+    """
+
+    enabled = True
+
+    def __init__(self, tracer: Any = None):
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError("OpenTelemetryTracer needs the opentelemetry-api package to be installed") from e
+            tracer = trace.get_tracer("pydantic_schemas")
+        self._tracer = tracer
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator["_OpenTelemetrySpan"]:
+        with self._tracer.start_as_current_span(name, attributes=attributes or None) as otel_span:
+            yield _OpenTelemetrySpan(otel_span)
+
+
+class _OpenTelemetrySpan:
+    __slots__ = ("_span", "_counts")
+
+    def __init__(self, otel_span: Any):
+        self._span = otel_span
+        self._counts: Dict[str, int] = {}
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self._span.set_attribute(key, value)
+
+    def add(self, key: str, amount: int = 1) -> None:
+        self._counts[key] = self._counts.get(key, 0) + amount
+        self._span.set_attribute(key, self._counts[key])
+
+
+_NO_OP_TRACER = Tracer()
+
+# new threads start with the default, so each thread or task traces only the work it was given a tracer for
+_tracer: ContextVar[Tracer] = ContextVar("pydantic_schemas_tracer", default=_NO_OP_TRACER)
+
+
+def get_tracer() -> Tracer:
+    """The tracer currently in use in this thread or asyncio task"""
+    return _tracer.get()
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Tracer:
+    """
+    Use tracer for every span from now on in this thread or asyncio task, or turn tracing off if it is None.
+
+    Returns:
+        Tracer: The tracer that was in use before, so that it can be restored.
+    """
+    previous = _tracer.get()
+    _tracer.set(tracer if tracer is not None else _NO_OP_TRACER)
+    return previous
+
+
+@contextmanager
+def use_tracer(tracer: Optional[Tracer]) -> Iterator[Optional[Tracer]]:
+    """Use tracer within the block in this thread or asyncio task, restoring the previous tracer afterwards"""
+    token = _tracer.set(tracer if tracer is not None else _NO_OP_TRACER)
+    try:
+        yield tracer
+    finally:
+        _tracer.reset(token)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorate a function so that each call is a span called name.
+
+    When tracing is off the only cost is checking whether the current tracer is enabled.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer.get()
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,9 +1,12 @@
 import copy
+import logging
 import re
 import typing
-from typing import Any, Callable, Dict, List, Optional, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
 
-from pydantic import BaseModel, create_model
+from pydantic import BaseModel, RootModel, create_model
+
+logger = logging.getLogger(__name__)
 
 
 def is_optional_annotation(anno: typing._UnionGenericAlias) -> bool:
@@ -32,19 +35,14 @@ def is_optional_list(anno: typing._UnionGenericAlias) -> bool:
 
 
 def get_subtype_of_optional_or_list(anno: typing._UnionGenericAlias, debug=False) -> Any:
-    if debug:
-        print(f"getting subtype of {anno}")
     args = typing.get_args(anno)
-    if debug:
-        for a in args:
-            print(f"getting subtype {a}, is it NoneType?={a is type(None)}")
+    logger.debug("getting subtype of %s from args %s", anno, args)
     args = [a for a in args if not a is type(None)]
     for arg in args:
         if hasattr(arg, "annotation") and is_dict_annotation(arg.annotation):
             raise NotImplementedError("DICTS not yet implemented")
     for arg in args:
-        if debug:
-            print(f"checking arg {arg} -- {hasattr(arg, 'annotation')} -- {is_list_annotation(arg)}")
+        logger.debug("checking arg %s -- %s -- %s", arg, hasattr(arg, "annotation"), is_list_annotation(arg))
         if hasattr(arg, "annotation") and is_list_annotation(arg.annotation):
             return get_subtype_of_optional_or_list(arg.annotation, debug=debug)
         if is_list_annotation(arg):
@@ -87,6 +85,17 @@ def annotation_contains_pydantic(anno: typing._UnionGenericAlias) -> bool:
     return _annotation_contains_generic(anno, lambda x: isinstance(x, type(BaseModel)))
 
 
+def get_pydantic_subtype(anno: typing._UnionGenericAlias) -> Optional[Type[BaseModel]]:
+    """The pydantic model within an annotation such as Optional[List[Model]], or None if there isn't one"""
+    if isinstance(anno, type(BaseModel)):
+        return anno
+    for arg in typing.get_args(anno):
+        subtype = get_pydantic_subtype(arg)
+        if subtype is not None:
+            return subtype
+    return None
+
+
 def assert_dict_annotation_is_strings_or_any(anno):
     if is_union_annotation(anno):
         args = [a for a in typing.get_args(anno) if a is not type(None)]
@@ -191,6 +200,18 @@ def merge_dicts(base, update, skeleton_mode=False):
     return new_dict
 
 
+def get_private_attr_default(cls_or_instance: Any, attr_name: str) -> Optional[str]:
+    """
+    Read a private attribute such as _metadata_type__ from either a model class or a model instance.
+
+    On an instance the attribute is the value itself but on a class it is a ModelPrivateAttr holding the default.
+    """
+    value = getattr(cls_or_instance, attr_name, None)
+    if value is None or isinstance(value, str):
+        return value
+    return getattr(value, "default", None)
+
+
 def capitalize_first_letter(s):
     if s:
         return s[0].upper() + s[1:]
@@ -251,6 +272,10 @@ def standardize_keys_in_dict(
     return new_dict
 
 
+# subset model types are built with create_model, which compiles new validators, so they are made once per combination
+_SUBSET_MODEL_TYPE_CACHE: Dict[tuple, Type[BaseModel]] = {}
+
+
 def subset_pydantic_model_type(
     model_type: Type[BaseModel], feature_names: List[str], name: Optional[str] = None
 ) -> Type[BaseModel]:
@@ -261,6 +286,10 @@ def subset_pydantic_model_type(
     :param feature_names: List of feature names to include in the new model.
     :return: A new Pydantic model type with the specified features from the original model
     """
+    cache_key = (model_type, tuple(feature_names), name)
+    if cache_key in _SUBSET_MODEL_TYPE_CACHE:
+        return _SUBSET_MODEL_TYPE_CACHE[cache_key]
+
     # Filter the fields of the original model based on the feature names
     fields = {
         name: (model_type.model_fields[name].annotation, model_type.model_fields[name].default)
@@ -271,7 +300,8 @@ def subset_pydantic_model_type(
     # Create a new Pydantic model with the filtered fields
     if name is None:
         name = "SubsetModel"
-    return create_model(name, **fields)
+    _SUBSET_MODEL_TYPE_CACHE[cache_key] = create_model(name, **fields)
+    return _SUBSET_MODEL_TYPE_CACHE[cache_key]
 
 
 def subset_pydantic_model(model: BaseModel, feature_names: List[str], name: Optional[str] = None) -> BaseModel:
@@ -282,3 +312,52 @@ def subset_pydantic_model(model: BaseModel, feature_names: List[str], name: Opti
         return SubModel.model_validate(input_dict_standardized)
     except Exception as e:
         raise ValueError(input_dict_standardized) from e
+
+
+# (field name, field info, pydantic model within the annotation) for each field of a model type
+_NORMALIZE_FIELDS_CACHE: Dict[Type[BaseModel], List[Tuple[str, Any, Optional[Type[BaseModel]]]]] = {}
+
+
+def _normalize_fields(model_type: Type[BaseModel]) -> List[Tuple[str, Any, Optional[Type[BaseModel]]]]:
+    if model_type not in _NORMALIZE_FIELDS_CACHE:
+        fields = []
+        for name, field_info in model_type.model_fields.items():
+            subtype = None
+            if not annotation_contains_dict(field_info.annotation):
+                subtype = get_pydantic_subtype(field_info.annotation)
+            if subtype is not None and issubclass(subtype, RootModel):
+                subtype = None
+            fields.append((name, field_info, subtype))
+        _NORMALIZE_FIELDS_CACHE[model_type] = fields
+    return _NORMALIZE_FIELDS_CACHE[model_type]
+
+
+def normalize_model_dump(model_type: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Give a partial model_dump, such as one merged from a skeleton and a dump that excludes unset fields, the same
+    fields in the same order as the model_dump of the model validated from it, without validating it.
+
+    Missing fields take their default, fields the model doesn't have are dropped and nested models and lists of
+    models are normalized in the same way. The values themselves must already be valid, as they are when they come
+    from dumps of validated models.
+
+    Args:
+        model_type (Type[BaseModel]): The model that data is a dump of.
+        data (Dict[str, Any]): The partial dump, keyed by field name rather than alias.
+
+    Returns:
+        Dict[str, Any]: A new dictionary, sharing the leaf values of data.
+    """
+    normalized = {}
+    for name, field_info, subtype in _normalize_fields(model_type):
+        if name not in data:
+            default = field_info.get_default(call_default_factory=True)
+            normalized[name] = default.model_dump() if isinstance(default, BaseModel) else copy.deepcopy(default)
+            continue
+        value = data[name]
+        if subtype is not None and isinstance(value, dict):
+            value = normalize_model_dump(subtype, value)
+        elif subtype is not None and isinstance(value, list):
+            value = [normalize_model_dump(subtype, elem) if isinstance(elem, dict) else elem for elem in value]
+        normalized[name] = value
+    return normalized